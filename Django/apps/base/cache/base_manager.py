@@ -1,4 +1,6 @@
-from typing import Any
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator
 from django.conf import settings
 from django.db.models import Model
 from django.core.cache import cache
@@ -6,6 +8,35 @@ from rest_framework.request import Request
 from django.views.decorators.cache import cache_page
 from django.utils.decorators import method_decorator
 
+# Patterns waiting to be cleared at the end of coalesce_cache_invalidation, None outside of it
+_pending_patterns:ContextVar[set[str] | None] = ContextVar("pending_cache_patterns", default=None)
+
+
+@contextmanager
+def coalesce_cache_invalidation() -> Iterator[None]:
+    """
+    Groups the cache invalidations of a block, every pattern is cleared once at the end
+    (instead of one scan of the cache keys per save).
+    The nested blocks are part of the outer one.
+
+    with coalesce_cache_invalidation():
+        for item in items:
+            item.save()
+    """
+    if _pending_patterns.get() is not None:
+        yield
+        return
+    pending:set[str] = set()
+    token = _pending_patterns.set(pending)
+    try:
+        yield
+    finally:
+        _pending_patterns.reset(token)
+        cache_manager = CacheManager()
+        for pattern in sorted(pending):
+            cache_manager.clear_cache_pattern(pattern)
+
+
 class CacheManager:
     
     @staticmethod
@@ -101,6 +132,23 @@ class CacheManager:
         if not self.is_active: return
         cache.set(cache_key, data, lifetime)
     
+    async def aget_cache_data(self, *, request:Request = None, cache_key:str = None) -> Any | None:
+        """Async version of get_cache_data, for the async viewsets
+        """
+        if not self.is_active: return
+        assert (request is None) != (cache_key is None), "Debe proveer o el request o el cache_key"
+        
+        if request:
+            cache_key:str = self.get_cache_key(request)
+        
+        return await cache.aget(cache_key, None)
+    
+    async def aset_cache_data(self, cache_key:str, data:Any, lifetime:int = None) -> None:
+        """Async version of set_cache_data, for the async viewsets
+        """
+        if not self.is_active: return
+        await cache.aset(cache_key, data, lifetime)
+    
     def clear_all_cache(self):
         """
         Deletes ALL cache, don't use it until it's necessary
@@ -117,6 +165,11 @@ class CacheManager:
             patron (str): El patrón del que se extraerán las llaves
         """
         if not self.is_active: return
+        pending = _pending_patterns.get()
+        if pending is not None:
+            # Inside coalesce_cache_invalidation, it's cleared at the end of the block
+            pending.add(pattern)
+            return
         cache_keys:list[str] = cache.keys(pattern)
         cache.delete_many(cache_keys)
 
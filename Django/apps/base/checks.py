@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+
+@register(Tags.caches)
+def check_autocomplete_backend(app_configs, **kwargs) -> list[Warning]:
+    """The LOCAL autocomplete index lives in every process,
+    the writes of a gunicorn worker don't reach the indexes of the others
+    """
+    backend = getattr(settings, "AUTOCOMPLETE_BACKEND", "LOCAL")
+    workers = getattr(settings, "GUNICORN_WORKERS", 1)
+    if backend != "LOCAL" or workers <= 1:
+        return []
+    return [
+        Warning(
+            "The LOCAL autocomplete index is not shared by the %s GUNICORN_WORKERS" % workers,
+            hint="Use DJANGO_AUTOCOMPLETE_BACKEND=REDIS or one worker with more GUNICORN_THREADS.",
+            id="base.W001",
+        )
+    ]
@@ -0,0 +1,289 @@
+from typing import IO, Any, Iterable, Iterator
+from django.conf import settings
+from django.core.exceptions import FieldError, ImproperlyConfigured
+from django.db import models
+from django.db.models import QuerySet
+from django.db.models.constants import LOOKUP_SEP
+from rest_framework import serializers
+from rest_framework.settings import api_settings
+from apps.base.serializers import SQLSerializer, ValuesSerializer, get_values_path
+
+
+def import_pyarrow() -> Any:
+    """
+    pyarrow is imported only by the parquet and arrow exports, so the workers
+    that don't use them don't load it.
+
+    Raises:
+        ImproperlyConfigured: If pyarrow is not installed.
+    """
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError as err:
+        raise ImproperlyConfigured("The parquet and arrow exports need pyarrow (pip install pyarrow)") from err
+    return pyarrow
+
+
+def iter_row_groups(chunks:Iterable[list[dict]], rows_per_group:int) -> Iterator[list[dict]]:
+    """Joins the serialized chunks in groups of at least rows_per_group rows (the last one can be smaller)
+    """
+    group:list[dict] = []
+    for chunk in chunks:
+        group.extend(chunk)
+        if len(group) >= rows_per_group:
+            yield group
+            group = []
+    if group:
+        yield group
+
+
+# ============== Types
+def get_model_field_arrow_type(field:models.Field | None) -> Any:
+    """
+    Returns:
+        pyarrow.DataType | None: The type of the values of a model field as returned by the database,
+        None if it's unknown (it's inferred from the rows).
+    """
+    if field is None:
+        return None
+    pa = import_pyarrow()
+    if field.is_relation:
+        return get_model_field_arrow_type(field.target_field) if field.many_to_one or field.one_to_one else None
+    if isinstance(field, models.BooleanField):
+        return pa.bool_()
+    if isinstance(field, (models.IntegerField, models.AutoField)):
+        return pa.int64()
+    if isinstance(field, models.FloatField):
+        return pa.float64()
+    if isinstance(field, models.DecimalField):
+        if field.max_digits is None or field.decimal_places is None:
+            return None
+        decimal_type = pa.decimal128 if field.max_digits <= 38 else pa.decimal256
+        return decimal_type(field.max_digits, field.decimal_places)
+    # DateTimeField is a DateField
+    if isinstance(field, models.DateTimeField):
+        return pa.timestamp("us", tz="UTC" if settings.USE_TZ else None)
+    if isinstance(field, models.DateField):
+        return pa.date32()
+    if isinstance(field, models.TimeField):
+        return pa.time64("us")
+    if isinstance(field, models.DurationField):
+        return pa.duration("us")
+    if isinstance(field, (models.CharField, models.TextField, models.UUIDField, models.GenericIPAddressField)):
+        return pa.string()
+    if isinstance(field, models.BinaryField):
+        return pa.binary()
+    return None
+
+
+def get_serializer_field_arrow_type(field:serializers.Field, value_type:Any) -> Any:
+    """
+    Args:
+        field (serializers.Field): The DRF field of the column.
+        value_type (pyarrow.DataType | None): The type of the model value of the field, for the
+            fields that return it as is.
+
+    Returns:
+        pyarrow.DataType | None: The type of the values of to_representation, None if it's
+        unknown (method fields, nested serializers...) and it's inferred from the rows.
+    """
+    pa = import_pyarrow()
+    if isinstance(field, (serializers.SerializerMethodField, serializers.BaseSerializer, serializers.ManyRelatedField,
+                          serializers.MultipleChoiceField, serializers.JSONField, serializers.ListField, serializers.DictField)):
+        return None
+    if isinstance(field, serializers.BooleanField):
+        return pa.bool_()
+    if isinstance(field, serializers.IntegerField):
+        return pa.int64()
+    if isinstance(field, serializers.FloatField):
+        return pa.float64()
+    if isinstance(field, serializers.DecimalField):
+        if getattr(field, "coerce_to_string", api_settings.COERCE_DECIMAL_TO_STRING):
+            return pa.string()
+        if field.max_digits is None or field.decimal_places is None:
+            return value_type
+        decimal_type = pa.decimal128 if field.max_digits <= 38 else pa.decimal256
+        return decimal_type(field.max_digits, field.decimal_places)
+    # Without output format the dates are returned as they are
+    if isinstance(field, serializers.DateTimeField):
+        return value_type if getattr(field, "format", api_settings.DATETIME_FORMAT) is None else pa.string()
+    if isinstance(field, serializers.DateField):
+        return value_type if getattr(field, "format", api_settings.DATE_FORMAT) is None else pa.string()
+    if isinstance(field, serializers.TimeField):
+        return value_type if getattr(field, "format", api_settings.TIME_FORMAT) is None else pa.string()
+    if isinstance(field, serializers.PrimaryKeyRelatedField):
+        return value_type if field.pk_field is None else get_serializer_field_arrow_type(field.pk_field, value_type)
+    if isinstance(field, (serializers.CharField, serializers.UUIDField, serializers.DurationField, serializers.RelatedField)):
+        return pa.string()
+    if isinstance(field, (serializers.ReadOnlyField, serializers.ModelField, serializers.ChoiceField, serializers.HiddenField)):
+        return value_type
+    return None
+
+
+def get_values_arrow_types(queryset:QuerySet) -> dict[str, Any]:
+    """
+    Returns:
+        dict[str, pyarrow.DataType | None]: The types of the columns of a values() queryset,
+        from the model fields and the output_field of the annotations.
+    """
+    query = queryset.query
+    types = {}
+    for name in query.values_select:
+        resolved = get_values_path(queryset.model, name.split(LOOKUP_SEP))
+        types[name] = get_model_field_arrow_type(resolved[1]) if resolved is not None else None
+    for name, annotation in query.annotation_select.items():
+        try:
+            output_field = annotation.output_field
+        except (AttributeError, FieldError):
+            output_field = None
+        types[name] = get_model_field_arrow_type(output_field)
+    return types
+
+
+def get_serializer_arrow_types(serializer:Any) -> dict[str, Any]:
+    """
+    Args:
+        serializer (SQLSerializer | ListSerializer): The export serializer with the queryset (many=True).
+
+    Returns:
+        dict[str, pyarrow.DataType | None]: The types of the columns of the serializer,
+        None for the ones that are inferred from the rows (method fields).
+    """
+    if isinstance(serializer, ValuesSerializer):
+        types = get_values_arrow_types(serializer.get_values_queryset())
+        for column, formatter in serializer.formatters.items():
+            # The formatters are the to_representation of the DRF fields
+            field = getattr(formatter, "__self__", None)
+            if isinstance(field, serializers.Field):
+                types[column] = get_serializer_field_arrow_type(field, types.get(column))
+        return types
+    if isinstance(serializer, SQLSerializer):
+        return get_values_arrow_types(serializer.data)
+
+    child = serializer.child
+    model = child.Meta.model
+    types = {}
+    for name, field in child.fields.items():
+        resolved = get_values_path(model, list(field.source_attrs)) if field.source != "*" else None
+        value_type = get_model_field_arrow_type(resolved[1]) if resolved is not None else None
+        types[name] = get_serializer_field_arrow_type(field, value_type)
+    return types
+
+
+# ============== Files
+def get_arrow_schema(rows:list[dict], columns:list[str], null_as_string:bool = True, types:dict[str, Any] | None = None) -> Any:
+    """
+    Builds the schema with the known types of the columns, only the columns without
+    type (method fields) are inferred from the first row group. The inferred columns
+    without values in it (null type) are stored as strings if null_as_string.
+
+    Returns:
+        pyarrow.Schema: The schema of the file.
+    """
+    pa = import_pyarrow()
+    types = types or {}
+    inferred_columns = [column for column in columns if types.get(column) is None]
+    inferred = {}
+    if inferred_columns:
+        inferred = {
+            field.name: field.type
+            for field in pa.Table.from_pylist([{column: row.get(column) for column in inferred_columns} for row in rows]).schema
+        }
+    fields = []
+    for column in columns:
+        column_type = types.get(column)
+        if column_type is None:
+            column_type = inferred.get(column, pa.null())
+            if null_as_string and pa.types.is_null(column_type):
+                column_type = pa.string()
+        fields.append(pa.field(column, column_type))
+    return pa.schema(fields)
+
+
+def get_table(rows:list[dict], schema:Any) -> Any:
+    """
+    Returns:
+        pyarrow.Table: The rows with the types of the schema, the values of the string
+        columns that are not strings (UUID, IPs) are converted.
+    """
+    pa = import_pyarrow()
+    string_columns = [field.name for field in schema if pa.types.is_string(field.type)]
+    if string_columns:
+        for row in rows:
+            for column in string_columns:
+                value = row.get(column)
+                if value is not None and type(value) is not str:
+                    row[column] = str(value)
+    return pa.Table.from_pylist(rows, schema=schema)
+
+
+def iter_arrow_tables(chunks:Iterable[list[dict]], columns:list[str], rows_per_group:int, null_as_string:bool = True, types:dict[str, Any] | None = None) -> tuple[Any, Iterator[Any]]:
+    """
+    Returns:
+        tuple[pyarrow.Schema, Iterator[pyarrow.Table]]: The schema and the tables of every row group.
+    """
+    pa = import_pyarrow()
+    groups = iter_row_groups(chunks, rows_per_group)
+    first = next(groups, None)
+    if first is None:
+        return get_arrow_schema([], columns, null_as_string, types), iter(())
+    schema = get_arrow_schema(first, columns, null_as_string, types)
+
+    def tables() -> Iterator[Any]:
+        yield get_table(first, schema)
+        for group in groups:
+            yield get_table(group, schema)
+
+    return schema, tables()
+
+
+def write_parquet(chunks:Iterable[list[dict]], columns:list[str], output:IO[bytes], row_group_size:int, compression:str | None = "zstd", null_as_string:bool = True, types:dict[str, Any] | None = None) -> None:
+    """Writes the serialized chunks as a Parquet file, one row group of row_group_size rows at a time
+    """
+    pa = import_pyarrow()
+    schema, tables = iter_arrow_tables(chunks, columns, row_group_size, null_as_string, types)
+    with pa.parquet.ParquetWriter(output, schema, compression=compression) as writer:
+        for table in tables:
+            writer.write_table(table, row_group_size=row_group_size)
+
+
+def write_arrow(chunks:Iterable[list[dict]], columns:list[str], output:IO[bytes], batch_size:int, compression:str | None = "zstd", types:dict[str, Any] | None = None) -> None:
+    """Writes the serialized chunks as an Arrow IPC file (Feather v2), one record batch of batch_size rows at a time
+    """
+    pa = import_pyarrow()
+    schema, tables = iter_arrow_tables(chunks, columns, batch_size, types=types)
+    options = pa.ipc.IpcWriteOptions(compression=compression)
+    with pa.ipc.new_file(output, schema, options=options) as writer:
+        for table in tables:
+            writer.write_table(table, max_chunksize=batch_size)
+
+
+def merge_parquet_files(paths:list[str], columns:list[str], output:IO[bytes], compression:str | None = "zstd", types:dict[str, Any] | None = None) -> None:
+    """
+    Joins the Parquet files of the partitions of an export in order, one row group at a time.
+    The columns with known types have the same type in every partition. The inferred ones
+    (method fields) are unified (a column without values in a partition has the type of the others,
+    the integers and the floats are promoted) and every row group is cast to the result.
+    """
+    pa = import_pyarrow()
+    files = [pa.parquet.ParquetFile(path) for path in paths]
+    schemas = [file.schema_arrow for file in files if file.metadata.num_rows]
+    unified = pa.unify_schemas(schemas, promote_options="permissive") if schemas else pa.schema([])
+    types = types or {}
+    fields = []
+    for column in columns:
+        column_type = types.get(column)
+        if column_type is None:
+            index = unified.get_field_index(column)
+            column_type = unified.field(index).type if index >= 0 else pa.null()
+            if pa.types.is_null(column_type):
+                column_type = pa.string()
+        fields.append(pa.field(column, column_type))
+    schema = pa.schema(fields)
+
+    with pa.parquet.ParquetWriter(output, schema, compression=compression) as writer:
+        for file in files:
+            for index in range(file.num_row_groups):
+                writer.write_table(file.read_row_group(index).select(columns).cast(schema))
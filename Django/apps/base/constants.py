@@ -6,4 +6,8 @@ class nature_choices:
     EXTRANJERO = "E"
     JURIDICO = "J"
 
-DATETIME_FORMAT = "%d-%m-%Y %H:%M:%S"
\ No newline at end of file
+DATETIME_FORMAT = "%d-%m-%Y %H:%M:%S"
+
+# Limits of the xlsx files
+EXCEL_MAX_ROWS = 1_048_576
+EXCEL_MAX_SHEETNAME_LENGTH = 31
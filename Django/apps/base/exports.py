@@ -0,0 +1,190 @@
+import tempfile
+from datetime import timedelta
+from typing import IO, Any, Iterator
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.db import router, transaction
+from django.http import HttpRequest, QueryDict
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from rest_framework.request import Request
+from apps.base.models import ExportJob
+from apps.base.utils import get_viewset_path
+from core.routers import use_replica
+
+# Query param of download_report that generates the report in a Celery worker
+ASYNC_EXPORT_QUERY_PARAM = "async"
+
+
+def get_active_jobs_count(user:Any, using:str | None = None) -> int:
+    """
+    Args:
+        user (Any): The user of the jobs.
+        using (str | None, optional): The database to count on. Defaults to the read database.
+
+    Returns:
+        int: The jobs of the user that are pending or running
+    """
+    if user is None or not user.is_authenticated:
+        return 0
+    return ExportJob.objects.using(using).filter(user=user, state__in=ExportJob.ACTIVE_STATES).count()
+
+
+def create_export_job(view:Any, request:Request, file_format:str) -> ExportJob | None:
+    """
+    Stores the job and sends it to the workers once the transaction is committed.
+
+    The count of the active jobs and the insert run in one transaction on the primary,
+    with the row of the user locked, so concurrent requests of the same user can't
+    exceed EXPORT_JOBS_MAX_PER_USER and a lagging replica can't hide a job.
+
+    Args:
+        view (ReportViewMixin): The viewset of the report.
+        request (Request): The request of download_report, its query params are the filters.
+        file_format (str): The format of the report (csv, excel...).
+
+    Returns:
+        ExportJob | None: The pending job, None if the user already has EXPORT_JOBS_MAX_PER_USER jobs pending or running.
+    """
+    from apps.base.tasks import run_export_job_task
+
+    user = request.user
+    query_params = {
+        key: values for key, values in request.query_params.lists() if key != ASYNC_EXPORT_QUERY_PARAM
+    }
+    using = router.db_for_write(ExportJob)
+    with transaction.atomic(using=using):
+        get_user_model()._base_manager.using(using).select_for_update().filter(pk=user.pk).values_list("pk").first()
+        if get_active_jobs_count(user, using) >= settings.EXPORT_JOBS_MAX_PER_USER:
+            return None
+        job = ExportJob.objects.using(using).create(
+            user=user,
+            viewset=get_viewset_path(type(view)),
+            query_params=query_params,
+            file_format=file_format,
+            expires_date=timezone.now() + timedelta(hours=settings.EXPORT_JOBS_TTL_HOURS),
+        )
+        transaction.on_commit(lambda: run_export_job_task.delay(str(job.pk)), using=using)
+    return job
+
+
+def build_report_view(viewset_path:str, query_params:dict[str, list[str]], user:Any = None) -> Any:
+    """
+    Builds the viewset of a report outside of a request (workers, processes), with a GET
+    request with the query params and the user, like the router does for download_report.
+
+    Args:
+        viewset_path (str): Import path of the viewset.
+        query_params (dict[str, list[str]]): The query params, a list of values per key.
+        user (Any, optional): The user of the request. Defaults to AnonymousUser.
+
+    Returns:
+        ReportViewMixin: The viewset ready to call get_export_queryset and the generate_<format>_file methods.
+    """
+    viewset_class = import_string(viewset_path)
+    params = QueryDict(mutable=True)
+    for key, values in query_params.items():
+        params.setlist(key, values)
+
+    http_request = HttpRequest()
+    http_request.method = "GET"
+    http_request.GET = params
+    http_request.META = {"SERVER_NAME": "localhost", "SERVER_PORT": "80"}
+
+    view = viewset_class(action_map={"get": "download_report"})
+    view.args = ()
+    view.kwargs = {}
+    view.format_kwarg = None
+    view.headers = {}
+    request = view.initialize_request(http_request)
+    request.user = user or AnonymousUser()
+    view.request = request
+    return view
+
+
+def build_export_view(job:ExportJob) -> Any:
+    """
+    Returns:
+        ReportViewMixin: The viewset of the job with its query params and user.
+    """
+    return build_report_view(job.viewset, job.query_params, job.user)
+
+
+def write_export_file(file_data:bytes | str | Iterator | IO[bytes]) -> File:
+    """
+    Returns:
+        File: The output of a generate_<format>_file method as a file for the storage,
+        the iterators are written to a temporary file.
+    """
+    if isinstance(file_data, bytes):
+        return ContentFile(file_data)
+    if isinstance(file_data, str):
+        return ContentFile(file_data.encode())
+    if hasattr(file_data, "read"):
+        return File(file_data)
+
+    output = tempfile.TemporaryFile()
+    for part in file_data:
+        output.write(part.encode() if isinstance(part, str) else part)
+    output.seek(0)
+    return File(output)
+
+
+def run_export_job(job_id:str) -> ExportJob | None:
+    """
+    Generates the report of a pending job with the exporters of its viewset and stores the file.
+    The job is claimed with one UPDATE, so a task delivered twice generates it once.
+
+    Returns:
+        ExportJob | None: The finished job, None if it was not pending.
+    """
+    claimed = ExportJob.objects.filter(pk=job_id, state=ExportJob.PENDING).update(
+        state=ExportJob.RUNNING, started_date=timezone.now(),
+    )
+    if not claimed:
+        return None
+
+    job = ExportJob.objects.select_related("user").get(pk=job_id)
+    try:
+        view = build_export_view(job)
+        view.current_export_job = job
+        with use_replica():
+            data, status_code = view.get_export_queryset(view.request)
+            if status_code >= 400:
+                raise ValueError(data.get("message", data) if isinstance(data, dict) else data)
+            generate_file = getattr(view, "generate_%s_file" % job.file_format)
+            file_data, filename = generate_file(data)
+            export_file = write_export_file(file_data)
+        with export_file:
+            job.file.save("%s.%s" % (filename, view.get_file_extension(job.file_format)), export_file, save=False)
+        job.state = ExportJob.DONE
+    except Exception as err:
+        job.state = ExportJob.FAILED
+        job.error = str(err)[:2000]
+    job.finished_date = timezone.now()
+    job.save(update_fields=["state", "file", "error", "finished_date"])
+    return job
+
+
+def cleanup_export_jobs() -> tuple[int, int]:
+    """
+    Marks the running jobs older than EXPORT_JOBS_STALE_MINUTES as failed (their worker died)
+    and deletes the expired jobs with their files.
+
+    Returns:
+        tuple[int, int]: The stale jobs and the deleted jobs.
+    """
+    now = timezone.now()
+    stale = ExportJob.objects.filter(
+        state=ExportJob.RUNNING,
+        started_date__lt=now - timedelta(minutes=settings.EXPORT_JOBS_STALE_MINUTES),
+    ).update(state=ExportJob.FAILED, error="The worker didn't finish the job", finished_date=now)
+
+    deleted = 0
+    for job in ExportJob.objects.filter(expires_date__lt=now).iterator():
+        job.delete()
+        deleted += 1
+    return stale, deleted
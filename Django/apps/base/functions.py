@@ -0,0 +1,52 @@
+from typing import Any
+from django.db.models import CharField, Func
+
+MONTHS = (
+    "january", "february", "march", "april", "may", "june",
+    "july", "august", "september", "october", "november", "december",
+)
+
+
+class PrettyDateTime(Func):
+    """
+    Formats a date or datetime in the database with the same format than
+    GenericReadOnlySerializer._format_datetime and _format_date:
+    - "12 of june 2024 at 12:00 hours"
+    - "12 of june 2024" (with_time=False)
+
+    The datetimes are formatted in the timezone of the database connection (UTC with USE_TZ),
+    the same timezone of the values that Python receives.
+    Postgres and Oracle use to_char, MySQL date_format and SQLite strftime.
+    """
+    arity = 1
+    output_field = CharField()
+
+    TO_CHAR_FORMATS = ('DD "of" FMmonth YYYY', 'DD "of" FMmonth YYYY "at" HH24:MI "hours"')
+    DATE_FORMAT_FORMATS = ("%d of %M %Y", "%d of %M %Y at %H:%i hours")
+
+    def __init__(self, expression:Any, with_time:bool = True, **extra) -> None:
+        self.with_time = with_time
+        super().__init__(expression, **extra)
+
+    def as_sql(self, compiler, connection, **extra_context):
+        sql, params = compiler.compile(self.source_expressions[0])
+        return "TO_CHAR(%s, %%s)" % sql, (*params, self.TO_CHAR_FORMATS[self.with_time])
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        sql, params = compiler.compile(self.source_expressions[0])
+        return "LOWER(DATE_FORMAT(%s, %%s))" % sql, (*params, self.DATE_FORMAT_FORMATS[self.with_time])
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        sql, params = compiler.compile(self.source_expressions[0])
+        sql_params = []
+
+        def strftime(format:str) -> str:
+            # The formats go as params because they have "%"
+            sql_params.extend((format, *params))
+            return "STRFTIME(%%s, %s)" % sql
+
+        month_cases = " ".join("WHEN '%02d' THEN '%s'" % (number, month) for number, month in enumerate(MONTHS, start=1))
+        parts = [strftime("%d"), "' of '", "CASE %s %s END" % (strftime("%m"), month_cases), "' '", strftime("%Y")]
+        if self.with_time:
+            parts.extend(["' at '", strftime("%H:%M"), "' hours'"])
+        return "(%s)" % " || ".join(parts), tuple(sql_params)
@@ -0,0 +1,76 @@
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.db import DEFAULT_DB_ALIAS, connections
+from apps.base.search.full_text import SearchIndexManager, get_full_text_search_targets
+
+
+class Command(BaseCommand):
+    help = (
+        "Builds the GIN full text and trigram indexes for the viewsets "
+        "that use the FullTextSearchFilter, based on their search_fields"
+    )
+
+    def add_arguments(self, parser:CommandParser) -> None:
+        parser.add_argument(
+            "--rebuild", action="store_true",
+            help="Drops the existing search indexes of every model and creates them again",
+        )
+        parser.add_argument(
+            "--concurrently", action="store_true",
+            help="Creates the indexes with CREATE INDEX CONCURRENTLY to avoid locking the tables",
+        )
+        parser.add_argument(
+            "--model", action="append", default=[],
+            help="Only builds the indexes of this model (app_label.ModelName), can be repeated",
+        )
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS, help="Database alias. Defaults to 'default'")
+
+    def handle(self, *args, **options) -> None:
+        connection = connections[options["database"]]
+        if connection.vendor != "postgresql":
+            raise CommandError("The full text search indexes are only available on PostgreSQL")
+
+        targets = get_full_text_search_targets()
+        if options["model"]:
+            targets = [target for target in targets if target[0]._meta.label in options["model"]]
+        if not targets:
+            self.stdout.write(self.style.WARNING("No viewsets with FullTextSearchFilter and search_fields were found"))
+            return
+
+        with connection.cursor() as cursor:
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+        concurrently:bool = options["concurrently"]
+        # CREATE INDEX CONCURRENTLY can't run inside a transaction
+        with connection.schema_editor(atomic=not concurrently) as schema_editor:
+            for model, search_fields, config in targets:
+                self.build_model_indexes(schema_editor, SearchIndexManager(model, search_fields, config), options["rebuild"], concurrently)
+
+    def build_model_indexes(self, schema_editor, index_manager:SearchIndexManager, rebuild:bool, concurrently:bool) -> None:
+        """Creates the missing indexes of the model and drops the ones that
+        belong to old search_fields (or all of them if rebuild is True)
+        """
+        model = index_manager.model
+        connection = schema_editor.connection
+        with connection.cursor() as cursor:
+            existing = set(connection.introspection.get_constraints(cursor, model._meta.db_table))
+
+        indexes = index_manager.get_indexes()
+        expected = {index.name for index in indexes}
+        prefixes = index_manager.get_index_prefixes()
+
+        for name in sorted(existing):
+            if name.startswith(prefixes) and (rebuild or name not in expected):
+                schema_editor.execute("DROP INDEX %sIF EXISTS %s" % (
+                    "CONCURRENTLY " if concurrently else "", schema_editor.quote_name(name)
+                ))
+                existing.discard(name)
+                self.stdout.write("  Dropped %s" % name)
+
+        for index in indexes:
+            if index.name in existing:
+                self.stdout.write("  %s already exists" % index.name)
+                continue
+            schema_editor.add_index(model, index, concurrently=concurrently)
+            self.stdout.write("  Created %s" % index.name)
+
+        self.stdout.write(self.style.SUCCESS("Search indexes of %s are ready" % model._meta.label))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from apps.base.exports import cleanup_export_jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes the expired export jobs with their files and marks the stale running ones "
+        "as failed. The Celery beat runs it every hour, use it without the beat (cron)"
+    )
+
+    def handle(self, *args, **options) -> None:
+        stale, deleted = cleanup_export_jobs()
+        self.stdout.write("  %s stale jobs marked as failed" % stale)
+        self.stdout.write(self.style.SUCCESS("%s expired export jobs deleted" % deleted))
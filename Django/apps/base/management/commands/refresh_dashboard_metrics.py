@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandParser
+from apps.base.metrics import metrics_registry, refresh_metrics
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the dashboard metrics from the database. The counts are kept up to date "
+        "by the saves, run it on a schedule (cron) for the metrics with a custom aggregate "
+        "and to correct any drift"
+    )
+
+    def add_arguments(self, parser:CommandParser) -> None:
+        parser.add_argument(
+            "--metric", action="append", default=[],
+            help="Only recomputes this metric, can be repeated",
+        )
+
+    def handle(self, *args, **options) -> None:
+        if not metrics_registry.get_all():
+            self.stdout.write(self.style.WARNING("No dashboard metrics are registered"))
+            return
+
+        for name, value in refresh_metrics(options["metric"]).items():
+            self.stdout.write("  %s = %s" % (name, value))
+        self.stdout.write(self.style.SUCCESS("Dashboard metrics are up to date"))
@@ -1,5 +1,8 @@
 from typing import Any, Iterable
+from django.db.models import Q, QuerySet
 from django.db.models.manager import Manager
+from apps.base.metrics import refresh_model_metrics
+from apps.base.search.autocomplete import AutocompleteIndex
 
 class BaseManager(Manager):
     """
@@ -11,44 +14,58 @@ class BaseManager(Manager):
         """
         return self.model.deactivated_status
     
+    def get_active_condition(self) -> Q:
+        """
+        Returns the condition of the NOT deleted objects, the same one that
+        the partial indexes of ActiveObjectsMixin use, so the database can match them
+        """
+        deactivated_status = self._get_deactivated_status()
+        if isinstance(deactivated_status, bool):
+            return Q(status=not deactivated_status)
+        return ~Q(status=deactivated_status)
+    
     def active_objects(self):
         """
         returns a queryset of all NOT deleted objects
         """
-        return self.get_queryset().exclude(status=self._get_deactivated_status())
+        return self.get_queryset().filter(self.get_active_condition())
     
-    def create(self, **kwargs: Any) -> Any:
-        response = super().create(**kwargs)
-        response.clear_cache()
-        return response
+    # create, get_or_create and update_or_create call Model.save, that already clears the cache
     
     def delete(self, *args, **kwargs) -> tuple[int, dict[str, int]]:
         response = super().delete(*args, **kwargs)
         self.model.clear_cache()
+        AutocompleteIndex.invalidate(self.model)
+        refresh_model_metrics(self.model)
         return response
     
     def update(self, *args, **kwargs) -> int:
         response = super().update(*args, **kwargs)
         self.model.clear_cache()
+        AutocompleteIndex.invalidate(self.model)
+        refresh_model_metrics(self.model)
         return response
 
     def bulk_create(self, objs: Iterable[Any], *args, **kwargs) -> list[Any]:
         response = super().bulk_create(objs, *args, **kwargs)
         self.model.clear_cache()
+        AutocompleteIndex.index_instances(self.model, response)
+        refresh_model_metrics(self.model)
         return response
     
     def bulk_update(self, objs: Iterable[Any], fields: Iterable[str], *args, **kwargs) -> list[Any]:
+        objs = list(objs)
         response = super().bulk_update(objs, fields, *args, **kwargs)
         self.model.clear_cache()
+        AutocompleteIndex.index_instances(self.model, objs)
+        refresh_model_metrics(self.model)
         return response
 
-    def get_or_create(self, **kwargs: Any) -> tuple[Any, bool]:
-        response, created = super().get_or_create(**kwargs)
-        if created:
-            response.clear_cache()
-        return response, created
-    
-    def update_or_create(self, **kwargs: Any) -> tuple[Any, bool]:
-        response = super().update_or_create(**kwargs)
-        self.model.clear_cache()
-        return response
+
+class ActiveManager(BaseManager):
+    """
+    Manager that only returns the NOT deleted objects,
+    used as the default manager ("objects") of the ActiveObjectsMixin models
+    """
+    def get_queryset(self) -> QuerySet:
+        return super().get_queryset().filter(self.get_active_condition())
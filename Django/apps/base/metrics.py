@@ -0,0 +1,252 @@
+from decimal import Decimal
+from functools import partial
+from typing import Any, Callable
+from django.apps import apps
+from django.db import transaction
+from django.db.models import F, Model, QuerySet
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+
+
+class Metric:
+    """
+    A number of the admin dashboard, stored precomputed in the DashboardMetric table.
+
+    - Without aggregate the metric counts the rows of the model that match the filters.
+      If all the filters are equalities ({"status": "P"}) the value is updated
+      incrementally (+1 / -1) on every save and delete, comparing the values loaded from
+      the database (DirtyFieldsMixin) with the saved ones. Otherwise it's recomputed
+      after the transaction.
+    - With aggregate (a function queryset -> number) it's only recomputed by the
+      refresh_dashboard_metrics command, that can run on a schedule.
+
+    Args:
+        name (str): Unique name, the key of the value in the dashboard context.
+        model (str): Label of the model, "users.User".
+        label (str, optional): Text of the dashboard. Defaults to the name.
+        filters (dict[str, Any], optional): Filters of the counted rows. Defaults to all the rows.
+        aggregate (Callable[[QuerySet], Any], optional): Custom computation. Defaults to count().
+        icon (str, optional): Material icon of the dashboard card.
+    """
+    def __init__(
+            self,
+            name:str,
+            model:str,
+            label:str | None = None,
+            filters:dict[str, Any] | None = None,
+            aggregate:Callable[[QuerySet], Any] | None = None,
+            icon:str | None = None,
+        ) -> None:
+        self.name = name
+        self.model_label = model
+        self.label = label or name
+        self.filters = filters or {}
+        self.aggregate = aggregate
+        self.icon = icon
+
+    @property
+    def model(self) -> Model.__class__:
+        return apps.get_model(self.model_label)
+
+    @property
+    def is_incremental(self) -> bool:
+        return self.aggregate is None and all("__" not in key for key in self.filters)
+
+    def get_queryset(self) -> QuerySet:
+        return self.model._base_manager.filter(**self.filters)
+
+    def compute(self) -> Decimal:
+        if self.aggregate is not None:
+            value = self.aggregate(self.get_queryset())
+        else:
+            value = self.get_queryset().count()
+        return Decimal(value or 0)
+
+    def get_filter_attnames(self) -> dict[str, Any]:
+        """
+        Returns:
+            dict[str, Any]: attname -> value of the filters, "user" -> "user_id"
+        """
+        return {self.model._meta.get_field(key).attname: value for key, value in self.filters.items()}
+
+    def matches(self, values:dict[str, Any]) -> bool | None:
+        """
+        Args:
+            values (dict[str, Any]): attname -> value of a row.
+
+        Returns:
+            bool | None: If the row is counted, None if a filtered field is not in the values
+        """
+        filters = self.get_filter_attnames()
+        if any(attname not in values for attname in filters):
+            return None
+        return all(values[attname] == value for attname, value in filters.items())
+
+
+class MetricsRegistry:
+    """Metrics registered by the apps, usually in AppConfig.ready
+    """
+    def __init__(self) -> None:
+        self.metrics:dict[str, Metric] = {}
+
+    def register(self, metric:Metric) -> Metric:
+        self.metrics[metric.name] = metric
+        # Only the models with metrics have receivers, the rest can be saved in bulk
+        post_save.connect(
+            update_metrics_on_save, sender=metric.model_label,
+            dispatch_uid=f"dashboard_metrics_post_save_{metric.model_label}",
+        )
+        post_delete.connect(
+            update_metrics_on_delete, sender=metric.model_label,
+            dispatch_uid=f"dashboard_metrics_post_delete_{metric.model_label}",
+        )
+        return metric
+
+    def get(self, name:str) -> Metric | None:
+        return self.metrics.get(name)
+
+    def get_all(self) -> list[Metric]:
+        return list(self.metrics.values())
+
+    def get_model_metrics(self, model:Model.__class__) -> list[Metric]:
+        label = model._meta.label
+        return [metric for metric in self.metrics.values() if metric.model_label == label]
+
+
+metrics_registry = MetricsRegistry()
+
+
+def register_metric(*args, **kwargs) -> Metric:
+    """Registers a Metric, same arguments than Metric
+    """
+    return metrics_registry.register(Metric(*args, **kwargs))
+
+
+def get_metric_model() -> Model.__class__:
+    # Lazy, the managers of apps.base.models import this module
+    return apps.get_model("base", "DashboardMetric")
+
+
+# ============== Maintenance
+def refresh_metric(metric:Metric) -> Decimal:
+    """Computes the metric and stores its value
+    """
+    value = metric.compute()
+    get_metric_model().objects.update_or_create(
+        name=metric.name,
+        defaults={"value": value, "updated_date": timezone.now()},
+    )
+    return value
+
+
+def refresh_metrics(names:list[str] | None = None) -> dict[str, Decimal]:
+    """
+    Args:
+        names (list[str] | None, optional): Only these metrics. Defaults to all of them.
+
+    Returns:
+        dict[str, Decimal]: name -> new value
+    """
+    metrics = metrics_registry.get_all()
+    if names:
+        metrics = [metric for metric in metrics if metric.name in names]
+    return {metric.name: refresh_metric(metric) for metric in metrics}
+
+
+def apply_delta(metric:Metric, delta:int) -> None:
+    """Adds the delta to the stored value with one UPDATE, if it was never computed it's computed now
+    """
+    updated = get_metric_model().objects.filter(name=metric.name).update(
+        value=F("value") + delta, updated_date=timezone.now(),
+    )
+    if not updated:
+        refresh_metric(metric)
+
+
+def refresh_model_metrics(model:Model.__class__) -> None:
+    """Recomputes the metrics of a model once the transaction is committed,
+    used after the operations that can't be tracked row by row (QuerySet.update, bulk_create)
+    """
+    for metric in metrics_registry.get_model_metrics(model):
+        if metric.aggregate is None:
+            transaction.on_commit(partial(refresh_metric, metric))
+
+
+# ============== Incremental updates
+def get_row_values(instance:Model) -> dict[str, Any]:
+    deferred = instance.get_deferred_fields()
+    return {
+        field.attname: getattr(instance, field.attname)
+        for field in instance._meta.concrete_fields if field.attname not in deferred
+    }
+
+
+def update_metrics_on_save(sender:Model.__class__, instance:Model, created:bool, **kwargs) -> None:
+    if kwargs.get("raw"):
+        return
+    metrics = metrics_registry.get_model_metrics(sender)
+    if not metrics:
+        return
+
+    current = get_row_values(instance)
+    # Values loaded from the database, DirtyFieldsMixin updates them after post_save
+    get_loaded_values = getattr(instance, "get_loaded_values", None)
+    previous = None if created or get_loaded_values is None else get_loaded_values()
+    for metric in metrics:
+        if metric.aggregate is not None:
+            continue
+        if not metric.is_incremental:
+            transaction.on_commit(partial(refresh_metric, metric))
+            continue
+        now_matches = metric.matches(current)
+        before_matches = False if created else (metric.matches(previous) if previous is not None else None)
+        if now_matches is None or before_matches is None:
+            transaction.on_commit(partial(refresh_metric, metric))
+            continue
+        delta = int(now_matches) - int(before_matches)
+        if delta:
+            transaction.on_commit(partial(apply_delta, metric, delta))
+
+
+def update_metrics_on_delete(sender:Model.__class__, instance:Model, **kwargs) -> None:
+    metrics = metrics_registry.get_model_metrics(sender)
+    if not metrics:
+        return
+
+    current = get_row_values(instance)
+    for metric in metrics:
+        if metric.aggregate is not None:
+            continue
+        matches = metric.matches(current) if metric.is_incremental else None
+        if matches is None:
+            transaction.on_commit(partial(refresh_metric, metric))
+        elif matches:
+            transaction.on_commit(partial(apply_delta, metric, -1))
+
+
+# ============== Dashboard
+def get_dashboard_metrics() -> list[dict[str, Any]]:
+    """
+    Reads the stored values of all the metrics in one query,
+    the metrics that were never computed are computed now (only the first time).
+
+    Returns:
+        list[dict[str, Any]]: {"name", "label", "icon", "value", "updated_date"} of every metric
+    """
+    metrics = metrics_registry.get_all()
+    stored = {
+        row.name: row for row in
+        get_metric_model().objects.filter(name__in=[metric.name for metric in metrics])
+    }
+    results = []
+    for metric in metrics:
+        row = stored.get(metric.name)
+        value = row.value if row is not None else refresh_metric(metric)
+        results.append({
+            "name": metric.name,
+            "label": metric.label,
+            "icon": metric.icon,
+            "value": int(value) if value == value.to_integral_value() else value,
+            "updated_date": row.updated_date if row is not None else timezone.now(),
+        })
+    return results
@@ -1,11 +1,18 @@
-from typing import Iterable
+import copy
+import hashlib
+import uuid
+from typing import Any, Iterable
+from django.conf import settings
 from django.db import models
+from django.db.models.signals import class_prepared, pre_save
+from django.dispatch import receiver
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
 from phonenumber_field.modelfields import PhoneNumberField
 
 from apps.base.cache.base_manager import CacheManager
-from apps.base.managers import BaseManager
+from apps.base.managers import ActiveManager, BaseManager
+from apps.base.search.autocomplete import AutocompleteIndex
 # Create your models here.
 
 class CacheMixin(models.Model):
@@ -18,6 +25,7 @@ class CacheMixin(models.Model):
     def save(self, *args, **kwargs) -> None:
         response = super().save(*args, **kwargs)
         self.clear_cache()
+        AutocompleteIndex.index_instances(type(self), [self])
         return response
     
     # Cache Manager properties
@@ -35,6 +43,116 @@ class CacheMixin(models.Model):
         cache_manager.clear_cache_pattern(pattern=cache_manager.get_model_cache_pattern())
     
 
+class DirtyFieldsMixin(models.Model):
+    """
+    Mixin that keeps the values of the fields loaded from the database,
+    so save() only writes the columns that changed (update_fields).
+    A save without changes doesn't run the UPDATE nor clears the cache.
+    
+    The changed fields are computed in save_base, after the save() overrides,
+    the models with pre_save receivers save all the fields (a receiver can change any of them).
+    The new instances, the instances with a new pk and the saves with
+    explicit update_fields work as always.
+    
+    Every loaded instance keeps a reference to its row (the values are not copied, only
+    the JSON ones) and the dict of loaded values is built the first time it's needed.
+    Set track_dirty_fields = False in models that are only read in bulk.
+    """
+    track_dirty_fields:bool = True
+    _loaded_row:tuple[list[str], tuple] | None = None
+    _loaded_values:dict[str, Any] | None = None
+    _save_dirty_fields:bool = False
+    
+    class Meta:
+        abstract = True
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if cls.track_dirty_fields:
+            # The mutable values (JSON) are copied, the instance can change them in place
+            if any(isinstance(value, (dict, list)) for value in values):
+                values = tuple(copy.deepcopy(value) if isinstance(value, (dict, list)) else value for value in values)
+            instance._loaded_row = (field_names, values)
+        return instance
+    
+    def refresh_from_db(self, *args, **kwargs) -> None:
+        super().refresh_from_db(*args, **kwargs)
+        if self.track_dirty_fields:
+            self.reset_loaded_values()
+    
+    def _get_field_values(self) -> dict[str, Any]:
+        """
+        Returns:
+            dict[str, Any]: attname -> value of the loaded concrete fields, the mutable values (JSON) are copied
+        """
+        deferred = self.get_deferred_fields()
+        return {
+            field.attname: copy.deepcopy(value) if isinstance(value, (dict, list)) else value
+            for field in self._meta.concrete_fields
+            if field.attname not in deferred
+            for value in (getattr(self, field.attname),)
+        }
+    
+    def reset_loaded_values(self) -> None:
+        self._loaded_row, self._loaded_values = None, self._get_field_values()
+    
+    def get_loaded_values(self) -> dict[str, Any] | None:
+        """
+        Returns:
+            dict[str, Any] | None: attname -> value of the fields loaded from the database,
+            None if the instance was not loaded from the database
+        """
+        if self._loaded_row is not None:
+            field_names, values = self._loaded_row
+            self._loaded_row, self._loaded_values = None, dict(zip(field_names, values))
+        return self._loaded_values
+    
+    def get_dirty_fields(self) -> list[str] | None:
+        """
+        Returns:
+            list[str] | None: Names of the fields that changed since they were loaded,
+            None if the instance was not loaded from the database (all the fields must be saved)
+        """
+        loaded_values = self.get_loaded_values()
+        if loaded_values is None or self._state.adding:
+            return None
+        pk_attname = self._meta.pk.attname
+        if loaded_values.get(pk_attname) != getattr(self, pk_attname):
+            return None
+        deferred = self.get_deferred_fields()
+        # The deferred fields that were assigned after the load count as changed
+        return [
+            field.name for field in self._meta.concrete_fields
+            if field.attname not in deferred and (
+                field.attname not in loaded_values or loaded_values[field.attname] != getattr(self, field.attname)
+            )
+        ]
+    
+    def save(self, *args, **kwargs) -> None:
+        save_dirty_fields = kwargs.get("update_fields") is None and not kwargs.get("force_insert") and not args
+        if save_dirty_fields and self.get_dirty_fields() == [] and not pre_save.has_listeners(type(self)):
+            return
+        self._save_dirty_fields = save_dirty_fields
+        try:
+            return super().save(*args, **kwargs)
+        finally:
+            self._save_dirty_fields = False
+    
+    def save_base(self, raw=False, force_insert=False, force_update=False, using=None, update_fields=None) -> None:
+        # Django passes the loaded fields as update_fields when some are deferred, only the changed ones are written
+        if self._save_dirty_fields and not raw and not pre_save.has_listeners(type(self)):
+            dirty_fields = self.get_dirty_fields()
+            if dirty_fields is not None:
+                if not dirty_fields:
+                    return
+                auto_now_fields = [field.name for field in self._meta.concrete_fields if getattr(field, "auto_now", False)]
+                update_fields = {*dirty_fields, *auto_now_fields}
+        super().save_base(raw=raw, force_insert=force_insert, force_update=force_update, using=using, update_fields=update_fields)
+        if self.track_dirty_fields:
+            self.reset_loaded_values()
+
+
 class StatusMixin(CacheMixin):
     
     deactivated_status = False
@@ -56,6 +174,81 @@ class StatusMixin(CacheMixin):
 
 
 
+class ActiveObjectsMixin(StatusMixin):
+    """
+    Mixin for StatusMixin models where the deleted rows are only kept for history.
+    
+    - objects only returns the active rows (ActiveManager), so the viewsets, the serializers
+      and the reverse relations don't read the dead rows
+    - all_objects returns every row, use it for reports, restores and the admin
+    - Partial indexes restricted to the active rows are added to the Meta.indexes
+      for the pk, created_date (if the model has it) and the active_index_fields,
+      makemigrations creates them like any other index
+    
+    It must be the first base so its managers are the default ones:
+    class Invoice(ActiveObjectsMixin, BaseModel)
+    
+    Remember that the validators of the serializers (UniqueValidator) use the default manager,
+    a unique field of a deleted row can still fail in the database.
+    """
+    objects = ActiveManager()
+    all_objects = BaseManager()
+    
+    # Fields (or tuples of fields for composite indexes) of the hot lookups, "-field" for descending
+    active_index_fields:tuple[str | tuple[str, ...], ...] = ()
+    
+    class Meta:
+        abstract = True
+    
+    @classmethod
+    def get_active_index_fields(cls) -> list[tuple[str, ...]]:
+        """
+        Returns:
+            list[tuple[str, ...]]: The fields of every partial index
+        """
+        field_names = {field.name for field in cls._meta.concrete_fields}
+        index_fields = [(cls._meta.pk.name,)]
+        if "created_date" in field_names:
+            index_fields.append(("-created_date",))
+        for fields in cls.active_index_fields:
+            fields = (fields,) if isinstance(fields, str) else tuple(fields)
+            if fields not in index_fields:
+                index_fields.append(fields)
+        return index_fields
+    
+    @classmethod
+    def get_active_index_name(cls, fields:tuple[str, ...]) -> str:
+        """
+        Returns:
+            str: Name of a partial index, Index names are limited to 30 characters
+        """
+        digest = hashlib.md5(("%s:%s" % (cls._meta.db_table, ",".join(fields))).encode()).hexdigest()[:8]
+        return "%s_%s_act" % (cls._meta.db_table[:17].rstrip("_"), digest)
+    
+    @classmethod
+    def get_active_indexes(cls) -> list[models.Index]:
+        condition = cls._default_manager.get_active_condition()
+        return [
+            models.Index(fields=list(fields), name=cls.get_active_index_name(fields), condition=condition)
+            for fields in cls.get_active_index_fields()
+        ]
+
+
+@receiver(class_prepared)
+def add_active_indexes(sender:type[models.Model], **kwargs) -> None:
+    """Adds the partial indexes of the active rows to the ActiveObjectsMixin models
+    """
+    if not issubclass(sender, ActiveObjectsMixin) or sender._meta.abstract or sender._meta.proxy:
+        return
+    existing = {index.name for index in sender._meta.indexes}
+    # A new list, the Meta of the abstract parents can share it
+    sender._meta.indexes = [
+        *sender._meta.indexes,
+        *(index for index in sender.get_active_indexes() if index.name not in existing),
+    ]
+
+
+
 
 class PersonModelMixin(CacheMixin):
     """Mixin made for Models based on persons.
@@ -198,7 +391,7 @@ class RegisterDatesMixin(CacheMixin):
         verbose_name = 'RegisterDate'
         verbose_name_plural = 'RegisterDates'
 
-class BaseModel(StatusMixin, RegisterDatesMixin, CacheMixin,):
+class BaseModel(DirtyFieldsMixin, StatusMixin, RegisterDatesMixin, CacheMixin,):
     """
     Base ABSTRACT model that adds the following features:
     - deactivated_status (specifies what is the data type of Deactivated record)
@@ -209,6 +402,7 @@ class BaseModel(StatusMixin, RegisterDatesMixin, CacheMixin,):
     - changed_by (Especifica quien fue el ultimo ent ocar el registro) (OBLIGATORIO)
     
     - Save method overrided to clear chache on every save
+    - Save method only writes the changed fields (DirtyFieldsMixin)
     - Delete methos overrided to not delete but change status to deleted status (_deactivated_status property)
     
     """
@@ -247,3 +441,104 @@ class BaseModel(StatusMixin, RegisterDatesMixin, CacheMixin,):
         verbose_name = _("Base model")
         verbose_name_plural = _("Base models")
 
+
+
+class DashboardMetric(models.Model):
+    """
+    Precomputed value of a dashboard metric (see apps.base.metrics),
+    so the admin dashboard reads all of them in one query instead of counting the tables
+    """
+    name = models.CharField(
+            max_length=100,
+            unique=True,
+            verbose_name=_("Name"),
+            help_text=_("The name of the registered metric"),
+        )
+    value = models.DecimalField(
+            max_digits=20,
+            decimal_places=4,
+            default=0,
+            verbose_name=_("Value"),
+        )
+    updated_date = models.DateTimeField(
+            default=timezone.now,
+            verbose_name=_("Updated date"),
+            help_text=_("The last time the value was computed or changed"),
+        )
+    
+    def __str__(self) -> str:
+        return f"{self.name}: {self.value}"
+    
+    class Meta:
+        verbose_name = _("Dashboard metric")
+        verbose_name_plural = _("Dashboard metrics")
+
+
+class ExportJob(models.Model):
+    """
+    Report of a ReportViewMixin generated by a Celery worker (download_report with "?async=true"),
+    the client polls the status and downloads the file when it's done.
+    The id is a UUID so the jobs can't be guessed, and the jobs are deleted with their file after expires_date.
+    """
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATE_CHOICES = (
+        (PENDING, _("Pending")),
+        (RUNNING, _("Running")),
+        (DONE, _("Done")),
+        (FAILED, _("Failed")),
+    )
+    ACTIVE_STATES = (PENDING, RUNNING)
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+            settings.AUTH_USER_MODEL,
+            on_delete=models.CASCADE,
+            null=True,
+            blank=True,
+            related_name="export_jobs",
+            verbose_name=_("User"),
+        )
+    viewset = models.CharField(
+            max_length=255,
+            verbose_name=_("Viewset"),
+            help_text=_("Import path of the viewset that generates the report"),
+        )
+    query_params = models.JSONField(
+            default=dict,
+            blank=True,
+            verbose_name=_("Query params"),
+            help_text=_("Filters of the report, the query params of the request"),
+        )
+    file_format = models.CharField(max_length=20, verbose_name=_("File format"))
+    state = models.CharField(
+            max_length=10,
+            choices=STATE_CHOICES,
+            default=PENDING,
+            db_index=True,
+            verbose_name=_("State"),
+        )
+    file = models.FileField(upload_to="exports/", null=True, blank=True, verbose_name=_("File"))
+    error = models.TextField(blank=True, default="", verbose_name=_("Error"))
+    created_date = models.DateTimeField(default=timezone.now, verbose_name=_("Created date"))
+    started_date = models.DateTimeField(null=True, blank=True, verbose_name=_("Started date"))
+    finished_date = models.DateTimeField(null=True, blank=True, verbose_name=_("Finished date"))
+    expires_date = models.DateTimeField(
+            db_index=True,
+            verbose_name=_("Expires date"),
+            help_text=_("The job and its file are deleted after this date"),
+        )
+    
+    def __str__(self) -> str:
+        return f"{self.viewset} ({self.file_format}): {self.state}"
+    
+    def delete(self, *args, **kwargs):
+        if self.file:
+            self.file.delete(save=False)
+        return super().delete(*args, **kwargs)
+    
+    class Meta:
+        verbose_name = _("Export job")
+        verbose_name_plural = _("Export jobs")
@@ -1,7 +1,24 @@
 from rest_framework.pagination import LimitOffsetPagination
+from django.db.models import QuerySet
 
 class GenericOffsetPagination(LimitOffsetPagination):
     default_limit = 1000
     limit_query_param = "limit"
     offset_query_param = "offset"
-    
\ No newline at end of file
+    
+    async def apaginate_queryset(self, queryset:QuerySet, request, view=None) -> list | None:
+        """Async version of paginate_queryset with the async ORM (acount and async for)
+        """
+        self.request = request
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+
+        self.count = await queryset.acount()
+        self.offset = self.get_offset(request)
+        if self.count > self.limit and self.template is not None:
+            self.display_page_controls = True
+
+        if self.count == 0 or self.offset > self.count:
+            return []
+        return [item async for item in queryset[self.offset:self.offset + self.limit]]
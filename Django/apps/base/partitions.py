@@ -0,0 +1,82 @@
+"""
+Worker side of the parallel exports of the ReportViewMixin (export_partitions).
+
+The processes are started with "spawn", so this module doesn't import Django models
+at the top: setup_export_worker configures Django before the partitions are unpickled.
+"""
+from dataclasses import dataclass, field
+from typing import Any
+
+
+@dataclass
+class ExportPartition:
+    """A pk range of a report, exported by one process to its own file
+
+    Attributes:
+        viewset (str): Import path of the viewset of the report.
+        query_params (dict[str, list[str]]): The filters of the report.
+        user_id (Any): The pk of the user of the job, None for anonymous users.
+        file_format (str): csv or parquet.
+        using (str): The database alias, the snapshot only exists in that server.
+        path (str): The file of the partition.
+        lower (Any): The first pk (inclusive), None for the first partition.
+        upper (Any): The last pk (exclusive), None for the last partition.
+        snapshot (str | None): Snapshot exported by the parent (pg_export_snapshot), so all the
+            partitions read the same data. None if the database is not PostgreSQL.
+        descending (bool): The rows are written in descending pk order.
+    """
+    viewset:str
+    query_params:dict[str, list[str]] = field(default_factory=dict)
+    user_id:Any = None
+    file_format:str = "csv"
+    using:str = "default"
+    path:str = ""
+    lower:Any = None
+    upper:Any = None
+    snapshot:str | None = None
+    descending:bool = False
+
+
+def setup_export_worker() -> None:
+    """Initializer of the processes of the pool"""
+    import django
+    django.setup()
+
+
+def export_partition(partition:ExportPartition) -> str:
+    """
+    Builds the viewset of the report and writes the rows of the pk range of the partition
+    (ordered by pk, ascending or descending) with ReportViewMixin.write_export_partition, inside a transaction that
+    imports the snapshot of the parent.
+
+    Returns:
+        str: The path of the written partition.
+    """
+    from django.contrib.auth import get_user_model
+    from django.db import connections, transaction
+    from apps.base.exports import build_report_view
+
+    user = None
+    if partition.user_id is not None:
+        user = get_user_model()._default_manager.using(partition.using).filter(pk=partition.user_id).first()
+    view = build_report_view(partition.viewset, partition.query_params, user)
+
+    with transaction.atomic(using=partition.using):
+        if partition.snapshot:
+            with connections[partition.using].cursor() as cursor:
+                # Must be the first statements of the transaction
+                cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+                cursor.execute("SET TRANSACTION SNAPSHOT %s", [partition.snapshot])
+
+        data, status_code = view.get_export_queryset(view.request)
+        if status_code >= 400:
+            raise ValueError(data.get("message", data) if isinstance(data, dict) else data)
+        data = data.using(partition.using)
+        if partition.lower is not None:
+            data = data.filter(pk__gte=partition.lower)
+        if partition.upper is not None:
+            data = data.filter(pk__lt=partition.upper)
+
+        with open(partition.path, "wb") as output:
+            view.write_export_partition(data.order_by("-pk" if partition.descending else "pk"), partition.file_format, output)
+    return partition.path
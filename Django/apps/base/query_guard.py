@@ -0,0 +1,98 @@
+import json
+from contextlib import contextmanager
+from typing import Any, Iterable, Iterator
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections, transaction
+from django.db.models import QuerySet
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from django.utils.translation import gettext_lazy as _
+
+# SQLSTATE of the statements cancelled by statement_timeout
+QUERY_CANCELED = "57014"
+
+
+class QueryTooExpensive(APIException):
+    """The EXPLAIN cost of the query is above the limit of the view, it's not executed
+    """
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = _("The query is too expensive, use more selective filters or a smaller page.")
+    default_code = "query_too_expensive"
+
+
+class QueryTimeout(APIException):
+    """The database cancelled the query because it ran longer than the statement_timeout
+    """
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = _("The query took too long, use more selective filters or a smaller page.")
+    default_code = "query_timeout"
+
+
+def is_postgres(using:str = DEFAULT_DB_ALIAS) -> bool:
+    return connections[using].vendor == "postgresql"
+
+
+def is_query_canceled(err:BaseException) -> bool:
+    """
+    Returns:
+        bool: If the error (or the driver error it wraps) is a query cancelled by statement_timeout
+    """
+    if not isinstance(err, DatabaseError):
+        return False
+    return getattr(err.__cause__, "pgcode", None) == QUERY_CANCELED
+
+
+@contextmanager
+def statement_timeout(milliseconds:int | None, using:str = DEFAULT_DB_ALIAS) -> Iterator[None]:
+    """
+    Limits the time of every statement of the block with SET LOCAL statement_timeout,
+    inside a transaction so the limit ends with the block and the connection
+    goes back to the pool (or to the next request) without it.
+    Only PostgreSQL, with other databases or without milliseconds it does nothing.
+
+    with statement_timeout(2000, using="default"):
+        list(queryset)
+    """
+    if not milliseconds or not is_postgres(using):
+        yield
+        return
+    with transaction.atomic(using=using):
+        with connections[using].cursor() as cursor:
+            cursor.execute("SET LOCAL statement_timeout = %s", [int(milliseconds)])
+        yield
+
+
+def iter_with_statement_timeout(iterator:Iterable[Any], milliseconds:int | None, using:str = DEFAULT_DB_ALIAS) -> Iterator[Any]:
+    """Consumes the iterator inside statement_timeout, for the streamed responses
+    that read the database after the view returns
+    """
+    with statement_timeout(milliseconds, using):
+        yield from iterator
+
+
+def get_query_cost(queryset:QuerySet) -> float | None:
+    """
+    Estimates the cost of the queryset with EXPLAIN (the query is planned, not executed).
+
+    Returns:
+        float | None: The total cost of the plan in the units of the planner,
+        None if the database is not PostgreSQL.
+    """
+    if not is_postgres(queryset.db):
+        return None
+    plan = json.loads(queryset.explain(format="json"))
+    return float(plan[0]["Plan"]["Total Cost"])
+
+
+def check_query_cost(queryset:QuerySet, max_cost:float | None) -> None:
+    """
+    Raises:
+        QueryTooExpensive: If the estimated cost of the queryset is above max_cost
+    """
+    if not max_cost:
+        return
+    cost = get_query_cost(queryset)
+    if cost is not None and cost > max_cost:
+        raise QueryTooExpensive(
+            _("The estimated cost of the query (%(cost).0f) is above the limit (%(limit).0f), "
+              "use more selective filters or a smaller page.") % {"cost": cost, "limit": max_cost}
+        )
@@ -0,0 +1,511 @@
+import bisect
+import threading
+import unicodedata
+from functools import partial
+from typing import Any, Callable, Iterable
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Model
+
+REDIS = "REDIS"
+LOCAL = "LOCAL"
+
+# Separates the parts of an entry: token, pk, field and value
+SEPARATOR = "\x00"
+
+
+def normalize_text(value:Any) -> str:
+    """Lowercases and removes the accents of a value so "José" matches "jose"
+
+    Args:
+        value (Any): The value to normalize
+
+    Returns:
+        str: Normalized text
+    """
+    text = unicodedata.normalize("NFKD", str(value))
+    return "".join(char for char in text if not unicodedata.combining(char)).casefold().strip()
+
+
+def get_tokens(value:Any) -> set[str]:
+    """
+    Returns:
+        set[str]: The normalized full value and each one of its words,
+        so "John Smith" can be found by "jo" and by "smi"
+    """
+    text = normalize_text(value).replace(SEPARATOR, "")
+    if not text:
+        return set()
+    return {text, *text.split()}
+
+
+class LocalPrefixIndex:
+    """
+    In process prefix index, used when there is no Redis.
+    Keeps the entries in a sorted list so a prefix lookup is a binary search,
+    the same lexicographic range that Redis does with ZRANGEBYLEX.
+
+    Every process has its own copy and the writes only reach the indexes of the process
+    that made them, so it can't be used with several workers (see AUTOCOMPLETE_BACKEND).
+    """
+    _indexes:dict[str, 'LocalPrefixIndex'] = {}
+    _indexes_lock = threading.Lock()
+    # generation key -> generation, increased by every invalidation of the model
+    _generations:dict[str, int] = {}
+
+    def __init__(self, generation_key:str) -> None:
+        self.generation_key = generation_key
+        self.entries:list[str] = []
+        self.documents:dict[str, list[str]] = {}
+        self.built_generation:int | None = None
+        self.lock = threading.Lock()
+        self.build_lock = threading.Lock()
+        # Documents of the build in progress and the ones written while it runs
+        self.building:dict[str, list[str]] | None = None
+        self.pending:set[str] = set()
+        self.scheduled = False
+
+    @classmethod
+    def get(cls, key:str, generation_key:str) -> 'LocalPrefixIndex':
+        with cls._indexes_lock:
+            if key not in cls._indexes:
+                cls._indexes[key] = cls(generation_key)
+            return cls._indexes[key]
+
+    @classmethod
+    def invalidate(cls, generation_key:str) -> None:
+        with cls._indexes_lock:
+            cls._generations[generation_key] = cls._generations.get(generation_key, 0) + 1
+
+    def get_generation(self) -> int:
+        return self._generations.get(self.generation_key, 0)
+
+    def is_built(self) -> bool:
+        return self.built_generation is not None
+
+    def is_stale(self) -> bool:
+        return self.built_generation != self.get_generation()
+
+    # ============== Build
+    def schedule_build(self) -> bool:
+        """
+        Returns:
+            bool: False if a build is already scheduled
+        """
+        with self.lock:
+            if self.scheduled:
+                return False
+            self.scheduled = True
+            return True
+
+    def start_build(self) -> int | None:
+        """
+        Returns:
+            int | None: The generation being built, None if another thread is building the index
+        """
+        if not self.build_lock.acquire(blocking=False):
+            return None
+        self.building = {}
+        return self.get_generation()
+
+    def add(self, documents:dict[str, list[str]]) -> None:
+        self.building.update((doc_id, entries) for doc_id, entries in documents.items() if entries)
+
+    def finish_build(self, generation:int) -> set[str]:
+        """Replaces the index with the built one, the entries are sorted once
+
+        Returns:
+            set[str]: The documents written during the build, they must be indexed again
+        """
+        entries = sorted(entry for document in self.building.values() for entry in document)
+        with self.lock:
+            self.entries, self.documents, self.built_generation = entries, self.building, generation
+            pending, self.pending = self.pending, set()
+            self.scheduled = False
+        self.building = None
+        self.build_lock.release()
+        return pending
+
+    def abort_build(self) -> None:
+        with self.lock:
+            self.building, self.pending, self.scheduled = None, set(), False
+        self.build_lock.release()
+
+    # ============== Documents
+    def _remove(self, doc_id:str) -> None:
+        for entry in self.documents.pop(doc_id, []):
+            position = bisect.bisect_left(self.entries, entry)
+            if position < len(self.entries) and self.entries[position] == entry:
+                self.entries.pop(position)
+
+    def replace(self, documents:dict[str, list[str]]) -> None:
+        with self.lock:
+            if self.building is not None:
+                self.pending.update(documents)
+            for doc_id, entries in documents.items():
+                self._remove(doc_id)
+                for entry in entries:
+                    bisect.insort(self.entries, entry)
+                if entries:
+                    self.documents[doc_id] = entries
+
+    def search(self, prefix:str, count:int, offset:int = 0) -> list[str]:
+        with self.lock:
+            position = bisect.bisect_left(self.entries, prefix) + offset
+            return [
+                entry for entry in self.entries[position:position + count]
+                if entry.startswith(prefix)
+            ]
+
+
+class RedisPrefixIndex:
+    """
+    Prefix index stored in Redis, shared by all the workers.
+    - <key>:terms is a sorted set where all the entries have score 0, so they
+      are ordered lexicographically and ZRANGEBYLEX returns a prefix range.
+    - <key>:docs is a hash pk -> entries of the document, to remove the old entries on update.
+    - <key>:built is the generation of the model the index was populated with.
+    - <key>:scheduled is set while a build is scheduled, so it's only enqueued once.
+    - <key>:lock is taken by the worker that builds the index in <key>:building:*,
+      that replaces the live keys with RENAME when it's done.
+    """
+    # Max duration of a build, the lock expires if the worker dies
+    BUILD_LOCK_SECONDS = 600
+
+    def __init__(self, key:str, generation_key:str) -> None:
+        from django_redis import get_redis_connection
+        self.key = key
+        self.generation_key = generation_key
+        self.redis = get_redis_connection("default")
+        self.built_documents = 0
+
+    @property
+    def terms_key(self) -> str:
+        return "%s:terms" % self.key
+
+    @property
+    def docs_key(self) -> str:
+        return "%s:docs" % self.key
+
+    @property
+    def built_key(self) -> str:
+        return "%s:built" % self.key
+
+    @property
+    def lock_key(self) -> str:
+        return "%s:lock" % self.key
+
+    @property
+    def pending_key(self) -> str:
+        return "%s:pending" % self.key
+
+    @property
+    def scheduled_key(self) -> str:
+        return "%s:scheduled" % self.key
+
+    @classmethod
+    def invalidate(cls, generation_key:str) -> None:
+        from django_redis import get_redis_connection
+        get_redis_connection("default").incr(generation_key)
+
+    def get_generation(self) -> int:
+        return int(self.redis.get(self.generation_key) or 0)
+
+    def is_built(self) -> bool:
+        return bool(self.redis.exists(self.built_key))
+
+    def is_stale(self) -> bool:
+        built = self.redis.get(self.built_key)
+        return built is None or int(built) != self.get_generation()
+
+    # ============== Build
+    def schedule_build(self) -> bool:
+        """
+        Returns:
+            bool: False if a build is already scheduled, it expires if the build never runs
+        """
+        return bool(self.redis.set(self.scheduled_key, 1, nx=True, ex=self.BUILD_LOCK_SECONDS))
+
+    def start_build(self) -> int | None:
+        """
+        Returns:
+            int | None: The generation being built, None if another worker is building the index
+        """
+        if not self.redis.set(self.lock_key, 1, nx=True, ex=self.BUILD_LOCK_SECONDS):
+            return None
+        self.redis.delete(self.terms_key + ":building", self.docs_key + ":building", self.pending_key)
+        self.built_documents = 0
+        return self.get_generation()
+
+    def add(self, documents:dict[str, list[str]]) -> None:
+        pipeline = self.redis.pipeline()
+        for doc_id, entries in documents.items():
+            if entries:
+                pipeline.zadd(self.terms_key + ":building", {entry: 0 for entry in entries})
+                pipeline.hset(self.docs_key + ":building", doc_id, "\n".join(entries))
+                self.built_documents += 1
+        pipeline.execute()
+
+    def finish_build(self, generation:int) -> set[str]:
+        """Replaces the live keys with the built ones in one transaction
+
+        Returns:
+            set[str]: The documents written during the build, they must be indexed again
+        """
+        pipeline = self.redis.pipeline()
+        if self.built_documents:
+            pipeline.rename(self.terms_key + ":building", self.terms_key)
+            pipeline.rename(self.docs_key + ":building", self.docs_key)
+        else:
+            pipeline.delete(self.terms_key, self.docs_key)
+        pipeline.set(self.built_key, generation)
+        pipeline.smembers(self.pending_key)
+        pipeline.delete(self.pending_key, self.lock_key, self.scheduled_key)
+        pending = pipeline.execute()[-2]
+        return {doc_id.decode() for doc_id in pending}
+
+    def abort_build(self) -> None:
+        self.redis.delete(self.terms_key + ":building", self.docs_key + ":building", self.pending_key, self.lock_key, self.scheduled_key)
+
+    # ============== Documents
+    def replace(self, documents:dict[str, list[str]]) -> None:
+        if not documents:
+            return
+        old_entries = self.redis.hmget(self.docs_key, list(documents.keys()))
+        pipeline = self.redis.pipeline()
+        if self.redis.exists(self.lock_key):
+            pipeline.sadd(self.pending_key, *documents.keys())
+        for doc_id, old in zip(documents.keys(), old_entries):
+            if old:
+                pipeline.zrem(self.terms_key, *old.decode().split("\n"))
+            entries = documents[doc_id]
+            if entries:
+                pipeline.zadd(self.terms_key, {entry: 0 for entry in entries})
+                pipeline.hset(self.docs_key, doc_id, "\n".join(entries))
+            else:
+                pipeline.hdel(self.docs_key, doc_id)
+        pipeline.execute()
+
+    def search(self, prefix:str, count:int, offset:int = 0) -> list[str]:
+        encoded = prefix.encode()
+        entries = self.redis.zrangebylex(self.terms_key, b"[" + encoded, b"[" + encoded + b"\xff", start=offset, num=count)
+        return [entry.decode() for entry in entries]
+
+
+class AutocompleteIndex:
+    """
+    Prefix index for the type-ahead of a viewset, populated from its autocomplete_fields
+    (the search_fields by default). Every viewset has its own index, so a viewset
+    only indexes (and returns) the fields it declares.
+
+    It's kept up to date incrementally by CacheMixin.save and the BaseManager bulk operations.
+    The operations that can't be tracked row by row (QuerySet.update, delete) increase the
+    generation of the model, and the next search schedules the rebuild of the stale index
+    out of the request (see schedule_build), the searches keep using the previous index
+    until the new one replaces it.
+    """
+    # model -> viewset -> fields
+    _registry:dict[Model.__class__, dict[str, list[str]]] = {}
+    # Entries read per round of a search, in multiples of the limit
+    SEARCH_ROUNDS = 5
+
+    def __init__(self, model:Model.__class__, viewset:str) -> None:
+        self.model = model
+        self.viewset = viewset
+        self.fields = self._registry.get(model, {}).get(viewset, [])
+
+    # ============== Registry
+    @classmethod
+    def register(cls, model:Model.__class__, viewset:str, fields:Iterable[str]) -> None:
+        """Registers the fields of the index of a viewset (its import path)
+        """
+        cls._registry.setdefault(model, {})[viewset] = list(dict.fromkeys(fields))
+
+    @classmethod
+    def is_registered(cls, model:Model.__class__) -> bool:
+        return model in cls._registry
+
+    @classmethod
+    def get_indexes(cls, model:Model.__class__) -> list['AutocompleteIndex']:
+        return [cls(model, viewset) for viewset in cls._registry.get(model, {})]
+
+    @staticmethod
+    def get_backend_name() -> str:
+        return settings.AUTOCOMPLETE_BACKEND
+
+    @staticmethod
+    def get_generation_key(model:Model.__class__) -> str:
+        return "autocomplete:%s:generation" % model._meta.label_lower
+
+    def get_key(self) -> str:
+        return "autocomplete:%s:%s" % (self.model._meta.label_lower, self.viewset)
+
+    def get_backend(self) -> RedisPrefixIndex | LocalPrefixIndex:
+        if self.get_backend_name() == REDIS:
+            return RedisPrefixIndex(self.get_key(), self.get_generation_key(self.model))
+        return LocalPrefixIndex.get(self.get_key(), self.get_generation_key(self.model))
+
+    # ============== Documents
+    def is_active(self, status:Any) -> bool:
+        deactivated_status = getattr(self.model, "deactivated_status", None)
+        return deactivated_status is None or status != deactivated_status
+
+    def get_rows(self, pks:Iterable[Any] | None = None) -> Iterable[tuple]:
+        """Reads the values to index straight from the database with values_list,
+        so relations in the search_fields (user__username) don't need extra queries
+
+        Args:
+            pks (Iterable[Any] | None, optional): Only reads these pks. Defaults to the whole table.
+
+        Returns:
+            Iterable[tuple]: Rows of (pk, status, *fields), status is None if the model has no status
+        """
+        queryset = self.model._base_manager.all()
+        if pks is not None:
+            queryset = queryset.filter(pk__in=list(pks))
+
+        if not hasattr(self.model, "deactivated_status"):
+            rows = queryset.values_list("pk", *self.fields).iterator(chunk_size=2000)
+            return ((pk, None, *values) for pk, *values in rows)
+        return queryset.values_list("pk", "status", *self.fields).iterator(chunk_size=2000)
+
+    def get_documents(self, rows:Iterable[tuple]) -> dict[str, list[str]]:
+        """
+        Returns:
+            dict[str, list[str]]: pk -> entries "token\\0pk\\0field\\0value", the inactive rows have no entries
+        """
+        documents = {}
+        for pk, status, *values in rows:
+            entries = set()
+            if self.is_active(status):
+                for field, value in zip(self.fields, values):
+                    if value is None or value == "":
+                        continue
+                    for token in get_tokens(value):
+                        entries.add(SEPARATOR.join((token, str(pk), field, str(value))))
+            documents[str(pk)] = sorted(entries)
+        return documents
+
+    # ============== Maintenance
+    def build(self) -> bool:
+        """Populates the index with all the rows of the model, while the previous index keeps serving the searches
+
+        Returns:
+            bool: False if the index is already being built by another request or worker
+        """
+        backend = self.get_backend()
+        generation = backend.start_build()
+        if generation is None:
+            return False
+        try:
+            batch = []
+            for row in self.get_rows():
+                batch.append(row)
+                if len(batch) >= 2000:
+                    backend.add(self.get_documents(batch))
+                    batch = []
+            backend.add(self.get_documents(batch))
+        except BaseException:
+            backend.abort_build()
+            raise
+        pending = backend.finish_build(generation)
+        if pending:
+            self.index_pks(list(pending))
+        return True
+
+    def schedule_build(self) -> None:
+        """Builds the index out of the request, only once until the build finishes:
+        the Redis indexes in a Celery worker and the LOCAL ones (they live in this process) in a thread
+        """
+        if not self.get_backend().schedule_build():
+            return
+        if self.get_backend_name() == REDIS:
+            # Lazy, the tasks import the models
+            from apps.base.tasks import build_autocomplete_index_task
+            build_autocomplete_index_task.delay(self.model._meta.label, self.viewset)
+        else:
+            threading.Thread(target=self.build_in_thread, daemon=True).start()
+
+    def build_in_thread(self) -> None:
+        try:
+            self.build()
+        finally:
+            connections.close_all()
+
+    @classmethod
+    def index_instances(cls, model:Model.__class__, instances:Iterable[Model]) -> None:
+        """Updates the entries of the saved instances in the indexes of the model once
+        the transaction is committed, the deactivated ones are removed.
+        If the model isn't registered in this process only invalidates the indexes
+        """
+        if not cls.is_registered(model):
+            cls.invalidate(model)
+            return
+        pks = [instance.pk for instance in instances if instance.pk is not None]
+        if pks:
+            for index in cls.get_indexes(model):
+                transaction.on_commit(partial(index.index_pks, pks))
+
+    def index_pks(self, pks:list[Any]) -> None:
+        backend = self.get_backend()
+        if not backend.is_built():
+            # It will be populated with these rows by the first build
+            return
+        documents = self.get_documents(self.get_rows(pks))
+        # The pks that were not found were deleted
+        documents.update({str(pk): [] for pk in pks if str(pk) not in documents})
+        backend.replace(documents)
+
+    @classmethod
+    def invalidate(cls, model:Model.__class__) -> None:
+        """Marks the indexes of the model as stale once the transaction is committed,
+        the next search schedules their build
+        """
+        generation_key = cls.get_generation_key(model)
+        if cls.get_backend_name() == REDIS:
+            transaction.on_commit(partial(RedisPrefixIndex.invalidate, generation_key))
+        elif cls.is_registered(model):
+            transaction.on_commit(partial(LocalPrefixIndex.invalidate, generation_key))
+
+    # ============== Search
+    def search(self, text:str, limit:int = 10, filter_pks:Callable[[list[str]], set[str]] | None = None) -> list[dict[str, Any]]:
+        """Returns the first matches (ordered alphabetically) of the text as prefix
+
+        Args:
+            text (str): Text typed by the user
+            limit (int, optional): Max results. Defaults to 10.
+            filter_pks (Callable[[list[str]], set[str]] | None, optional): Receives the pks of
+                the matches and returns the ones that can be shown. Defaults to all of them.
+
+        Returns:
+            list[dict[str, Any]]: List of {"id", "field", "value"}
+        """
+        prefix = normalize_text(text).replace(SEPARATOR, "")
+        if not prefix or not self.fields:
+            return []
+
+        backend = self.get_backend()
+        if backend.is_stale():
+            # Until it's built the searches use the previous index (empty the first time)
+            self.schedule_build()
+
+        # The same document can match by several tokens and some can be filtered,
+        # so reads more entries than needed, in a few rounds at most
+        results, seen, offset, count = [], set(), 0, limit * 4
+        for _ in range(self.SEARCH_ROUNDS):
+            entries = backend.search(prefix, count, offset)
+            offset += count
+            matches = []
+            for entry in entries:
+                _, pk, field, value = entry.split(SEPARATOR, 3)
+                if (pk, field) not in seen:
+                    seen.add((pk, field))
+                    matches.append((pk, field, value))
+            if filter_pks is not None and matches:
+                allowed = filter_pks(list({pk for pk, _, _ in matches}))
+                matches = [match for match in matches if match[0] in allowed]
+            for pk, field, value in matches[:limit - len(results)]:
+                results.append({"id": int(pk) if pk.isdigit() else pk, "field": field, "value": value})
+            if len(results) >= limit or len(entries) < count:
+                break
+        return results
@@ -0,0 +1,320 @@
+import hashlib
+import operator
+import re
+from functools import reduce
+from typing import Iterator
+from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramWordSimilarity
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connections
+from django.db.models import CharField, Exists, F, FloatField, Model, OuterRef, Q, QuerySet, TextField
+from django.db.models.constants import LOOKUP_SEP
+from django.db.models.functions import Greatest
+from django.urls import URLPattern, URLResolver, get_resolver
+from rest_framework.filters import SearchFilter
+from rest_framework.request import Request
+
+
+def strip_lookup_prefix(search_field:str) -> str:
+    """Removes the DRF lookup prefixes (^, =, @, $) from a search field
+
+    Args:
+        search_field (str): Search field as declared in the viewset, for example "^username"
+
+    Returns:
+        str: The field path without prefix, for example "username"
+    """
+    if search_field and search_field[0] in SearchFilter.lookup_prefixes:
+        return search_field[1:]
+    return search_field
+
+
+def resolve_model_field(model:Model.__class__, field_path:str):
+    """Follows a field path like "user__username" through the relations of the model
+
+    Args:
+        model (Model.__class__): The model where the path starts
+        field_path (str): Path of the field with django lookups
+
+    Returns:
+        Field | None: The last field of the path or None if the path can't be resolved
+    """
+    opts = model._meta
+    field = None
+    for part in field_path.split(LOOKUP_SEP):
+        if part == "pk":
+            part = opts.pk.name
+        try:
+            field = opts.get_field(part)
+        except FieldDoesNotExist:
+            return None
+        if hasattr(field, "path_infos"):
+            opts = field.path_infos[-1].to_opts
+    return field
+
+
+class SearchIndexManager:
+    """
+    Builds the Postgres indexes that back the FullTextSearchFilter for a model.
+
+    The indexes are expression indexes built with the same expressions the filter
+    uses in its queries, so the planner can match them:
+    - A GIN index over the tsvector of the local search fields.
+    - A GIN trigram index (gin_trgm_ops) for every local text search field,
+      used by the short terms fallback.
+
+    Search fields that span relations (user__username) are searched but can't be indexed.
+    """
+    FULL_TEXT_SUFFIX = "fts"
+    TRIGRAM_SUFFIX = "trg"
+
+    def __init__(self, model:Model.__class__, search_fields:list[str] | tuple[str], config:str | None = None) -> None:
+        self.model = model
+        self.search_fields = [strip_lookup_prefix(str(field)) for field in search_fields]
+        self.config = config or settings.FULL_TEXT_SEARCH_CONFIG
+
+    def get_local_fields(self) -> list[str]:
+        """
+        Returns:
+            list[str]: Search fields that are columns of the model table (no relations)
+        """
+        local_fields = []
+        for field_path in self.search_fields:
+            if LOOKUP_SEP in field_path:
+                continue
+            field = resolve_model_field(self.model, field_path)
+            if field is not None and getattr(field, "concrete", False) and not field.is_relation:
+                local_fields.append(field_path)
+        return local_fields
+
+    def get_related_fields(self) -> list[str]:
+        """
+        Returns:
+            list[str]: Search fields that are not columns of the model table (user__username), they can't be indexed
+        """
+        local_fields = self.get_local_fields()
+        return [field_path for field_path in self.search_fields if field_path not in local_fields]
+
+    def get_trigram_fields(self, local_only:bool = False) -> list[str]:
+        """
+        Args:
+            local_only (bool, optional): Only returns fields of the model table. Defaults to False.
+
+        Returns:
+            list[str]: The search fields that are text columns, the only ones that support trigrams
+        """
+        fields = self.get_local_fields() if local_only else self.search_fields
+        return [
+            field_path for field_path in fields
+            if isinstance(resolve_model_field(self.model, field_path), (CharField, TextField))
+        ]
+
+    def get_vector(self, fields:list[str] | None = None) -> SearchVector:
+        """
+        Returns:
+            SearchVector: The tsvector expression used both in the index and in the queries
+        """
+        return SearchVector(*(fields or self.search_fields), config=self.config)
+
+    def get_index_name(self, suffix:str, *parts:str) -> str:
+        """Generates a deterministic index name, shorter than the 30 characters allowed by Django
+
+        Args:
+            suffix (str): fts or trg
+            *parts (str): Values that identify the index (fields, config)
+
+        Returns:
+            str: Name like "users_user_fts_1a2b3c4d"
+        """
+        digest = hashlib.md5(":".join((self.config, *parts)).encode()).hexdigest()[:8]
+        return "%s_%s_%s" % (self.model._meta.db_table[:12].rstrip("_"), suffix, digest)
+
+    def get_index_prefixes(self) -> tuple[str, str]:
+        """
+        Returns:
+            tuple[str, str]: The name prefixes of the indexes managed by this class, used to find the stale ones
+        """
+        table = self.model._meta.db_table[:12].rstrip("_")
+        return ("%s_%s_" % (table, self.FULL_TEXT_SUFFIX), "%s_%s_" % (table, self.TRIGRAM_SUFFIX))
+
+    def get_indexes(self) -> list[GinIndex]:
+        """
+        Returns:
+            list[GinIndex]: The indexes that should exist for the current search_fields
+        """
+        indexes = []
+        local_fields = self.get_local_fields()
+        if local_fields:
+            indexes.append(GinIndex(
+                self.get_vector(local_fields),
+                name=self.get_index_name(self.FULL_TEXT_SUFFIX, *local_fields),
+            ))
+
+        for field_path in self.get_trigram_fields(local_only=True):
+            indexes.append(GinIndex(
+                OpClass(F(field_path), name="gin_trgm_ops"),
+                name=self.get_index_name(self.TRIGRAM_SUFFIX, field_path),
+            ))
+        return indexes
+
+
+class FullTextSearchFilter(SearchFilter):
+    """
+    Search backend for Postgres that replaces the ILIKE '%term%' of the DRF SearchFilter.
+
+    - Terms with at least FULL_TEXT_SEARCH_MIN_TERM_LENGTH characters are matched as prefixes
+      against the tsvector of the local search fields (the one of the GIN index) or the
+      tsvector of the related search fields, and ranked with ts_rank.
+    - Shorter terms fall back to trigram word similarity over the text search fields.
+    - The results are ordered by rank, unless the OrderingFilter applies an ordering.
+
+    On other database engines it behaves exactly like the DRF SearchFilter.
+    The indexes are built with "python manage.py build_search_indexes".
+
+    The viewset can override the settings with the properties:
+    - full_text_search_config: str
+    - full_text_search_min_term_length: int
+    """
+    rank_annotation = "search_rank"
+    vector_alias = "search_vector"
+    related_vector_alias = "search_related_vector"
+
+    def get_search_config(self, view) -> str:
+        return getattr(view, "full_text_search_config", settings.FULL_TEXT_SEARCH_CONFIG)
+
+    def get_min_term_length(self, view) -> int:
+        return getattr(view, "full_text_search_min_term_length", settings.FULL_TEXT_SEARCH_MIN_TERM_LENGTH)
+
+    def is_full_text_available(self, queryset:QuerySet) -> bool:
+        """
+        Returns:
+            bool: True if the queryset runs against Postgres
+        """
+        return connections[queryset.db].vendor == "postgresql"
+
+    def get_prefix_query(self, terms:list[str], config:str) -> SearchQuery | None:
+        """Builds a raw tsquery that matches every term as a prefix, for example "jo:* & smi:*"
+        Only word characters are kept so the user can't inject tsquery operators.
+
+        Args:
+            terms (list[str]): Search terms
+            config (str): Text search configuration
+
+        Returns:
+            SearchQuery | None: The query or None if there is nothing left to search
+        """
+        tokens = [token for term in terms for token in re.findall(r"\w+", term)]
+        if not tokens:
+            return None
+        return SearchQuery(" & ".join("%s:*" % token for token in tokens), search_type="raw", config=config)
+
+    def filter_queryset(self, request:Request, queryset:QuerySet, view) -> QuerySet:
+        search_fields = self.get_search_fields(view, request)
+        search_terms = self.get_search_terms(request)
+
+        if not search_fields or not search_terms:
+            return queryset
+
+        if not self.is_full_text_available(queryset):
+            return super().filter_queryset(request, queryset, view)
+
+        index_manager = SearchIndexManager(queryset.model, search_fields, self.get_search_config(view))
+        min_length = self.get_min_term_length(view)
+        long_terms = [term for term in search_terms if len(term) >= min_length]
+        short_terms = [term for term in search_terms if len(term) < min_length]
+        trigram_fields = index_manager.get_trigram_fields()
+
+        base = queryset
+        ranks = []
+        conditions = []
+
+        query = self.get_prefix_query(long_terms, index_manager.config)
+        if query is not None:
+            # The local fields use the same expression as the GIN index, the related
+            # fields are another condition so they don't hide the index from the planner
+            vector_conditions = []
+            for alias, fields in (
+                (self.vector_alias, index_manager.get_local_fields()),
+                (self.related_vector_alias, index_manager.get_related_fields()),
+            ):
+                if not fields:
+                    continue
+                vector = index_manager.get_vector(fields)
+                queryset = queryset.alias(**{alias: vector})
+                vector_conditions.append(Q(**{alias: query}))
+                ranks.append(SearchRank(vector, query))
+            conditions.append(reduce(operator.or_, vector_conditions))
+
+        for term in short_terms:
+            if not trigram_fields:
+                # Without text fields there is nothing to compare, uses the DRF lookups
+                conditions.append(reduce(operator.or_, (
+                    Q(**{self.construct_search(str(field), queryset): term}) for field in search_fields
+                )))
+                continue
+            conditions.append(reduce(operator.or_, (
+                Q(**{"%s__trigram_word_similar" % field: term}) for field in trigram_fields
+            )))
+            ranks.extend(TrigramWordSimilarity(term, field) for field in trigram_fields)
+
+        if not conditions:
+            return queryset
+
+        queryset = queryset.filter(reduce(operator.and_, conditions))
+
+        if self.must_call_distinct(queryset, search_fields):
+            # The joins of a m2m field duplicate the rows, so the rank can't be trusted
+            return base.filter(Exists(queryset.filter(pk=OuterRef("pk"))))
+
+        if not ranks:
+            return queryset
+
+        rank = ranks[0] if len(ranks) == 1 else Greatest(*ranks, output_field=FloatField())
+        return queryset.annotate(**{self.rank_annotation: rank}).order_by("-%s" % self.rank_annotation, "-pk")
+
+
+def iter_url_viewsets(patterns:list[URLPattern | URLResolver] | None = None) -> Iterator[type]:
+    """Walks the URL configuration yielding the viewset classes registered with routers
+
+    Args:
+        patterns (list[URLPattern | URLResolver] | None, optional): Patterns to walk. Defaults to the root urlconf.
+
+    Yields:
+        Iterator[type]: Viewset classes
+    """
+    if patterns is None:
+        patterns = get_resolver().url_patterns
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from iter_url_viewsets(pattern.url_patterns)
+            continue
+        viewset = getattr(pattern.callback, "cls", None)
+        if viewset is not None:
+            yield viewset
+
+
+def get_full_text_search_targets() -> list[tuple[Model.__class__, list[str], str]]:
+    """Looks for the viewsets that use the FullTextSearchFilter and have search_fields
+
+    Returns:
+        list[tuple[Model.__class__, list[str], str]]: Tuples of (model, search_fields, search config)
+    """
+    targets, seen = [], set()
+    for viewset in iter_url_viewsets():
+        backends = getattr(viewset, "filter_backends", ()) or ()
+        if not any(issubclass(backend, FullTextSearchFilter) for backend in backends):
+            continue
+        search_fields = getattr(viewset, "search_fields", None)
+        serializer_class = getattr(viewset, "serializer_class", None)
+        if not search_fields or serializer_class is None:
+            continue
+
+        model = serializer_class.Meta.model
+        config = getattr(viewset, "full_text_search_config", settings.FULL_TEXT_SEARCH_CONFIG)
+        key = (model, tuple(search_fields), config)
+        if key in seen:
+            continue
+        seen.add(key)
+        targets.append((model, list(search_fields), config))
+    return targets
@@ -1,21 +1,122 @@
-from typing import Any
+from collections.abc import Mapping
+from functools import cache
+from operator import attrgetter
+from typing import Any, Callable, Iterable
 from rest_framework import serializers
+from rest_framework.fields import Field, SkipField
+from rest_framework.relations import PKOnlyObject
 from rest_framework.utils import model_meta
+from django.core.exceptions import FieldDoesNotExist, ObjectDoesNotExist
 from django.db.models import QuerySet, F, Model
+from django.db.models.manager import BaseManager
+from django.db.models.constants import LOOKUP_SEP
 import datetime as dt
+from apps.base.functions import PrettyDateTime
 from apps.base.models import BaseModel
 from apps.users.models import User
 from rest_framework.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
 
+class SQLMethodField(serializers.SerializerMethodField):
+    """
+    SerializerMethodField whose value can be computed by the database.
+    If the instance has an annotation with the name of the field, the annotation is returned
+    and the method is not called.
+    """
+    def to_representation(self, value):
+        values = getattr(value, "__dict__", {})
+        if self.field_name in values:
+            return values[self.field_name]
+        return super().to_representation(value)
+
+
+class BatchSerializerMethodField(serializers.SerializerMethodField):
+    """
+    SerializerMethodField computed once per list by the method "get_<field>_batch(objects)",
+    that returns a mapping pk -> value. The objects missing in the mapping get None.
+    
+    Serializing a single object calls "get_<field>" if it exists, or the batch method with that object.
+    """
+    def get_batch_method_name(self) -> str:
+        return "%s_batch" % self.method_name
+    
+    def to_representation(self, value):
+        batch_values = getattr(self.parent, "_batch_values", {}).get(self.field_name)
+        if batch_values is not None:
+            return batch_values.get(value.pk)
+        method = getattr(self.parent, self.method_name, None)
+        if method is not None:
+            return method(value)
+        return getattr(self.parent, self.get_batch_method_name())([value]).get(value.pk)
+
+
 class GenericReadOnlySerializer(serializers.ModelSerializer):
+    # many=True uses the CompiledListSerializer, unless the Meta has a list_serializer_class
+    compile_many:bool = True
+    # Method fields computed by the database: field name -> expression annotated by the viewsets
+    sql_method_fields:dict[str, Any] = {}
+    
+    @classmethod
+    def get_sql_method_fields(cls) -> dict[str, Any]:
+        """
+        Returns:
+            dict[str, Any]: Field name -> expression. The GetQuerysetMixin annotates the expressions
+            for list and retrieve, so the method fields read the annotation instead of calling the method.
+        """
+        return dict(cls.sql_method_fields)
+    
+    @classmethod
+    def get_batch_methods(cls) -> dict[str, str]:
+        """
+        Returns:
+            dict[str, str]: Field name -> batch method name, of the method fields that
+            have a "get_<field>_batch(objects)" method
+        """
+        batch_methods = {}
+        for name, field in cls._declared_fields.items():
+            if not isinstance(field, serializers.SerializerMethodField):
+                continue
+            method_name = "%s_batch" % (field.method_name or "get_%s" % name)
+            if hasattr(cls, method_name):
+                batch_methods[name] = method_name
+        return batch_methods
+    
+    def prepare_batch(self, instances:list[Any]) -> None:
+        """Computes the batch method fields for the instances of a list, once per list.
+        The BatchSerializerMethodField read the values from the mapping
+        """
+        self._batch_values = {
+            name: getattr(self, method_name)(instances)
+            for name, method_name in self.get_batch_methods().items()
+        }
+    
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        meta = getattr(cls, "Meta", None)
+        if not cls.compile_many or hasattr(meta, "list_serializer_class"):
+            return super().many_init(*args, **kwargs)
+        
+        list_kwargs = {}
+        for key in serializers.LIST_SERIALIZER_KWARGS_REMOVE:
+            value = kwargs.pop(key, None)
+            if value is not None:
+                list_kwargs[key] = value
+        list_kwargs["child"] = cls(*args, **kwargs)
+        list_kwargs.update({key: value for key, value in kwargs.items() if key in serializers.LIST_SERIALIZER_KWARGS})
+        return CompiledListSerializer(*args, **list_kwargs)
     
     def get_fields(self, *args, **kwargs):
         """Crear los campos como Read Only optimiza la serialización de datos
         este método es para hacer que todos los fields sean readOnly
         """
         fields = super().get_fields(*args, **kwargs)
+        sql_method_fields = self.get_sql_method_fields()
+        batch_methods = self.get_batch_methods()
         for field in fields:
+            if field in sql_method_fields and type(fields[field]) is serializers.SerializerMethodField:
+                fields[field] = SQLMethodField(method_name=fields[field].method_name)
+            elif field in batch_methods and type(fields[field]) is serializers.SerializerMethodField:
+                fields[field] = BatchSerializerMethodField(method_name=fields[field].method_name)
             fields[field].read_only = True
             if isinstance(fields[field], serializers.DateTimeField):
                 fields[field].format = "%d-%m-%Y %H:%M:%S"
@@ -51,7 +152,10 @@ class GenericReadOnlySerializer(serializers.ModelSerializer):
 
 class BaseReadOnlySerializer(GenericReadOnlySerializer):
     """Read Only serializer that applies read only to all fields for improve serialization and formats dates
+    
+    With sql_pretty_dates the pretty_* fields are formatted by the database (see PrettyDateTime).
     """
+    sql_pretty_dates:bool = False
     created_date = serializers.DateTimeField(format="%d-%m-%Y %H:%M:%S", read_only=True)
     modified_date = serializers.DateTimeField(format="%d-%m-%Y %H:%M:%S", read_only=True)
     deleted_date = serializers.DateTimeField(format="%d-%m-%Y %H:%M:%S", read_only=True)
@@ -61,6 +165,16 @@ class BaseReadOnlySerializer(GenericReadOnlySerializer):
     
     
 
+    @classmethod
+    def get_sql_method_fields(cls) -> dict[str, Any]:
+        sql_method_fields = super().get_sql_method_fields()
+        if cls.sql_pretty_dates:
+            sql_method_fields.update({
+                "pretty_%s" % field: PrettyDateTime(field)
+                for field in ("created_date", "modified_date", "deleted_date")
+            })
+        return sql_method_fields
+
     def get_pretty_created_date(self, obj: BaseModel) -> str:
         return self._format_datetime(obj.created_date)
     
@@ -170,7 +284,7 @@ class BaseModelSerializer(serializers.ModelSerializer):
         popped_fields = self.get_manual_fields(validated_data)
         instance:BaseModel = super().create(validated_data)
         self.handle_manual_fields(instance, popped_fields)
-        instance.refresh_from_db()
+        # Not refreshed, the viewsets read the saved object once with their queryset (GetQuerysetMixin.get_saved_object)
         return instance
 
 class BaseUpdateSerializer(BaseModelSerializer):
@@ -241,6 +355,7 @@ class BaseUpdateSerializer(BaseModelSerializer):
             else:
                 setattr(instance, key, value)
         
+        # The BaseModels only write the fields that changed (DirtyFieldsMixin)
         instance.save()
         self.update_m2m_items(instance, m2m_fields)
         
@@ -336,4 +451,353 @@ class SQLSerializer:
         
         
         return model.objects.filter(pk = self.instance.pk).annotate(**self.expressions) \
-                .values(*columns).first()
\ No newline at end of file
+                .values(*columns).first()
+
+class ValuesSerializer(SQLSerializer):
+    """
+    SQLSerializer generated from a ModelSerializer by build_values_serializer.
+    
+    It's used in two steps, so the pagination can slice the values() queryset:
+    - ValuesSerializer(queryset).get_values_queryset() returns the lazy annotate().values() queryset.
+    - ValuesSerializer(rows).data formats the rows (dicts) like the ModelSerializer would do.
+    """
+    # Output name -> to_representation of the DRF field, None if the value is returned as is
+    formatters:dict[str, Callable[[Any], Any] | None] = {}
+    
+    def get_column_order(self) -> list[str]:
+        return list(self.formatters.keys())
+    
+    def get_values_queryset(self) -> QuerySet:
+        """
+        Returns:
+            QuerySet: The queryset of the instance as dicts with the columns of the serializer
+        """
+        # The prefetches can't be applied to dicts and the joins are made by values()
+        queryset:QuerySet = self.instance.prefetch_related(None)
+        # The expressions already annotated by the viewset (sql_method_fields) are not annotated again
+        expressions = {key: value for key, value in self.expressions.items() if key not in queryset.query.annotations}
+        return queryset.annotate(**expressions).values(*self.get_column_order())
+    
+    def to_representation(self, row:dict[str, Any]) -> dict[str, Any]:
+        data = {}
+        for column, formatter in self.formatters.items():
+            value = row[column]
+            data[column] = value if formatter is None or value is None else formatter(value)
+        return data
+    
+    def get_serialized_data(self) -> list[dict] | dict:
+        if self.many:
+            return [self.to_representation(row) for row in self.instance]
+        return self.to_representation(self.instance)
+
+
+# Fields whose to_representation doesn't change the values returned by the database
+VALUES_PASSTHROUGH_FIELDS = (
+    serializers.ReadOnlyField, serializers.CharField, serializers.IntegerField, serializers.BooleanField,
+)
+
+# Fields that need the model instance or return several rows. The file fields format the
+# FieldFile (url) and the ModelField reads the instance, values() only has the column
+VALUES_UNSUPPORTED_FIELDS = (
+    serializers.SerializerMethodField, serializers.BaseSerializer, serializers.ManyRelatedField,
+    serializers.HyperlinkedRelatedField, serializers.FileField, serializers.ModelField,
+)
+
+
+def get_values_path(model:Model.__class__, source_attrs:list[str]) -> tuple[str, Any] | None:
+    """Converts the source of a serializer field ("user.username") in a values() path ("user__username")
+
+    Args:
+        model (Model.__class__): Model of the serializer
+        source_attrs (list[str]): The source of the field split by dots
+
+    Returns:
+        tuple[str, Any] | None: The path and the model field, None if the source isn't a concrete
+        field or crosses a to-many relation
+    """
+    opts = model._meta
+    field = None
+    for attr in source_attrs:
+        if field is not None:
+            if not field.is_relation or field.many_to_many or field.one_to_many:
+                return None
+            opts = field.related_model._meta
+        try:
+            field = opts.get_field(opts.pk.name if attr == "pk" else attr)
+        except FieldDoesNotExist:
+            return None
+        if not getattr(field, "concrete", False) or field.many_to_many:
+            return None
+    return LOOKUP_SEP.join(source_attrs), field
+
+
+def is_context_field(field:Field) -> bool:
+    """
+    Returns:
+        bool: True if the to_representation of the field reads the context of the serializer,
+        like the absolute urls of the files and the hyperlinks built with the request
+    """
+    if isinstance(field, (serializers.FileField, serializers.HyperlinkedRelatedField)):
+        return True
+    code = getattr(type(field).to_representation, "__code__", None)
+    return code is not None and "context" in code.co_names
+
+
+@cache
+def build_values_serializer(serializer_class:serializers.ModelSerializer.__class__) -> ValuesSerializer.__class__ | None:
+    """Generates (once per class) a ValuesSerializer equivalent to a read only ModelSerializer.
+    
+    Supports the model fields, dotted sources through foreign keys ("user.username"),
+    primary key and slug related fields. The DRF formatting of dates, decimals, choices, etc.
+    is kept applying the to_representation of each field to the column.
+
+    Args:
+        serializer_class (serializers.ModelSerializer.__class__): Read only serializer
+
+    Returns:
+        ValuesSerializer.__class__ | None: The serializer class or None if the serializer has
+        fields that need the instance (method fields, nested serializers, m2m, files, properties...)
+        or overrides to_representation
+    """
+    meta = getattr(serializer_class, "Meta", None)
+    model = getattr(meta, "model", None)
+    if model is None or serializer_class.to_representation is not serializers.Serializer.to_representation:
+        return None
+    
+    model_field_names = {field.name for field in model._meta.get_fields()}
+    sql_method_fields = getattr(serializer_class, "get_sql_method_fields", dict)()
+    fields, fields_custom, formatters = [], {}, {}
+    for name, field in serializer_class().fields.items():
+        if field.write_only:
+            continue
+        if isinstance(field, SQLMethodField) and name in sql_method_fields:
+            fields_custom[name] = sql_method_fields[name]
+            formatters[name] = None
+            continue
+        if isinstance(field, VALUES_UNSUPPORTED_FIELDS) or field.source == "*":
+            return None
+        
+        source_attrs = list(field.source_attrs)
+        formatter = None
+        if isinstance(field, serializers.SlugRelatedField):
+            source_attrs.append(field.slug_field)
+        elif isinstance(field, serializers.PrimaryKeyRelatedField):
+            formatter = field.pk_field.to_representation if field.pk_field is not None else None
+        elif isinstance(field, serializers.RelatedField):
+            return None
+        elif not isinstance(field, VALUES_PASSTHROUGH_FIELDS):
+            formatter = field.to_representation
+        
+        resolved = get_values_path(model, source_attrs)
+        if resolved is None:
+            return None
+        path, model_field = resolved
+        if model_field.is_relation and not isinstance(field, serializers.RelatedField) and len(source_attrs) == len(field.source_attrs):
+            # The field would serialize the related instance
+            return None
+        
+        if path == name:
+            fields.append(name)
+        elif name in model_field_names:
+            # values() can't annotate a name that is already a field of the model
+            return None
+        else:
+            fields_custom[name] = path
+        formatters[name] = formatter
+    
+    values_meta = type("Meta", (), {"model": model, "fields": fields, "fields_custom": fields_custom})
+    return type(
+        "%sValues" % serializer_class.__name__, (ValuesSerializer,),
+        {"Meta": values_meta, "formatters": formatters, "__module__": serializer_class.__module__},
+    )
+
+
+class CompiledSerializer:
+    """
+    Row to dict plan of a read only serializer class, built once per process by compile_serializer.
+    
+    The fields are precomputed in five kinds:
+    - ATTRIBUTE: concrete model fields (also through foreign keys) read with an attrgetter and
+      formatted with the to_representation of the DRF field. The primary key related fields
+      read the "<field>_id" column, so the related object is never loaded.
+    - METHOD: SerializerMethodField, the method is bound to the serializer of the current list.
+    - ANNOTATION: SQLMethodField, reads the annotation of the instance and calls the method if it's missing.
+    - BATCH: BatchSerializerMethodField, reads the mapping computed by prepare_batch for the list.
+    - FIELD: anything else (nested serializers, m2m, properties, fields that read the context
+      like files and hyperlinks...) is serialized by the DRF field of the current serializer,
+      exactly like Serializer.to_representation.
+    """
+    ATTRIBUTE = 0
+    METHOD = 1
+    FIELD = 2
+    ANNOTATION = 3
+    BATCH = 4
+    
+    def __init__(self, serializer_class:serializers.Serializer.__class__) -> None:
+        self.serializer_class = serializer_class
+        # (kind, name, getter or method name, formatter)
+        self.entries:list[tuple[int, str, Any, Callable[[Any], Any] | None]] = []
+        
+        model = serializer_class.Meta.model
+        # The fields of the prototype keep the formats patched by get_fields
+        for name, field in serializer_class().fields.items():
+            if field.write_only:
+                continue
+            self.entries.append(self.compile_field(model, name, field))
+    
+    def compile_field(self, model:Model.__class__, name:str, field:Field) -> tuple[int, str, Any, Callable[[Any], Any] | None]:
+        if isinstance(field, SQLMethodField):
+            return self.ANNOTATION, name, field.method_name, None
+        if isinstance(field, BatchSerializerMethodField):
+            return self.BATCH, name, None, None
+        if isinstance(field, serializers.SerializerMethodField):
+            return self.METHOD, name, field.method_name, None
+        if field.source == "*" or isinstance(field, (serializers.BaseSerializer, serializers.ManyRelatedField)):
+            return self.FIELD, name, None, None
+        if is_context_field(field):
+            # The prototype has no context, the field of the current serializer has the request
+            return self.FIELD, name, None, None
+        
+        resolved = get_values_path(model, list(field.source_attrs))
+        if resolved is None:
+            return self.FIELD, name, None, None
+        model_field = resolved[1]
+        
+        if model_field.is_relation:
+            if not isinstance(field, serializers.PrimaryKeyRelatedField):
+                return self.FIELD, name, None, None
+            getter = attrgetter(".".join([*field.source_attrs[:-1], model_field.attname]))
+            formatter = field.pk_field.to_representation if field.pk_field is not None else None
+            return self.ATTRIBUTE, name, getter, formatter
+        
+        if isinstance(field, serializers.RelatedField) or type(field).get_attribute is not Field.get_attribute:
+            return self.FIELD, name, None, None
+        
+        formatter = None if isinstance(field, VALUES_PASSTHROUGH_FIELDS) else field.to_representation
+        return self.ATTRIBUTE, name, attrgetter(".".join(field.source_attrs)), formatter
+    
+    def serialize_field(self, serializer:serializers.Serializer, name:str, instance:Any, row:dict[str, Any]) -> None:
+        """Serializes one field with the DRF field of the serializer, like Serializer.to_representation
+        """
+        field = serializer.fields[name]
+        try:
+            attribute = field.get_attribute(instance)
+        except SkipField:
+            return
+        check_for_none = attribute.pk if isinstance(attribute, PKOnlyObject) else attribute
+        row[name] = None if check_for_none is None else field.to_representation(attribute)
+    
+    def serialize_many(self, serializer:serializers.Serializer, instances:Iterable[Any]) -> list[dict[str, Any]]:
+        """
+        Args:
+            serializer (serializers.Serializer): The child serializer of the list, with the context
+            instances (Iterable[Any]): Model instances
+
+        Returns:
+            list[dict[str, Any]]: The serialized instances
+        """
+        ATTRIBUTE, METHOD, ANNOTATION, BATCH = self.ATTRIBUTE, self.METHOD, self.ANNOTATION, self.BATCH
+        batch_values = getattr(serializer, "_batch_values", {})
+        entries = []
+        for kind, name, getter, formatter in self.entries:
+            if kind in (METHOD, ANNOTATION):
+                getter = getattr(serializer, getter)
+            elif kind == BATCH:
+                getter = batch_values.get(name)
+                if getter is None:
+                    # prepare_batch wasn't called, the field computes the value
+                    kind = self.FIELD
+            entries.append((kind, name, getter, formatter))
+        
+        data = []
+        for instance in instances:
+            if isinstance(instance, Mapping):
+                # values() rows can't use the getters
+                data.append(serializer.to_representation(instance))
+                continue
+            row = {}
+            for kind, name, getter, formatter in entries:
+                if kind == ATTRIBUTE:
+                    try:
+                        value = getter(instance)
+                    except (AttributeError, ObjectDoesNotExist):
+                        # A null relation in the path, DRF decides if it's None, the default or skipped
+                        self.serialize_field(serializer, name, instance, row)
+                        continue
+                    row[name] = value if formatter is None or value is None else formatter(value)
+                elif kind == METHOD:
+                    row[name] = getter(instance)
+                elif kind == ANNOTATION:
+                    values = instance.__dict__
+                    row[name] = values[name] if name in values else getter(instance)
+                elif kind == BATCH:
+                    row[name] = getter.get(instance.pk)
+                else:
+                    self.serialize_field(serializer, name, instance, row)
+            data.append(row)
+        return data
+
+
+@cache
+def compile_serializer(serializer_class:serializers.Serializer.__class__) -> CompiledSerializer | None:
+    """
+    Returns:
+        CompiledSerializer | None: The compiled plan of the class, None if it isn't a ModelSerializer
+        or overrides to_representation
+    """
+    model = getattr(getattr(serializer_class, "Meta", None), "model", None)
+    if model is None or serializer_class.to_representation is not serializers.Serializer.to_representation:
+        return None
+    return CompiledSerializer(serializer_class)
+
+
+class CompiledListSerializer(serializers.ListSerializer):
+    """
+    ListSerializer of the read only serializers that uses the CompiledSerializer of the child class,
+    instead of walking the DRF fields of every row.
+    The batch method fields of the child are computed once for the whole list.
+    """
+    
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, BaseManager) else data
+        if self.child.get_batch_methods():
+            iterable = list(iterable)
+            self.child.prepare_batch(iterable)
+        
+        compiled = compile_serializer(type(self.child))
+        if compiled is None:
+            return super().to_representation(iterable)
+        return compiled.serialize_many(self.child, iterable)
+
+
+def diff_compiled_serializer(serializer_class:serializers.Serializer.__class__, instances:Iterable[Any], context:dict | None = None) -> list[tuple[int, str, Any, Any]]:
+    """Verification mode of the compiled serializers: serializes the instances with the
+    CompiledSerializer and with the standard DRF path and returns the differences.
+
+    Args:
+        serializer_class (serializers.Serializer.__class__): Read only serializer
+        instances (Iterable[Any]): Model instances
+        context (dict | None, optional): Serializer context. Defaults to a GET request to "/", like
+            the viewsets, so the fields that read the request (absolute urls) are compared too.
+
+    Returns:
+        list[tuple[int, str, Any, Any]]: (row, field, DRF value, compiled value), empty if the outputs are equal
+    """
+    if context is None:
+        from rest_framework.request import Request
+        from rest_framework.test import APIRequestFactory
+        context = {"request": Request(APIRequestFactory().get("/"))}
+    instances = list(instances)
+    child = serializer_class(context=context)
+    expected = serializers.ListSerializer(instances, child=serializer_class(context=context), context=context).data
+    compiled = compile_serializer(serializer_class)
+    if getattr(child, "get_batch_methods", dict)():
+        child.prepare_batch(instances)
+    result = compiled.serialize_many(child, instances) if compiled is not None else expected
+    
+    differences = []
+    for position, (expected_row, row) in enumerate(zip(expected, result)):
+        for name in dict.fromkeys([*expected_row.keys(), *row.keys()]):
+            if name not in expected_row or name not in row or expected_row[name] != row[name]:
+                differences.append((position, name, expected_row.get(name), row.get(name)))
+    return differences
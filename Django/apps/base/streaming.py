@@ -0,0 +1,113 @@
+import csv
+import json
+from itertools import islice
+from typing import Any, Callable, Iterable, Iterator
+from django.db.models import QuerySet
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+NDJSON_CONTENT_TYPE = "application/x-ndjson"
+
+
+class NDJSONRenderer(JSONRenderer):
+    """Lets the content negotiation accept "Accept: application/x-ndjson".
+    The streamed lists don't use it, it only renders the regular responses (errors) as one JSON line
+    """
+    media_type = NDJSON_CONTENT_TYPE
+    format = "ndjson"
+
+
+def iter_queryset_chunks(queryset:QuerySet | Iterable[Any], chunk_size:int = 1000) -> Iterator[list[Any]]:
+    """Iterates a queryset in lists of chunk_size rows.
+    The queryset is read with QuerySet.iterator, that uses a server side cursor
+    on Postgres, so only one chunk lives in memory at a time.
+
+    Args:
+        queryset (QuerySet | Iterable[Any]): Data to iterate
+        chunk_size (int, optional): Rows per chunk. Defaults to 1000.
+
+    Yields:
+        Iterator[list[Any]]: Lists with at most chunk_size rows
+    """
+    if isinstance(queryset, QuerySet):
+        iterator = queryset.iterator(chunk_size=chunk_size)
+    else:
+        iterator = iter(queryset)
+
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_serialized_chunks(chunks:Iterable[list[Any]], serialize:Callable[[list[Any]], list[dict]]) -> Iterator[list[dict]]:
+    """Serializes every chunk
+
+    Args:
+        chunks (Iterable[list[Any]]): Chunks from iter_queryset_chunks
+        serialize (Callable[[list[Any]], list[dict]]): Function that serializes a chunk, like serializer(many=True).data
+
+    Yields:
+        Iterator[list[dict]]: The serialized chunks
+    """
+    for chunk in chunks:
+        yield serialize(chunk)
+
+
+def dumps(data:Any) -> str:
+    """json.dumps with the encoder of DRF, that handles dates, decimals, uuids, etc.
+    """
+    return json.dumps(data, cls=JSONEncoder, ensure_ascii=False)
+
+
+def iter_json_array(chunks:Iterable[list[dict]]) -> Iterator[str]:
+    """Writes the serialized chunks as one JSON array, one chunk at a time
+
+    Yields:
+        Iterator[str]: "[", the rows of every chunk separated by commas and "]"
+    """
+    yield "["
+    separator = ""
+    for chunk in chunks:
+        if not chunk:
+            continue
+        yield separator + ",".join(dumps(row) for row in chunk)
+        separator = ","
+    yield "]"
+
+
+def iter_ndjson(chunks:Iterable[list[dict]]) -> Iterator[str]:
+    """Writes the serialized chunks as newline delimited JSON (one JSON document per line)
+    """
+    for chunk in chunks:
+        if chunk:
+            yield "".join(dumps(row) + "\n" for row in chunk)
+
+
+class Echo:
+    """File like object that returns what is written instead of storing it,
+    so csv.writer produces the lines one by one for a StreamingHttpResponse
+    """
+    def write(self, value:str) -> str:
+        return value
+
+
+def iter_csv(chunks:Iterable[list[dict]], columns:list[str], delimiter:str = ";", header:bool = True) -> Iterator[str]:
+    """Writes the serialized chunks as CSV, the header first and then one string per chunk
+
+    Args:
+        chunks (Iterable[list[dict]]): The serialized chunks
+        columns (list[str]): The columns (keys of the rows) in order
+        delimiter (str, optional): Defaults to ";".
+        header (bool, optional): Writes the names of the columns first. Defaults to True.
+
+    Yields:
+        Iterator[str]: The lines of the CSV
+    """
+    writer = csv.writer(Echo(), delimiter=delimiter)
+    if header:
+        yield writer.writerow(columns)
+    for chunk in chunks:
+        if chunk:
+            yield "".join(writer.writerow([row.get(column) for column in columns]) for row in chunk)
@@ -0,0 +1,28 @@
+from celery import shared_task
+from django.apps import apps
+from django.utils.module_loading import import_string
+from apps.base.exports import cleanup_export_jobs, run_export_job
+from apps.base.search.autocomplete import AutocompleteIndex
+
+
+@shared_task(ignore_result=True)
+def run_export_job_task(job_id:str) -> None:
+    """Generates the report of an ExportJob (ReportViewMixin.download_report with "?async=true")
+    """
+    run_export_job(job_id)
+
+
+@shared_task(ignore_result=True)
+def cleanup_export_jobs_task() -> None:
+    """Deletes the expired export jobs, scheduled in CELERY_BEAT_SCHEDULE
+    """
+    cleanup_export_jobs()
+
+
+@shared_task(ignore_result=True)
+def build_autocomplete_index_task(model:str, viewset:str) -> None:
+    """Builds a stale autocomplete index (AutocompleteIndex.schedule_build),
+    importing the viewset registers its fields in the worker
+    """
+    import_string(viewset)
+    AutocompleteIndex(apps.get_model(model), viewset).build()
@@ -1,11 +1,17 @@
 
 
-from typing import Any
+from contextlib import contextmanager
+from typing import Any, Iterator
 from faker import Faker
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework.response import Response
 from django.db.models import Model
 from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
 from apps.base.models import BaseModel
+from apps.base.serializers import diff_compiled_serializer
 # Create your tests here.
 
 class BaseFactory:
@@ -124,6 +130,99 @@ class ReadOnlyTestCaseMixin(FactoryMixin):
         self.Messages.ok(f"TEST RETRIEVE {self.model_name} COMPLETED OK ✅")
 
 
+class CompiledSerializerTestCaseMixin(FactoryMixin):
+    """
+    Test case mixin that verifies the compiled read only serializer
+    returns the same data than the standard DRF serialization
+    """
+    read_only_serializer = None
+    
+    def get_serializer_context(self) -> dict[str, Any]:
+        """Context of the viewsets, the request builds the absolute urls (files, hyperlinks)"""
+        return {"request": Request(APIRequestFactory().get(self.get_endpoint()))}
+    
+    def test_compiled_serializer(self):
+        self.assertNotEqual(self.read_only_serializer, None, "No se proporcionó el read_only_serializer")
+        factory = self.get_factory()
+        factory.create_bulk(20)
+        
+        instances = self.get_model().objects.all()
+        differences = diff_compiled_serializer(self.read_only_serializer, instances, self.get_serializer_context())
+        
+        self.assertEqual(differences, [], "(row, field, DRF value, compiled value)")
+        
+        self.Messages.ok(f"TEST COMPILED SERIALIZER {self.model_name} COMPLETED OK ✅")
+
+
+class QueryBudgetTestCaseMixin(FactoryMixin):
+    """
+    Test case mixin that fails if an endpoint makes more queries than its budget,
+    to catch the N+1 and the extra round trips in the read and write paths.
+    The budgets are the max number of queries of one request, None skips the test.
+    The list is requested with several rows, its budget must not depend on them.
+    """
+    list_query_budget:int | None = None
+    retrieve_query_budget:int | None = None
+    create_query_budget:int | None = None
+    update_query_budget:int | None = None
+    
+    @contextmanager
+    def assertMaxQueries(self, budget:int) -> Iterator[CaptureQueriesContext]:
+        with CaptureQueriesContext(connection) as context:
+            yield context
+        queries = "\n".join(query["sql"] for query in context.captured_queries)
+        self.assertLessEqual(
+            len(context.captured_queries), budget,
+            f"{len(context.captured_queries)} queries, the budget is {budget}:\n{queries}",
+        )
+    
+    def test_list_query_budget(self):
+        if self.list_query_budget is None:
+            self.skipTest("No list_query_budget")
+        self.get_factory().create_bulk(30)
+        
+        with self.assertMaxQueries(self.list_query_budget):
+            response:Response = self.client.get(path=self.get_endpoint())
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.Messages.ok(f"TEST LIST QUERY BUDGET {self.model_name} COMPLETED OK ✅")
+    
+    def test_retrieve_query_budget(self):
+        if self.retrieve_query_budget is None:
+            self.skipTest("No retrieve_query_budget")
+        obj:Model = self.get_factory().create()
+        
+        with self.assertMaxQueries(self.retrieve_query_budget):
+            response:Response = self.client.get(self.get_endpoint() + f"/{obj.pk}")
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.Messages.ok(f"TEST RETRIEVE QUERY BUDGET {self.model_name} COMPLETED OK ✅")
+    
+    def test_create_query_budget(self):
+        if self.create_query_budget is None:
+            self.skipTest("No create_query_budget")
+        create_data = self.get_factory().get_json()
+        
+        with self.assertMaxQueries(self.create_query_budget):
+            response:Response = self.client.post(self.get_endpoint() + "/", data=create_data)
+        
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        self.Messages.ok(f"TEST CREATE QUERY BUDGET {self.model_name} COMPLETED OK ✅")
+    
+    def test_update_query_budget(self):
+        if self.update_query_budget is None:
+            self.skipTest("No update_query_budget")
+        factory = self.get_factory()
+        obj:Model = factory.create()
+        update_data = factory.get_json()
+        
+        with self.assertMaxQueries(self.update_query_budget):
+            response:Response = self.client.patch(self.get_endpoint() + f"/{obj.pk}/", data=update_data)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.Messages.ok(f"TEST UPDATE QUERY BUDGET {self.model_name} COMPLETED OK ✅")
+
+
 class CreateTestCaseMixin(FactoryMixin):
     """
     Test case mixin for create
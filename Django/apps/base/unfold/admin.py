@@ -1,3 +1,4 @@
+from contextvars import ContextVar
 from typing import Any, Sequence
 from django.contrib import admin
 from django.db.models.query import QuerySet
@@ -6,7 +7,17 @@ from unfold.admin import ModelAdmin
 from django.utils.translation import gettext_lazy as _
 from datetime import datetime as dt
 from django.contrib import messages
-from apps.base.models import BaseModel
+from django.db import models, router, transaction
+from django.db.models.signals import post_save, pre_save
+from django.utils import timezone
+from apps.base.cache.base_manager import coalesce_cache_invalidation
+from apps.base.metrics import refresh_model_metrics
+from apps.base.models import ActiveObjectsMixin, BaseModel, CacheMixin, DirtyFieldsMixin
+from apps.base.search.autocomplete import AutocompleteIndex
+from apps.base.unfold.performance import ActiveStatusListFilter, EstimatedCountPaginator, get_list_display_relations, get_table_size
+
+# show_full_result_count of the changelist being built, None outside of get_changelist_instance
+_show_full_result_count:ContextVar[bool | None] = ContextVar("show_full_result_count", default=None)
 
 class UnfoldModelAdmin(ModelAdmin):
     """
@@ -20,11 +31,74 @@ class UnfoldModelAdmin(ModelAdmin):
     - Automatically adds audit fields when editing existing objects
     - Handles the 'changed_by' field automatically on save
     - Implements a soft delete functionality
+    
+    With performance_mode (for big tables):
+    - The unfiltered count is the estimation of PostgreSQL and the total count of the
+      filtered changelists is not shown if the table has more than performance_count_threshold rows
+    - list_select_related is derived from the relations of the list_display
+    - The deep pages read the pks first and then the rows (EstimatedCountPaginator)
+    - Adds the status (with the condition of the partial indexes) and deleted_date filters
     """
     
     # Define audit fields
     audit_fields = ('status', 'created_date', 'modified_date', 'deleted_date', 'changed_by')
     prefetch_related:Sequence[str] = ()
+    performance_mode:bool = False
+    performance_count_threshold:int = 10000
+    performance_late_lookup_offset:int = 1000
+    
+    @property
+    def show_full_result_count(self) -> bool:
+        if not self.performance_mode:
+            return True
+        show_full_result_count = _show_full_result_count.get()
+        if show_full_result_count is None:
+            show_full_result_count = self.get_show_full_result_count()
+        return show_full_result_count
+    
+    def get_show_full_result_count(self) -> bool:
+        table_size = get_table_size(self.model)
+        return table_size is None or table_size <= self.performance_count_threshold
+    
+    def get_changelist_instance(self, request:HttpRequest):
+        """
+        The ChangeList reads show_full_result_count more than once,
+        the size of the table is read once per changelist.
+        """
+        if not self.performance_mode:
+            return super().get_changelist_instance(request)
+        token = _show_full_result_count.set(self.get_show_full_result_count())
+        try:
+            return super().get_changelist_instance(request)
+        finally:
+            _show_full_result_count.reset(token)
+    
+    def get_paginator(self, request:HttpRequest, queryset:QuerySet, per_page:int, orphans:int = 0, allow_empty_first_page:bool = True):
+        if not self.performance_mode:
+            return super().get_paginator(request, queryset, per_page, orphans, allow_empty_first_page)
+        return EstimatedCountPaginator(
+            queryset, per_page, orphans, allow_empty_first_page,
+            count_threshold=self.performance_count_threshold,
+            late_lookup_offset=self.performance_late_lookup_offset,
+        )
+    
+    def get_list_select_related(self, request:HttpRequest) -> bool | Sequence[str]:
+        list_select_related = super().get_list_select_related(request)
+        if not self.performance_mode or list_select_related is True:
+            return list_select_related
+        relations = get_list_display_relations(self.model, self.get_list_display(request))
+        return [*(list_select_related or ()), *(relation for relation in relations if relation not in (list_select_related or ()))]
+    
+    def get_list_filter(self, request:HttpRequest) -> Sequence[Any]:
+        list_filter = list(super().get_list_filter(request))
+        if not self.performance_mode:
+            return list_filter
+        field_names = {field.name for field in self.model._meta.concrete_fields}
+        if "status" in field_names and hasattr(self.model, "deactivated_status") and "status" not in list_filter:
+            list_filter.append(ActiveStatusListFilter)
+        if "deleted_date" in field_names and "deleted_date" not in list_filter:
+            list_filter.append("deleted_date")
+        return list_filter
     
     @property
     def prefetch_related_fields(self) -> Sequence[str]:
@@ -35,7 +109,14 @@ class UnfoldModelAdmin(ModelAdmin):
         return ()
     
     def get_queryset(self, request: HttpRequest) -> QuerySet[Any]:
-        qs = super().get_queryset(request)
+        if issubclass(self.model, ActiveObjectsMixin):
+            # The default manager hides the deactivated rows, the admin shows all of them
+            qs = self.model.all_objects.get_queryset()
+            ordering = self.get_ordering(request)
+            if ordering:
+                qs = qs.order_by(*ordering)
+        else:
+            qs = super().get_queryset(request)
         return qs.prefetch_related(*self.prefetch_related_fields)
     
     def get_audit_fieldset(self, request, obj=None):
@@ -103,25 +184,140 @@ class UnfoldModelAdmin(ModelAdmin):
         else:
             super().delete_model(request, obj)
 
+    def save_related(self, request, form, formsets, change):
+        """
+        Saves the m2m and the inlines clearing the cache of every model once at the end.
+        """
+        with coalesce_cache_invalidation():
+            super().save_related(request, form, formsets, change)
+
     def save_formset(self, request, form, formset, change):
         """
-        Handles the 'changed_by' field for inline forms (formsets).
+        Saves the inline forms (formsets) in batches: the new objects with one bulk_create,
+        the changed ones with one bulk_update of the changed fields and the deleted ones
+        with one soft delete UPDATE (or one DELETE if the model has no status).
+        Handles the 'changed_by' field. The models that can't skip save() and delete()
+        (see can_bulk_save_formset and can_bulk_delete_formset) are saved one by one.
         """
         instances = formset.save(commit=False)
+        model = formset.model
         for instance in instances:
             if hasattr(instance, 'changed_by'):
                 instance.changed_by = request.user
-            instance.save()
-        formset.save_m2m()
-        for obj in formset.deleted_objects:
-            if hasattr(obj, 'status') and hasattr(obj, 'deleted_date'):
-                obj.status = obj.deactivated_status
-                obj.deleted_date = dt.now()
-                if hasattr(obj, 'changed_by'):
-                    obj.changed_by = request.user
-                obj.save()
+
+        with transaction.atomic(using=router.db_for_write(model)), coalesce_cache_invalidation():
+            if self.can_bulk_save_formset(model):
+                self.bulk_save_formset_objects(request, formset, model)
+            else:
+                for instance in instances:
+                    instance.save()
+            formset.save_m2m()
+            if self.can_bulk_delete_formset(model):
+                self.bulk_delete_formset_objects(request, model, formset.deleted_objects)
             else:
-                obj.delete()
+                for obj in formset.deleted_objects:
+                    self.delete_formset_object(request, obj)
+            if instances or formset.deleted_objects:
+                self.invalidate_formset_model(model)
+
+    def can_bulk_save_formset(self, model) -> bool:
+        """
+        The bulk operations skip save() and the signals, only the save() of the base mixins
+        (cache and dirty fields) is redone by invalidate_formset_model.
+        
+        Returns:
+            bool: False for the models with multi table inheritance (bulk_create can't be used),
+            a custom save() or pre_save/post_save receivers (metrics included)
+        """
+        if model._meta.parents:
+            return False
+        save_owner = next(klass for klass in model.__mro__ if 'save' in vars(klass))
+        if save_owner not in (models.Model, CacheMixin, DirtyFieldsMixin):
+            return False
+        return not (pre_save.has_listeners(model) or post_save.has_listeners(model))
+
+    def can_bulk_delete_formset(self, model) -> bool:
+        """
+        The soft delete UPDATE redoes the status branch of delete_formset_object and
+        the DELETE a plain delete(), the models with the delete() of the mixins
+        (soft delete without 'deleted_date') or a custom one are deleted one by one.
+        """
+        if not self.can_bulk_save_formset(model):
+            return False
+        field_names = {field.name for field in model._meta.concrete_fields}
+        if {'status', 'deleted_date'} <= field_names:
+            return True
+        delete_owner = next(klass for klass in model.__mro__ if 'delete' in vars(klass))
+        return delete_owner is models.Model
+
+    def delete_formset_object(self, request, obj) -> None:
+        """
+        Soft deletes an object of the formset if it has 'status' and 'deleted_date',
+        otherwise calls its delete().
+        """
+        if hasattr(obj, 'status') and hasattr(obj, 'deleted_date'):
+            obj.status = obj.deactivated_status
+            obj.deleted_date = dt.now()
+            if hasattr(obj, 'changed_by'):
+                obj.changed_by = request.user
+            obj.save()
+        else:
+            obj.delete()
+
+    def invalidate_formset_model(self, model) -> None:
+        """
+        The bulk operations don't call save() nor send signals, so the cache,
+        the autocomplete index and the dashboard metrics of the model are invalidated once here.
+        """
+        if hasattr(model, 'clear_cache'):
+            model.clear_cache()
+        AutocompleteIndex.invalidate(model)
+        refresh_model_metrics(model)
+
+    def bulk_save_formset_objects(self, request, formset, model) -> None:
+        """
+        Creates the new objects of the formset with bulk_create and updates the changed
+        ones with bulk_update, only the changed fields (and the auto_now ones) are written.
+        """
+        if formset.new_objects:
+            model._base_manager.bulk_create(formset.new_objects)
+
+        if not formset.changed_objects:
+            return
+        concrete_fields = {field.name: field for field in model._meta.concrete_fields if not field.primary_key}
+        update_fields = {'changed_by'} & set(concrete_fields)
+        for instance, changed_fields in formset.changed_objects:
+            update_fields.update(name for name in changed_fields if name in concrete_fields)
+        now = timezone.now()
+        for name, field in concrete_fields.items():
+            if getattr(field, 'auto_now', False):
+                update_fields.add(name)
+                for instance, _changed in formset.changed_objects:
+                    setattr(instance, field.attname, now)
+        if update_fields:
+            model._base_manager.bulk_update([instance for instance, _changed in formset.changed_objects], sorted(update_fields))
+
+    def bulk_delete_formset_objects(self, request, model, deleted_objects) -> None:
+        """
+        Soft deletes the deleted objects of the formset with one UPDATE if the model
+        has 'status' and 'deleted_date' fields, otherwise deletes them with one DELETE.
+        Only for the models of can_bulk_delete_formset.
+        """
+        pks = [obj.pk for obj in deleted_objects if obj.pk is not None]
+        if not pks:
+            return
+        field_names = {field.name for field in model._meta.concrete_fields}
+        if {'status', 'deleted_date'} <= field_names:
+            now = timezone.now()
+            values = {
+                field.name: now for field in model._meta.concrete_fields if getattr(field, 'auto_now', False)
+            }
+            values.update({'status': model.deactivated_status, 'deleted_date': now})
+            if 'changed_by' in field_names:
+                values['changed_by'] = request.user
+            model._base_manager.filter(pk__in=pks).update(**values)
+        else:
+            model._base_manager.filter(pk__in=pks).delete()
 
 class UnfoldModelAdminWithManualStatus(UnfoldModelAdmin):
     """
@@ -0,0 +1,129 @@
+from typing import Any, Sequence
+from django.contrib import admin
+from django.core.exceptions import FieldDoesNotExist
+from django.core.paginator import Page, Paginator
+from django.db import connections, router
+from django.db.models import Model, Q, QuerySet
+from django.http import HttpRequest
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+
+
+def get_estimated_count(queryset:QuerySet) -> int | None:
+    """
+    Returns the number of rows of the table estimated by PostgreSQL (pg_class.reltuples),
+    updated by VACUUM / ANALYZE, without scanning the table.
+
+    Returns:
+        int | None: The estimation, None if the queryset is filtered, the database is not
+        PostgreSQL or the table was never analyzed.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql" or queryset.query.where:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+            [connection.ops.quote_name(queryset.model._meta.db_table)],
+        )
+        row = cursor.fetchone()
+    if row is None or row[0] < 0:
+        return None
+    return row[0]
+
+
+def get_table_size(model:Model.__class__, using:str | None = None) -> int | None:
+    """
+    Args:
+        using (str | None, optional): Database alias. Defaults to the read database of the model.
+    """
+    return get_estimated_count(model._base_manager.using(using or router.db_for_read(model)).all())
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator for the changelists of big tables.
+
+    - The count of an unfiltered changelist is the estimation of PostgreSQL if it's above
+      count_threshold, instead of a COUNT(*) over the whole table.
+    - The pages after late_lookup_offset read only the pks of the page with OFFSET
+      (an index only scan) and then the rows by pk, instead of building the whole
+      rows that OFFSET skips. The admin links pages by number, so a real keyset
+      (WHERE pk < last) can't be used.
+    """
+    def __init__(self, *args, count_threshold:int = 10000, late_lookup_offset:int = 1000, **kwargs) -> None:
+        self.count_threshold = count_threshold
+        self.late_lookup_offset = late_lookup_offset
+        super().__init__(*args, **kwargs)
+
+    @cached_property
+    def count(self) -> int:
+        estimated = get_estimated_count(self.object_list) if isinstance(self.object_list, QuerySet) else None
+        if estimated is not None and estimated > self.count_threshold:
+            return estimated
+        return super().count
+
+    def page(self, number:Any) -> Page:
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        if bottom < self.late_lookup_offset or not isinstance(self.object_list, QuerySet):
+            return super().page(number)
+
+        top = bottom + self.per_page
+        if top + self.orphans >= self.count:
+            top = self.count
+        pks = list(self.object_list.values_list("pk", flat=True)[bottom:top])
+        rows = self.object_list.filter(pk__in=pks).in_bulk() if pks else {}
+        return self._get_page([rows[pk] for pk in pks if pk in rows], number, self)
+
+
+class ActiveStatusListFilter(admin.SimpleListFilter):
+    """
+    Filter by active / deactivated rows with the same condition than the
+    ActiveManager, so PostgreSQL can use the partial indexes of ActiveObjectsMixin
+    """
+    title = _("Status")
+    parameter_name = "active"
+
+    def lookups(self, request:HttpRequest, model_admin:admin.ModelAdmin) -> Sequence[tuple[str, str]]:
+        return (("1", _("Active")), ("0", _("Deactivated")))
+
+    def get_active_condition(self, model:Model.__class__) -> Q:
+        get_active_condition = getattr(model._default_manager, "get_active_condition", None)
+        if get_active_condition is not None:
+            return get_active_condition()
+        return ~Q(status=model.deactivated_status)
+
+    def queryset(self, request:HttpRequest, queryset:QuerySet) -> QuerySet | None:
+        if self.value() == "1":
+            return queryset.filter(self.get_active_condition(queryset.model))
+        if self.value() == "0":
+            return queryset.exclude(self.get_active_condition(queryset.model))
+        return queryset
+
+
+def get_list_display_relations(model:Model.__class__, list_display:Sequence[Any]) -> list[str]:
+    """
+    Returns:
+        list[str]: The forward relations (ForeignKey, OneToOne) shown in the list_display,
+        "user" and "user__department" for "user__department__name"
+    """
+    relations = []
+    for item in list_display:
+        if not isinstance(item, str):
+            continue
+        current_model, path = model, []
+        for part in item.split("__"):
+            try:
+                field = current_model._meta.get_field(part)
+            except FieldDoesNotExist:
+                break
+            if not (field.is_relation and (field.many_to_one or field.one_to_one) and field.concrete):
+                break
+            path.append(part)
+            current_model = field.related_model
+        if path:
+            relation = "__".join(path)
+            if relation not in relations:
+                relations.append(relation)
+    return relations
@@ -15,6 +15,14 @@ def get_birth_date_from_age(age:int) -> dt.date:
     return fecha_actual.year - age
 
 
+def get_viewset_path(viewset_class:type) -> str:
+    """
+    Returns:
+        str: Import path of the viewset, "apps.users.viewsets.UserViewset"
+    """
+    return "%s.%s" % (viewset_class.__module__, viewset_class.__qualname__)
+
+
 class MessageManager:
     OKGREEN = '\033[92m'
     OKBLUE = '\033[94m'
@@ -1,3 +1,16 @@
-from django.shortcuts import render
+from rest_framework.permissions import IsAdminUser
+from rest_framework.request import Request
+from rest_framework.views import APIView
+from apps.base.responses import BaseResponse
+from core.db_backends.pool import get_pools_stats
 
-# Create your views here.
+
+class DatabasePoolStatsView(APIView):
+    """
+    Stats of the database connection pools of the worker process that answers the request
+    (size, idle and in use connections, waits and timeouts).
+    """
+    permission_classes = [IsAdminUser]
+    
+    def get(self, request:Request, *args, **kwargs):
+        return BaseResponse.ok(get_pools_stats())
@@ -0,0 +1,179 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import FieldError, ValidationError
+from django.db.models import Model, QuerySet
+from django.http.response import Http404
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.response import Response
+from apps.base.cache.generic_cache_manager import ViewsetCacheManager
+from apps.base.query_guard import is_query_canceled
+from apps.base.serializers import ValuesSerializer
+from apps.base.viewsets.viewset_mixins import BaseMixin, GetQuerysetMixin, ListObjectMixin, RetrieveObjectMixin
+from django.utils.translation import gettext_lazy as _
+
+
+class AsyncViewSetMixin(BaseMixin):
+    """
+    Makes the viewset an async view, so under ASGI a request that waits for the
+    database or the cache doesn't block a worker thread.
+
+    The handlers can be coroutines (async def list) or regular methods, the regular
+    ones run in a thread with sync_to_async. The authentication, permissions and throttling
+    (initial) run in a thread too because they can query the database.
+    Under WSGI Django runs the view with async_to_sync, so the viewset keeps working.
+    """
+    async_dispatch:bool = True
+
+    @classmethod
+    def as_view(cls, actions:dict = None, **initkwargs):
+        view = super().as_view(actions, **initkwargs)
+        # Tells Django's handler that the view must be awaited
+        markcoroutinefunction(view)
+        return view
+
+    async def dispatch(self, request, *args, **kwargs):
+        """Same as APIView.dispatch but awaits the handler
+        """
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            if iscoroutinefunction(handler):
+                response = await handler(request, *args, **kwargs)
+            else:
+                response = await sync_to_async(handler)(request, *args, **kwargs)
+
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = await sync_to_async(self.finalize_response)(request, response, *args, **kwargs)
+        return self.response
+
+
+class AsyncGetQuerysetMixin(GetQuerysetMixin):
+    """GetQuerysetMixin with the object lookup through the async ORM
+    """
+
+    async def aget_object_or_none(self, pk:str) -> Model | None:
+        return await self.get_queryset().filter(pk=pk).afirst()
+
+
+class AsyncRetrieveObjectMixin(RetrieveObjectMixin):
+    """RetrieveObjectMixin with the cache and the query awaited instead of blocking the thread
+    """
+
+    async def retrieve(self, request:Request, pk:str, *args, **kwargs):
+        """
+        Async version of RetrieveObjectMixin.retrieve.
+        The serializer runs in a thread because the method fields can query the database.
+        """
+        if not pk.isdigit():
+            return self.get_bad_request({"pk": [_("Id expected, but got %s" % pk)]}, message=_("Invalid Pk received at the endpoint"))
+
+        cache_manager = ViewsetCacheManager(self.get_model())
+        cache_key:str = cache_manager.get_cache_key(request=request)
+        serialized_cache_data = await cache_manager.aget_cache_data(cache_key=cache_key)
+        if serialized_cache_data:
+            return self.get_ok_response(serialized_cache_data)
+
+        obj:Model | None = await self.aget_object_or_none(pk)
+
+        if obj is not None:
+            data = await sync_to_async(lambda: self.get_readonly_serializer(instance=obj).data)()
+            await cache_manager.aset_cache_data(cache_key, data, settings.CACHE_LIFETIME)
+            return self.get_ok_response(data)
+
+        return self.get_not_found_response()
+
+
+class AsyncListObjectMixin(ListObjectMixin):
+    """
+    ListObjectMixin with the count, the page and the cache read with the async ORM and cache.
+
+    The streamed lists are delegated to the sync list in a thread, StreamingHttpResponse
+    consumes their iterators in a thread under ASGI.
+    """
+
+    async def apaginate_queryset(self, queryset:QuerySet) -> list | None:
+        if self.paginator is None:
+            return None
+        if hasattr(self.paginator, "apaginate_queryset"):
+            return await self.paginator.apaginate_queryset(queryset, self.request, view=self)
+        return await sync_to_async(self.paginator.paginate_queryset)(queryset, self.request, view=self)
+
+    async def aget_data(self, request:Request, values_serializer_class:ValuesSerializer.__class__ | None = None) -> tuple[dict|list, int]:
+        """
+        Async version of get_data with pagination, the filters are only built here,
+        the queries run when the page is awaited. filter_queryset runs in a thread, the
+        query cost check of the StatementTimeoutMixin plans the query (EXPLAIN) with the sync ORM.
+
+        Returns:
+            tuple[dict|list, int]: The page and the status code.
+        """
+        filtros, excludes = self.get_filtros(request.query_params, self.get_special_query_params())
+
+        try:
+            data:QuerySet = self.get_filtered_qs(filtros, excludes)
+            data = await sync_to_async(self.filter_queryset)(data)
+            if values_serializer_class is not None:
+                data = values_serializer_class(data).get_values_queryset()
+            paged_data = await self.apaginate_queryset(data)
+            if paged_data is None:
+                paged_data = [item async for item in data]
+
+        except (FieldError, ValueError, ValidationError) as err:
+            return {"message": err.args[0]}, status.HTTP_400_BAD_REQUEST
+        except Http404:
+            return {"message": "No results found"}, status.HTTP_404_NOT_FOUND
+        except APIException:
+            raise
+        except Exception as err:
+            if is_query_canceled(err):
+                raise
+            return {"message": "Unknown error at get_data: %s" % err.args.__str__()}, status.HTTP_400_BAD_REQUEST
+
+        return paged_data, status.HTTP_200_OK
+
+    async def list(self, request:Request, *args, **kwargs):
+        """
+        Async version of ListObjectMixin.list.
+        The rows of a values serializer are plain dicts and are serialized in the event loop,
+        the model instances are serialized in a thread because the method fields can query the database.
+        """
+        if self.get_stream_format(request) is not None:
+            return await sync_to_async(super().list)(request, *args, **kwargs)
+
+        values_serializer_class = self.get_values_serializer_class()
+
+        cache_manager = ViewsetCacheManager(self.get_model())
+        cache_key:str = cache_manager.get_cache_key(request=request)
+        serialized_cache_data = await cache_manager.aget_cache_data(cache_key=cache_key)
+        if serialized_cache_data:
+            return self.get_ok_response(serialized_cache_data)
+
+        data, status_code = await self.aget_data(request, values_serializer_class)
+        if not status_code == status.HTTP_200_OK:
+            return Response(data, status_code)
+
+        if data:
+            if values_serializer_class is not None:
+                serialized_data = self.get_list_serializer(data, values_serializer_class).data
+            else:
+                serialized_data = await sync_to_async(lambda: self.get_list_serializer(data).data)()
+            paginated_response:Response = self.get_paginated_response(serialized_data)
+            await cache_manager.aset_cache_data(cache_key, paginated_response.data, settings.CACHE_LIFETIME)
+            return paginated_response
+
+        return self.get_not_found_response()
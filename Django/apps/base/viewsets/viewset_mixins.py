@@ -1,28 +1,51 @@
-from io import BytesIO
-from typing import Any, Callable
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from decimal import Decimal
+from typing import IO, Any, Callable, Iterator
 import datetime as dt
-from django.db.models import QuerySet, Model
+from asgiref.sync import sync_to_async
+from django.db import DatabaseError, connections, router, transaction
+from django.db.models import Aggregate, Avg, Count, Max, Min, QuerySet, Model, Sum
+from django.db.models.functions import Trunc
 from django.http import QueryDict
 from django.views.decorators.cache import cache_page
 from django.utils.decorators import method_decorator
-from django.http.response import Http404, HttpResponse
+from django.http.response import FileResponse, Http404, HttpResponse, StreamingHttpResponse
 from django.core.exceptions import FieldError, ValidationError
 from django.conf import settings
-from rest_framework.permissions import IsAuthenticated
-import pandas as pd
+from rest_framework.permissions import SAFE_METHODS, IsAuthenticated
 from xlsxwriter.workbook import Workbook
 from xlsxwriter.worksheet import Worksheet
+from apps.base.constants import EXCEL_MAX_ROWS, EXCEL_MAX_SHEETNAME_LENGTH
 from rest_framework.response import Response
 from rest_framework.serializers import ModelSerializer
+from rest_framework.utils import model_meta
 from rest_framework.request import Request
 from rest_framework.decorators import action
 from rest_framework import status
-from apps.base.models import BaseModel
-from apps.base.serializers import BaseReadOnlySerializer, SQLSerializer
+from rest_framework.exceptions import APIException
+from apps.base.models import BaseModel, ExportJob
+from apps.base.columnar import get_serializer_arrow_types, merge_parquet_files, write_arrow, write_parquet
+from apps.base.exports import ASYNC_EXPORT_QUERY_PARAM, create_export_job
+from apps.base.partitions import ExportPartition, export_partition, setup_export_worker
+from apps.base.serializers import BaseReadOnlySerializer, SQLSerializer, ValuesSerializer, build_values_serializer
 from apps.base.cache.generic_cache_manager import ViewsetCacheManager
 from django.utils.translation import gettext_lazy as _
 from apps.base.responses import BaseResponse
+from apps.base.streaming import NDJSON_CONTENT_TYPE, NDJSONRenderer, iter_csv, iter_json_array, iter_ndjson, iter_queryset_chunks, iter_serialized_chunks
+from apps.base.metrics import refresh_model_metrics
+from apps.base.search.autocomplete import AutocompleteIndex
+from apps.base.query_guard import QueryTimeout, check_query_cost, is_postgres, is_query_canceled, iter_with_statement_timeout, statement_timeout
+from apps.base.search.full_text import strip_lookup_prefix
+from apps.base.utils import get_viewset_path
 from django.utils import timezone
+from core.routers import get_replica_aliases, is_primary_sticky, mark_primary_sticky, set_use_replica, use_replica
 # Adding caching
 
 
@@ -31,6 +54,8 @@ class BaseMixin:
     serializer_class:ModelSerializer.__class__ = None
     read_only_serializer:ModelSerializer.__class__ = None
     update_serializer:ModelSerializer.__class__ = None
+    # True in the AsyncViewSetMixin, its dispatch is a coroutine
+    async_dispatch:bool = False
     
     @property
     def model_name(self) -> str:
@@ -160,6 +185,154 @@ class BaseMixin:
 
 
 
+class ReplicaRoutingMixin(BaseMixin):
+    """
+    Mixin that sends the queries of the read actions to the read replicas (see core.routers.ReplicaRouter).
+    After a write the user reads from the primary for REPLICA_STICKY_SECONDS,
+    so they see their own changes. Without replicas it does nothing.
+    """
+    replica_actions: list|tuple = ("list", "retrieve", "download_report")
+    
+    def dispatch(self, request, *args, **kwargs):
+        """
+        The routing chosen by initial is scoped to the request and restored here on every path,
+        finalize_response is skipped when handle_exception raises and the thread serves other requests.
+        """
+        if self.async_dispatch:
+            return self._adispatch_with_routing(request, *args, **kwargs)
+        with use_replica(False):
+            return super().dispatch(request, *args, **kwargs)
+    
+    async def _adispatch_with_routing(self, request, *args, **kwargs):
+        with use_replica(False):
+            return await super().dispatch(request, *args, **kwargs)
+    
+    def initial(self, request:Request, *args, **kwargs) -> None:
+        super().initial(request, *args, **kwargs)
+        if not get_replica_aliases() or self.action not in self.replica_actions:
+            return
+        if not is_primary_sticky(request.user):
+            set_use_replica(True)
+    
+    def finalize_response(self, request:Request, response:Response, *args, **kwargs) -> Response:
+        if get_replica_aliases() and request.method not in SAFE_METHODS and response.status_code < 400:
+            mark_primary_sticky(request.user)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class StatementTimeoutMixin(BaseMixin):
+    """
+    Mixin that limits the database time of the read actions, because the filters of the
+    query params and the ordering accept any field and one bad request can run for minutes.
+
+    - statement_timeout: milliseconds, the action runs inside a transaction with
+      SET LOCAL statement_timeout (PostgreSQL), the cancelled queries return 503.
+      The streamed responses (lists and exports) read the rows inside their own timeout.
+    - max_query_cost: if set, the filtered queryset (the page for the lists) is planned
+      with EXPLAIN before running it and the plans above the cost return 422.
+
+    Both default to the settings STATEMENT_TIMEOUT_MS and MAX_QUERY_COST (0 disables them).
+    The queries of the action are pinned to one database, so with ReplicaRoutingMixin
+    put this mixin before it.
+    """
+    statement_timeout:int | None = None
+    max_query_cost:float | None = None
+    statement_timeout_actions:list|tuple = ("list", "retrieve", "aggregate", "download_report")
+    
+    def get_statement_timeout(self) -> int:
+        if self.statement_timeout is not None:
+            return self.statement_timeout
+        return settings.STATEMENT_TIMEOUT_MS
+    
+    def get_max_query_cost(self) -> float:
+        if self.max_query_cost is not None:
+            return self.max_query_cost
+        return settings.MAX_QUERY_COST
+    
+    def dispatch(self, request, *args, **kwargs):
+        """
+        initial opens the timeout of the action in the scope of the request, that is closed here
+        on every path: finalize_response is skipped when handle_exception raises, and the
+        connection can't stay inside the transaction for the next requests of the thread.
+        """
+        if self.async_dispatch:
+            return self._adispatch_with_timeout(request, *args, **kwargs)
+        with ExitStack() as self._statement_timeout_scope:
+            return super().dispatch(request, *args, **kwargs)
+    
+    async def _adispatch_with_timeout(self, request, *args, **kwargs):
+        # The transaction is opened in the thread of initial, so it's closed in a thread too
+        scope = self._statement_timeout_scope = ExitStack()
+        try:
+            response = await super().dispatch(request, *args, **kwargs)
+        except BaseException:
+            await sync_to_async(scope.__exit__)(*sys.exc_info())
+            raise
+        await sync_to_async(scope.close)()
+        return response
+    
+    def initial(self, request:Request, *args, **kwargs) -> None:
+        super().initial(request, *args, **kwargs)
+        self._statement_timeout_alias = None
+        self._statement_timeout_atomic = False
+        if self.action not in self.statement_timeout_actions:
+            return
+        # With replicas every query could go to a different one
+        self._statement_timeout_alias = router.db_for_read(self.get_model())
+        connection = connections[self._statement_timeout_alias]
+        depth = len(connection.atomic_blocks)
+        self._statement_timeout_scope.enter_context(
+            statement_timeout(self.get_statement_timeout(), self._statement_timeout_alias)
+        )
+        # Only PostgreSQL with a timeout opens the transaction, the outer ones are not touched
+        self._statement_timeout_atomic = len(connection.atomic_blocks) > depth
+    
+    def finalize_response(self, request:Request, response:Response, *args, **kwargs) -> Response:
+        alias = getattr(self, "_statement_timeout_alias", None)
+        # The failed queries leave the transaction of the timeout aborted
+        if getattr(self, "_statement_timeout_atomic", False) and response.status_code >= 400:
+            transaction.set_rollback(True, using=alias)
+        if alias is not None and isinstance(response, StreamingHttpResponse) and not isinstance(response, FileResponse):
+            # The streamed lists and exports read the rows after the view returns
+            response.streaming_content = iter_with_statement_timeout(
+                response.streaming_content, self.get_statement_timeout(), alias,
+            )
+        return super().finalize_response(request, response, *args, **kwargs)
+    
+    def handle_exception(self, exc:Exception) -> Response:
+        if is_query_canceled(exc):
+            exc = QueryTimeout()
+        return super().handle_exception(exc)
+    
+    def get_queryset(self) -> QuerySet:
+        queryset = super().get_queryset()
+        alias = getattr(self, "_statement_timeout_alias", None)
+        return queryset.using(alias) if alias is not None else queryset
+    
+    def get_query_cost_queryset(self, queryset:QuerySet) -> QuerySet:
+        """
+        Returns:
+            QuerySet: The query that will run, the page of the queryset for the paginated lists
+        """
+        if self.action == "list" and self.paginator is not None and hasattr(self.paginator, "get_limit"):
+            limit = self.paginator.get_limit(self.request)
+            if limit is not None:
+                offset = self.paginator.get_offset(self.request)
+                return queryset[offset:offset + limit]
+        return queryset
+    
+    def filter_queryset(self, queryset:QuerySet) -> QuerySet:
+        queryset = super().filter_queryset(queryset)
+        if self.action in self.statement_timeout_actions:
+            try:
+                check_query_cost(self.get_query_cost_queryset(queryset), self.get_max_query_cost())
+            except DatabaseError as err:
+                if is_query_canceled(err):
+                    raise QueryTimeout() from err
+                raise
+        return queryset
+    
+
 class GetQuerysetMixin(BaseMixin):
     """
     Mixin to optimize ORM queries to the Database.
@@ -169,6 +342,8 @@ class GetQuerysetMixin(BaseMixin):
     select_related_fields: list|tuple = tuple()
     prefetch_related_fields: list|tuple = tuple()
     annotate_fields: dict[str, object] = {}
+    # Actions where the sql_method_fields of the read_only_serializer are annotated
+    sql_method_fields_actions: list|tuple = ("list", "retrieve")
 
     def get_related_fields(self) -> list[str] | tuple[str]:
         """
@@ -188,6 +363,21 @@ class GetQuerysetMixin(BaseMixin):
         """
         return self.prefetch_related_fields
 
+    def get_serializer_annotate(self) -> dict[str, object]:
+        """
+        Returns the sql_method_fields of the read_only_serializer, the method fields
+        that the database can compute (for example the pretty dates).
+        They are only annotated in sql_method_fields_actions, in the writes
+        the annotations would be stale after the save.
+
+        Returns:
+            dict[str, object]: Fields for annotate.
+        """
+        get_sql_method_fields = getattr(self.read_only_serializer, "get_sql_method_fields", None)
+        if get_sql_method_fields is None or getattr(self, "action", None) not in self.sql_method_fields_actions:
+            return {}
+        return get_sql_method_fields()
+
     def get_annotate(self) -> dict[str, object]:
         """
         Returns the fields to be used with annotate.
@@ -195,7 +385,7 @@ class GetQuerysetMixin(BaseMixin):
         Returns:
             dict[str, object]: Fields for annotate.
         """
-        return self.annotate_fields
+        return {**self.get_serializer_annotate(), **self.annotate_fields}
 
     def get_queryset(self) -> QuerySet:
         """
@@ -212,6 +402,23 @@ class GetQuerysetMixin(BaseMixin):
                 .prefetch_related(*self.get_prefetch_fields())\
                 .annotate(**self.get_annotate())
         return qs
+    
+    def get_saved_object(self, instance:Model) -> Model:
+        """
+        Returns the object that was just created or updated for the response.
+        It's read once with the select_related, prefetch_related and annotations of get_queryset,
+        so the read only serializer doesn't load the relations one query at a time.
+        If the queryset doesn't add anything to the rows the saved instance is used without a query.
+
+        Args:
+            instance (Model): The saved instance.
+
+        Returns:
+            Model: The object read again, or the same instance.
+        """
+        if not (self.get_related_fields() or self.get_prefetch_fields() or self.get_annotate()):
+            return instance
+        return self.get_queryset().filter(pk=instance.pk).first() or instance
 
 
 class RetrieveObjectMixin(BaseMixin):
@@ -254,9 +461,35 @@ class RetrieveObjectMixin(BaseMixin):
         return self.get_not_found_response()
 
 class ListObjectMixin(BaseMixin):
+    """
+    Mixin for listing the objects with filters from the query params, pagination and cache.
+    
+    The list can be streamed without pagination with "?stream=1" (JSON array)
+    or with the header "Accept: application/x-ndjson" (one JSON per line).
+    The rows are read with a server side cursor and serialized in chunks of stream_chunk_size.
+    
+    With use_values_serializer the list is serialized from .values() with a ValuesSerializer
+    generated from the read_only_serializer, skipping the model instances and the DRF fields.
+    If the serializer has fields that need the instance (method fields, nested serializers, m2m)
+    the read_only_serializer is used.
+    
+    The endpoint "aggregate/" returns a summary computed in SQL with the same filters than the list:
+    "?group_by=user&aggregate=count,sum:total&bucket=month". Only the aggregate_group_by_fields
+    and aggregate_fields can be used, the time buckets truncate the aggregate_bucket_field.
+    """
     special_query_params = (
-            "limit", "offset", "ordering", "search", "exclude", "file_format", "page", "page_size"
+            "limit", "offset", "ordering", "search", "exclude", "file_format", "page", "page_size", "stream",
+            "group_by", "aggregate", "bucket", ASYNC_EXPORT_QUERY_PARAM,
         )
+    stream_query_param:str = "stream"
+    stream_chunk_size:int = 1000
+    use_values_serializer:bool = False
+    aggregate_group_by_fields:list[str] | tuple[str] = ()
+    aggregate_fields:list[str] | tuple[str] = ()
+    aggregate_bucket_field:str = "created_date"
+    aggregate_max_groups:int = 1000
+    aggregate_functions:dict[str, Callable] = {"count": Count, "sum": Sum, "avg": Avg, "min": Min, "max": Max}
+    aggregate_buckets:tuple[str] = ("hour", "day", "week", "month", "quarter", "year")
     
     def get_special_query_params(self) -> list[str] | tuple[str]:
         """
@@ -341,16 +574,39 @@ class ListObjectMixin(BaseMixin):
         
         return qs
     
-    def get_data(self, request:Request) -> tuple[dict|list, int]:
+    def get_values_serializer_class(self) -> ValuesSerializer.__class__ | None:
+        """
+        Returns:
+            ValuesSerializer.__class__ | None: The values serializer of the read_only_serializer if
+            use_values_serializer is active and the serializer supports it, None otherwise.
+        """
+        if not self.use_values_serializer or self.read_only_serializer is None:
+            return None
+        return build_values_serializer(self.read_only_serializer)
+    
+    def get_list_serializer(self, data:QuerySet | list, values_serializer_class:ValuesSerializer.__class__ | None = None) -> ValuesSerializer | ModelSerializer:
+        """
+        Returns:
+            ValuesSerializer | ModelSerializer: The serializer of the listed rows, dicts if
+            values_serializer_class is given, model instances otherwise.
+        """
+        if values_serializer_class is not None:
+            return values_serializer_class(data, many=True)
+        return self.get_readonly_serializer(data, many=True)
+    
+    def get_data(self, request:Request, paginate:bool = True, values_serializer_class:ValuesSerializer.__class__ | None = None) -> tuple[dict|list|QuerySet, int]:
         """
         Function to obtain the already processed data for a report.
         Applies filters and pagination at once.
 
         Args:
             request (Request): Request that must be GET and have query_params.
+            paginate (bool, optional): If False returns the filtered QuerySet without pagination. Defaults to True.
+            values_serializer_class (ValuesSerializer.__class__ | None, optional): If given, the data are
+                the dicts of its values() queryset instead of model instances. Defaults to None.
 
         Returns:
-            tuple[dict|list, int]: The processed data and the status code.
+            tuple[dict|list|QuerySet, int]: The processed data and the status code.
         """
         query_params = request.query_params
         excluded_params = self.get_special_query_params()
@@ -360,17 +616,165 @@ class ListObjectMixin(BaseMixin):
         try:
             data:QuerySet = self.get_filtered_qs(filtros, excludes)
             data = self.filter_queryset(data)
+            if values_serializer_class is not None:
+                data = values_serializer_class(data).get_values_queryset()
+            if not paginate:
+                return data, status.HTTP_200_OK
             paged_data:QuerySet = self.paginate_queryset(data)
         
         except (FieldError, ValueError, ValidationError) as err:
             return {"message": err.args[0]}, status.HTTP_400_BAD_REQUEST
         except Http404:
             return {"message": "No results found"}, status.HTTP_404_NOT_FOUND
+        except APIException:
+            raise
         except Exception as err:
+            if is_query_canceled(err):
+                raise
             return {"message": "Unknown error at get_data: %s" % err.args.__str__()}, status.HTTP_400_BAD_REQUEST
         
         return paged_data, status.HTTP_200_OK
     
+    def get_renderers(self) -> list:
+        return [*super().get_renderers(), NDJSONRenderer()]
+    
+    def get_stream_format(self, request:Request) -> str | None:
+        """
+        Checks if the client asked for a streamed list.
+
+        Args:
+            request (Request): The request object.
+
+        Returns:
+            str | None: "ndjson" if the Accept header asks for NDJSON, "json" if the
+            stream query param is true, None if the list must be paginated.
+        """
+        if NDJSON_CONTENT_TYPE in request.headers.get("Accept", ""):
+            return "ndjson"
+        if request.query_params.get(self.stream_query_param, "").lower() in ("1", "true"):
+            return "json"
+        return None
+    
+    def get_stream_response(self, queryset:QuerySet, stream_format:str, values_serializer_class:ValuesSerializer.__class__ | None = None) -> StreamingHttpResponse:
+        """
+        Streams the whole queryset without pagination.
+        The rows are read with a server side cursor and serialized in chunks,
+        so the memory of the worker doesn't grow with the size of the result.
+
+        Args:
+            queryset (QuerySet): The filtered queryset.
+            stream_format (str): "json" or "ndjson".
+            values_serializer_class (ValuesSerializer.__class__ | None, optional): Serializer of the rows if
+                the queryset is a values() queryset. Defaults to None.
+
+        Returns:
+            StreamingHttpResponse: The streamed list.
+        """
+        # The rows are read after the view returns, so the database is fixed now
+        queryset = queryset.using(queryset.db)
+        chunks = iter_serialized_chunks(
+            iter_queryset_chunks(queryset, self.stream_chunk_size),
+            lambda chunk: self.get_list_serializer(chunk, values_serializer_class).data,
+        )
+        if stream_format == "ndjson":
+            return StreamingHttpResponse(iter_ndjson(chunks), content_type=NDJSON_CONTENT_TYPE)
+        return StreamingHttpResponse(iter_json_array(chunks), content_type="application/json")
+    
+    def get_aggregate_params(self, query_params:QueryDict) -> tuple[list[str], dict[str, Aggregate], str | None]:
+        """
+        Validates the group_by, aggregate and bucket query params against the whitelists.
+
+        Args:
+            query_params (QueryDict): QueryParams of the request.
+
+        Raises:
+            ValidationError: With a dict param -> errors if a field or function is not allowed.
+
+        Returns:
+            tuple[list[str], dict[str, Aggregate], str | None]: The group by fields, the aggregates
+            by their name in the response ("count", "sum_total") and the bucket.
+        """
+        errors:dict[str, list[str]] = {}
+        
+        group_by = [field for field in query_params.get("group_by", "").split(",") if field]
+        invalid = [field for field in group_by if field not in self.aggregate_group_by_fields]
+        if invalid:
+            errors["group_by"] = [_("Fields not allowed: %s" % ", ".join(invalid))]
+        
+        aggregates = {}
+        for item in (query_params.get("aggregate") or "count").split(","):
+            function_name, _sep, field = item.partition(":")
+            function = self.aggregate_functions.get(function_name)
+            if function is None or (field and field not in self.aggregate_fields) or (not field and function is not Count):
+                errors.setdefault("aggregate", []).append(_("Aggregate not allowed: %s" % item))
+                continue
+            name = "%s_%s" % (function_name, field.replace("__", "_")) if field else function_name
+            aggregates[name] = function(field or "pk")
+        
+        bucket = query_params.get("bucket") or None
+        if bucket is not None and bucket not in self.aggregate_buckets:
+            errors["bucket"] = [_("Expected one of %s" % ", ".join(self.aggregate_buckets))]
+        
+        if errors:
+            raise ValidationError(errors)
+        return group_by, aggregates, bucket
+    
+    def get_aggregate_data(self, queryset:QuerySet, group_by:list[str], aggregates:dict[str, Aggregate], bucket:str | None) -> list[dict]:
+        """
+        Computes the summary in the database.
+
+        Returns:
+            list[dict]: One row per group (and bucket) with the aggregates, or one row if there is no grouping.
+        """
+        # The ordering and prefetches of the list would change the GROUP BY
+        queryset = queryset.prefetch_related(None).order_by()
+        if not group_by and bucket is None:
+            return [queryset.aggregate(**aggregates)]
+        
+        values = list(group_by)
+        if bucket is not None:
+            queryset = queryset.annotate(bucket=Trunc(self.aggregate_bucket_field, bucket))
+            values.append("bucket")
+        rows = queryset.values(*values).annotate(**aggregates).order_by(*values)
+        return list(rows[:self.aggregate_max_groups])
+    
+    @action(methods=["GET"], detail=False, url_path="aggregate")
+    def aggregate(self, request:Request, *args, **kwargs):
+        """
+        Returns counts, sums, averages, etc. of the filtered objects, grouped by the
+        group_by fields and the time bucket, instead of the rows.
+        The result is cached like the list, the saves of the model clear it.
+
+        Args:
+            request (Request): The request object.
+
+        Returns:
+            Response: {"results": [{<group fields>, "bucket", "count", "sum_<field>", ...}]}
+        """
+        try:
+            group_by, aggregates, bucket = self.get_aggregate_params(request.query_params)
+        except ValidationError as err:
+            return self.get_bad_request(err.message_dict)
+        
+        cache_manager = ViewsetCacheManager(self.get_model())
+        cache_key:str = cache_manager.get_cache_key(request=request)
+        serialized_cache_data = cache_manager.get_cache_data(cache_key=cache_key)
+        if serialized_cache_data:
+            return self.get_ok_response(serialized_cache_data)
+        
+        queryset, status_code = self.get_data(request=request, paginate=False)
+        if not status_code == status.HTTP_200_OK:
+            return Response(queryset, status_code)
+        
+        try:
+            results = self.get_aggregate_data(queryset, group_by, aggregates, bucket)
+        except (FieldError, ValueError) as err:
+            return self.get_bad_request({"detail": [err.args[0]]})
+        
+        data = {"results": results}
+        cache_manager.set_cache_data(cache_key, data, settings.CACHE_LIFETIME)
+        return self.get_ok_response(data)
+    
     def list(self, request: Request, *args, **kwargs):
         """
         Lists objects based on the request parameters.
@@ -384,6 +788,16 @@ class ListObjectMixin(BaseMixin):
         Returns:
             Response: The list of objects or an error response.
         """
+        values_serializer_class = self.get_values_serializer_class()
+        
+        # The streamed lists are not paginated nor cached
+        stream_format = self.get_stream_format(request)
+        if stream_format is not None:
+            data, status_code = self.get_data(request=request, paginate=False, values_serializer_class=values_serializer_class)
+            if not status_code == status.HTTP_200_OK:
+                return Response(data, status_code)
+            return self.get_stream_response(data, stream_format, values_serializer_class)
+        
         # Instantiate the cache manager
         cache_manager = ViewsetCacheManager(self.get_model())
         cache_key: str = cache_manager.get_cache_key(request=request)
@@ -394,13 +808,13 @@ class ListObjectMixin(BaseMixin):
             return self.get_ok_response(serialized_cache_data)
 
         # Get the data
-        data, status_code = self.get_data(request=request)
+        data, status_code = self.get_data(request=request, values_serializer_class=values_serializer_class)
         if not status_code == status.HTTP_200_OK:
             return Response(data, status_code)
 
         if data:
             # Serialize the data
-            serializer = self.get_readonly_serializer(data, many=True)
+            serializer = self.get_list_serializer(data, values_serializer_class)
             paginated_response: Response = self.get_paginated_response(serializer.data)
             response_data = paginated_response.data  # Get the dict of the paginated response
             cache_manager.set_cache_data(cache_key, response_data, settings.CACHE_LIFETIME)
@@ -411,6 +825,7 @@ class ListObjectMixin(BaseMixin):
         return self.get_not_found_response()
 
 
+
 class CreateObjectMixin(BaseMixin):
     
     def create(self, request:Request, *args, **kwargs):
@@ -429,7 +844,7 @@ class CreateObjectMixin(BaseMixin):
         data = request.data
         serializer:ModelSerializer = self.get_serializer(data=data)
         if serializer.is_valid():
-            instance = serializer.save()
+            instance = self.get_saved_object(serializer.save())
             obj = self.get_readonly_serializer(instance=instance).data
             
             # Clear the cache for this Model
@@ -461,7 +876,7 @@ class UpdateObjectMixin(BaseMixin):
 
         serializer:ModelSerializer = self.get_update_serializer(instance=instance, data=new_data, partial=partial)
         if serializer.is_valid():
-            instance = serializer.save()
+            instance = self.get_saved_object(serializer.save())
             data = self.get_readonly_serializer(instance=instance).data
             
             # Clear the cache for this Model
@@ -538,16 +953,382 @@ class DestroyObjectMixin(BaseMixin):
                 )
 
         return self.get_not_found_response()
+    
+    def get_bulk_destroy_queryset(self, data:dict[str, Any]) -> QuerySet:
+        """
+        Args:
+            data (dict[str, Any]): Body with "ids" (list of pks) or "filters" (Django lookups as keys).
+
+        Raises:
+            ValidationError: If there are no ids nor filters, or the ids are invalid.
+
+        Returns:
+            QuerySet: The active objects to deactivate.
+        """
+        ids, filters = data.get("ids"), data.get("filters")
+        if ids:
+            if not isinstance(ids, list):
+                raise ValidationError(_("ids must be a list"))
+            pk_field = self.get_model()._meta.pk
+            queryset = self.get_queryset().filter(pk__in=[pk_field.to_python(pk) for pk in ids])
+        elif filters and isinstance(filters, dict):
+            queryset = self.get_queryset().filter(**filters)
+        else:
+            # Never deactivates the whole table by accident
+            raise ValidationError(_("ids or filters are required"))
+        return queryset.exclude(**{self.get_status_field(): self.get_deleted_status()})
+    
+    @action(methods=["POST"], detail=False, url_path="bulk-destroy")
+    def bulk_destroy(self, request:Request, *args, **kwargs):
+        """
+        Deactivates (soft deletes) several objects with one UPDATE, by their ids
+        {"ids": [1, 2]} or by filters {"filters": {"created_date__lt": "2024-01-01"}}.
+        The save of the models is not called, the cache is cleared once.
+
+        Args:
+            request (Request): The request object.
+
+        Returns:
+            Response: {"deactivated": int, "requested": int} ("requested" only with ids),
+            the ids that were not found or already deactivated are not counted.
+        """
+        data = request.data if isinstance(request.data, dict) else {}
+        try:
+            queryset = self.get_bulk_destroy_queryset(data)
+        except ValidationError as err:
+            return self.get_bad_request({"detail": err.messages})
+        except (FieldError, ValueError) as err:
+            return self.get_bad_request({"detail": [err.args[0]]})
+        
+        model = self.get_model()
+        values = {self.get_status_field(): self.get_deleted_status()}
+        if any(field.name == "deleted_date" for field in model._meta.concrete_fields):
+            values["deleted_date"] = timezone.now().date()
+        
+        try:
+            # Through the pks because QuerySet.update can't use the annotations of get_queryset
+            deactivated:int = model._base_manager.filter(pk__in=queryset.values("pk")).update(**values)
+        except (FieldError, ValueError) as err:
+            return self.get_bad_request({"detail": [err.args[0]]})
+        
+        if deactivated:
+            cache_manager = ViewsetCacheManager(model)
+            cache_manager.clear_cache_pattern(cache_manager.get_model_cache_pattern())
+            AutocompleteIndex.invalidate(model)
+            refresh_model_metrics(model)
+        
+        result = {"deactivated": deactivated}
+        if data.get("ids"):
+            result["requested"] = len(data["ids"])
+        return self.get_ok_response(result, f"{deactivated} objects {self.model_name} have been successfully deactivated")
+
+
+class BulkObjectMixin(BaseMixin):
+    """
+    Mixin that adds the endpoint "bulk/" to create (POST) or update (PATCH) a list of objects
+    in one request, one transaction and one cache invalidation.
+    
+    The rows are written with BaseManager.bulk_create / bulk_update, so CacheMixin.save
+    and the model signals are not called. The many to many fields and the manual_fields
+    of the serializers are still set one instance at a time.
+    
+    Every item is validated before writing, if any of them is invalid nothing is written
+    and the response has the errors of each item with its index.
+    
+    Attributes:
+        bulk_max_items (int): Max number of items per request.
+        bulk_batch_size (int | None): batch_size of bulk_create and bulk_update.
+    """
+    bulk_max_items:int = 1000
+    bulk_batch_size:int | None = 500
+    
+    def get_bulk_items(self, request:Request) -> tuple[list[dict] | None, Response | None]:
+        """
+        Returns:
+            tuple[list[dict] | None, Response | None]: The items of the body, or a bad request
+            if the body is not a list or has more than bulk_max_items.
+        """
+        items = request.data
+        if not isinstance(items, list) or not items:
+            return None, self.get_bad_request({"items": [_("A non empty list of objects is expected")]})
+        if len(items) > self.bulk_max_items:
+            return None, self.get_bad_request({"items": [_("Expected at most %s objects, got %s" % (self.bulk_max_items, len(items)))]})
+        return items, None
+    
+    def get_bulk_pk(self, item:Any) -> Any | None:
+        """
+        Returns:
+            Any | None: The "id" of an item converted to the type of the pk, None if it's missing or invalid.
+        """
+        if not isinstance(item, dict) or item.get("id") is None:
+            return None
+        try:
+            return self.get_model()._meta.pk.to_python(item["id"])
+        except ValidationError:
+            return None
+    
+    def get_bulk_errors_response(self, errors:list[dict]) -> Response:
+        """
+        Args:
+            errors (list[dict]): {"index", "errors"} of every invalid item.
+
+        Returns:
+            Response: Bad request with the errors of the items, nothing was written.
+        """
+        return self.get_bad_request({"errors": errors}, message=_("Some objects are invalid, nothing was saved"))
+    
+    def split_validated_data(self, serializer:ModelSerializer, validated_data:dict[str, Any]) -> tuple[dict, list[tuple[str, Any]], dict]:
+        """
+        Splits the validated data of an item like ModelSerializer.create does.
+
+        Returns:
+            tuple[dict, list[tuple[str, Any]], dict]: The concrete fields, the many to many
+            fields (name, value) and the manual fields of BaseModelSerializer.
+        """
+        validated_data = dict(validated_data)
+        manual_fields = serializer.get_manual_fields(validated_data) if hasattr(serializer, "get_manual_fields") else {}
+        relations = model_meta.get_field_info(self.get_model()).relations
+        m2m_fields = [
+            (name, validated_data.pop(name)) for name in list(validated_data)
+            if name in relations and relations[name].to_many
+        ]
+        return validated_data, m2m_fields, manual_fields
+    
+    def set_related_fields(self, serializer:ModelSerializer, instance:Model, m2m_fields:list[tuple[str, Any]], manual_fields:dict) -> None:
+        """Sets the many to many and manual fields of an instance that is already saved
+        """
+        for name, value in m2m_fields:
+            getattr(instance, name).set(value)
+        if manual_fields and hasattr(serializer, "handle_manual_fields"):
+            serializer.handle_manual_fields(instance, manual_fields)
+    
+    def get_bulk_response_data(self, instances:list[Model]) -> list[dict]:
+        """
+        Serializes the written objects with the read only serializer,
+        read again in one query so they have the annotations and relations of the queryset.
+        """
+        pks = [instance.pk for instance in instances]
+        objects = self.get_queryset().filter(pk__in=pks).in_bulk() if pks else {}
+        return self.get_readonly_serializer([objects[pk] for pk in pks if pk in objects], many=True).data
+    
+    def bulk_create_objects(self, request:Request) -> Response:
+        """
+        Validates the list with the serializer_class (many=True) and creates the objects
+        with one bulk_create.
+        """
+        items, error_response = self.get_bulk_items(request)
+        if error_response is not None:
+            return error_response
+        
+        serializer = self.get_serializer(data=items, many=True)
+        if not serializer.is_valid():
+            errors = [{"index": index, "errors": item_errors} for index, item_errors in enumerate(serializer.errors) if item_errors]
+            return self.get_bulk_errors_response(errors)
+        
+        model = self.get_model()
+        child = serializer.child
+        rows = [self.split_validated_data(child, validated_data) for validated_data in serializer.validated_data]
+        with transaction.atomic():
+            instances = model.objects.bulk_create([model(**fields) for fields, _m2m, _manual in rows], batch_size=self.bulk_batch_size)
+            for instance, (_fields, m2m_fields, manual_fields) in zip(instances, rows):
+                self.set_related_fields(child, instance, m2m_fields, manual_fields)
+        
+        return self.get_created_response(
+                {"count": len(instances), "results": self.get_bulk_response_data(instances)},
+                message=_("%s objects %s created successfully" % (len(instances), self.model_name)),
+            )
+    
+    def bulk_update_objects(self, request:Request) -> Response:
+        """
+        Validates every item (that must have its "id") with the update serializer as a partial update
+        and saves the objects with one bulk_update of the fields that were sent.
+        The objects are read in one query.
+        """
+        items, error_response = self.get_bulk_items(request)
+        if error_response is not None:
+            return error_response
+        
+        pks = [self.get_bulk_pk(item) for item in items]
+        instances = self.get_queryset().filter(pk__in=[pk for pk in pks if pk is not None]).in_bulk()
+        
+        errors, serializers = [], []
+        for index, (pk, item) in enumerate(zip(pks, items)):
+            if pk is None:
+                errors.append({"index": index, "errors": {"id": [_("A valid id is required")]}})
+                continue
+            instance = instances.get(pk)
+            if instance is None:
+                errors.append({"index": index, "errors": {"id": [_("Object with id %s not found" % pk)]}})
+                continue
+            serializer = self.get_update_serializer(instance=instance, data=item, partial=True)
+            if not serializer.is_valid():
+                errors.append({"index": index, "errors": serializer.errors})
+                continue
+            serializers.append(serializer)
+        if errors:
+            return self.get_bulk_errors_response(errors)
+        
+        model = self.get_model()
+        updated, update_fields, related = [], set(), []
+        for serializer in serializers:
+            fields, m2m_fields, manual_fields = self.split_validated_data(serializer, serializer.validated_data)
+            for name, value in fields.items():
+                setattr(serializer.instance, name, value)
+            update_fields.update(fields)
+            updated.append(serializer.instance)
+            related.append((serializer, m2m_fields, manual_fields))
+        
+        # bulk_update doesn't call pre_save, so the auto_now fields (modified_date) are set here
+        now = timezone.now()
+        for field in model._meta.concrete_fields:
+            if getattr(field, "auto_now", False):
+                for instance in updated:
+                    setattr(instance, field.attname, now)
+                update_fields.add(field.name)
+        
+        with transaction.atomic():
+            if update_fields:
+                model.objects.bulk_update(updated, sorted(update_fields), batch_size=self.bulk_batch_size)
+            for serializer, m2m_fields, manual_fields in related:
+                self.set_related_fields(serializer, serializer.instance, m2m_fields, manual_fields)
+        
+        return self.get_ok_response(
+                {"count": len(updated), "results": self.get_bulk_response_data(updated)},
+                message=_("%s objects %s updated successfully" % (len(updated), self.model_name)),
+            )
+    
+    @action(methods=["POST", "PATCH"], detail=False, url_path="bulk")
+    def bulk(self, request:Request, *args, **kwargs):
+        """
+        POST creates the list of objects, PATCH updates them (every item needs its "id").
+
+        Args:
+            request (Request): The request object, the body is a list of objects.
+
+        Returns:
+            Response: {"count", "results"} with the written objects, or {"errors": [{"index", "errors"}]}
+        """
+        if request.method == "POST":
+            return self.bulk_create_objects(request)
+        return self.bulk_update_objects(request)
+
+
+class AutocompleteMixin(BaseMixin):
+    """
+    Mixin that adds the endpoint "autocomplete/?q=<text>&limit=<n>" for type-ahead searches.
+    It's opt-in, add it before the base viewset: class UserViewset(AutocompleteMixin, BaseModelViewset).
+    
+    The results come from a prefix index of the viewset (Redis sorted sets or an in process index,
+    see AUTOCOMPLETE_BACKEND) populated with the autocomplete_fields, that default
+    to the search_fields of the viewset, so the database is not scanned on every keystroke.
+    The pks of the matches are filtered with the queryset of the viewset (get_queryset and
+    filter_queryset), so the endpoint only returns the rows the list returns.
+    
+    Attributes:
+        autocomplete_fields (list[str] | None): Fields to index. Defaults to search_fields.
+        autocomplete_limit (int): Default number of results.
+        autocomplete_max_limit (int): Max number of results the client can ask for.
+    """
+    autocomplete_fields:list[str] | None = None
+    autocomplete_limit:int = 10
+    autocomplete_max_limit:int = 50
+    
+    def __init_subclass__(cls, **kwargs) -> None:
+        """
+        Registers the fields of the viewset in the AutocompleteIndex when the viewset class is defined,
+        so the model saves can keep the index up to date.
+        """
+        super().__init_subclass__(**kwargs)
+        serializer_class = getattr(cls, "serializer_class", None)
+        fields = cls.autocomplete_fields or getattr(cls, "search_fields", None)
+        if serializer_class is None or not fields:
+            return
+        AutocompleteIndex.register(
+            serializer_class.Meta.model, get_viewset_path(cls), [strip_lookup_prefix(str(field)) for field in fields]
+        )
+    
+    def get_autocomplete_index(self) -> AutocompleteIndex:
+        return AutocompleteIndex(self.get_model(), get_viewset_path(type(self)))
+    
+    def filter_autocomplete_pks(self, pks:list[str]) -> set[str]:
+        """
+        Returns:
+            set[str]: The pks of the matches that are in the queryset of the viewset
+        """
+        queryset = self.filter_queryset(self.get_queryset()).filter(pk__in=pks)
+        return {str(pk) for pk in queryset.values_list("pk", flat=True)}
+    
+    def get_autocomplete_limit(self, request:Request) -> int:
+        """
+        Returns:
+            int: The limit query param, bounded by autocomplete_max_limit
+        """
+        limit = request.query_params.get("limit", "")
+        if not limit.isdigit():
+            return self.autocomplete_limit
+        return max(1, min(int(limit), self.autocomplete_max_limit))
+    
+    @action(methods=["GET"], detail=False, url_path="autocomplete")
+    def autocomplete(self, request:Request, *args, **kwargs):
+        """
+        Returns the first matches of the "q" query param as a prefix.
+
+        Args:
+            request (Request): The request object.
+
+        Returns:
+            Response: {"results": [{"id", "field", "value"}]}
+        """
+        text:str = request.query_params.get("q", "")
+        index = self.get_autocomplete_index()
+        results = index.search(text, self.get_autocomplete_limit(request), self.filter_autocomplete_pks)
+        return self.get_ok_response({"results": results})
 
 
 class ReportViewMixin(BaseMixin):
     """
     View mixin for generating reports in Excel or CSV format.
     
+    The report has all the rows of the filtered queryset (the same filters than the list).
+    The CSV is streamed: the rows are read with a server side cursor and serialized
+    in chunks of export_chunk_size, so the memory doesn't grow with the size of the report.
+    "file_format=parquet" and "file_format=arrow" write typed and compressed columnar files
+    (pyarrow) in row groups, the types come from the serializer and model fields
+    (an SQLSerializer keeps the types of the database).
+    
+    With export_partitions (PostgreSQL) the big CSV and Parquet reports of the export jobs are
+    split in pk ranges that are read and serialized at the same time by a pool of processes,
+    all of them reading the snapshot of the job (pg_export_snapshot), and joined in order.
+    Only the reports ordered by pk (or unordered) are partitioned, the other orderings are
+    exported in one process. The requests always export in one process.
+    
+    With "?async=true" the report is generated by a Celery worker (ExportJob): the response
+    is 202 with the id of the job, the client polls "export/jobs/<id>/" and downloads the file
+    from "export/jobs/<id>/download/". Only authenticated users can start jobs, every user
+    can have EXPORT_JOBS_MAX_PER_USER jobs pending or running, the next ones get 429.
+    
     Attributes:
         export_csv_serializer (SQLSerializer | BaseReadOnlySerializer | None): Serializer used for exporting data.
+        export_chunk_size (int): Rows read and serialized at a time.
+        csv_delimiter (str): Delimiter of the CSV files.
+        columnar_row_group_size (int): Rows of every row group (parquet) or record batch (arrow).
+        columnar_compression (str): Compression of the parquet and arrow files.
+        export_partitions (int): Pk ranges exported in parallel by a process pool, 0 disables it.
+        export_partition_workers (int | None): Processes of the pool. Defaults to EXPORT_PARTITION_WORKERS.
+        export_parallel_min_rows (int): Pk span below which the report is exported in one process.
+        export_partition_formats (list | tuple): Formats that can be exported in parallel.
+        current_export_job (ExportJob | None): The job that generates the report, set by run_export_job.
     """
     export_csv_serializer:SQLSerializer | BaseReadOnlySerializer | None = None
+    export_chunk_size:int = 2000
+    csv_delimiter:str = ";"
+    columnar_row_group_size:int = 50_000
+    columnar_compression:str = "zstd"
+    export_partitions:int = 0
+    export_partition_workers:int | None = None
+    export_parallel_min_rows:int = 100_000
+    export_partition_formats:list|tuple = ("csv", "parquet")
+    current_export_job:ExportJob | None = None
 
     def get_filename(self) -> str:
         """
@@ -581,10 +1362,66 @@ class ReportViewMixin(BaseMixin):
             'the class %s should have a sql serializer '
             'to export to excel or csv.' % self.basename
         )
+        if issubclass(self.export_csv_serializer, SQLSerializer):
+            # The SQL serializers don't receive the context
+            return self.export_csv_serializer(*args, **kwargs)
         serializer = self._get_serializer(self.export_csv_serializer, *args, **kwargs)
 
         return serializer
 
+    def get_export_queryset(self, request:Request) -> tuple[QuerySet | dict, int]:
+        """
+        Returns the filtered queryset of the report, without pagination.
+
+        Args:
+            request (Request): The request object.
+
+        Returns:
+            tuple[QuerySet | dict, int]: The queryset (or the error) and the status code.
+        """
+        data, status_code = self.get_data(request=request, paginate=False)
+        if status_code != status.HTTP_200_OK:
+            return data, status_code
+        # The streamed files read the rows after the view returns, so the database is fixed now
+        return data.using(data.db), status_code
+
+    def get_export_columns(self) -> list[str]:
+        """
+        Returns:
+            list[str]: The columns of the export serializer in order
+        """
+        serializer = self.get_export_serializer(instance=[], many=True)
+        if isinstance(serializer, SQLSerializer):
+            return serializer.get_column_order()
+        return list(serializer.child.fields.keys())
+
+    def iter_export_chunks(self, data:QuerySet) -> Iterator[list[dict]]:
+        """
+        Serializes the report in chunks of export_chunk_size rows, read with a server side cursor.
+        The SQL serializers stream their values() queryset, the model serializers
+        serialize every chunk of instances.
+
+        Args:
+            data (QuerySet): The filtered queryset.
+
+        Yields:
+            Iterator[list[dict]]: The serialized chunks
+        """
+        serializer = self.get_export_serializer(instance=data, many=True)
+        if isinstance(serializer, ValuesSerializer):
+            values_serializer_class = type(serializer)
+            yield from iter_serialized_chunks(
+                iter_queryset_chunks(serializer.get_values_queryset(), self.export_chunk_size),
+                lambda chunk: values_serializer_class(chunk, many=True).data,
+            )
+        elif isinstance(serializer, SQLSerializer):
+            yield from iter_queryset_chunks(serializer.data, self.export_chunk_size)
+        else:
+            yield from iter_serialized_chunks(
+                iter_queryset_chunks(data, self.export_chunk_size),
+                lambda chunk: self.get_export_serializer(instance=chunk, many=True).data,
+            )
+
     def get_excel_header_format(self) -> dict:
         """
         Returns the format for the header of the Excel file.
@@ -610,24 +1447,23 @@ class ReportViewMixin(BaseMixin):
         """
         pass
 
-    def set_excel_style(self, workbook:Workbook, worksheet:Worksheet, df:pd.DataFrame):
+    def set_excel_style(self, workbook:Workbook, worksheet:Worksheet, columns:list[str]):
         """
-        Sets the overall style for the Excel worksheet.
+        Sets the overall style for the Excel worksheet and writes the header.
+        In constant_memory mode the rows are written in order, so it's called before the data.
 
         Args:
             workbook (Workbook): The Excel workbook.
             worksheet (Worksheet): The worksheet being styled.
-            df (pd.DataFrame): The DataFrame containing the data.
+            columns (list[str]): The columns of the report.
         """
 
         header_format = workbook.add_format(self.get_excel_header_format())
-        for col_num, value in enumerate(df.columns.values):
+        for col_num, value in enumerate(columns):
             worksheet.write(0, col_num, value, header_format )
             self.set_excel_column_styles(workbook, worksheet, col_num, value, header_format)
 
-        worksheet.autofilter(0, 0, 0, len(df.columns)-1)
-
-        # max_row, max_col = df.shape
+        worksheet.autofilter(0, 0, 0, len(columns)-1)
 
         # worksheet.conditional_format("A2:A7", options={
         #     "type":"3_color_scale",
@@ -638,96 +1474,312 @@ class ReportViewMixin(BaseMixin):
         #worksheet.conditional_format("A2:E7", {"format":header_format})
 
 
-    def get_excel_writer(self, output_bytes:BytesIO, engine:str="xlsxwriter", date_format:str="d/mmm/yyyy", datetime_format:str="d/mmm/yyyy  hh:mm:ss", *args, **kwargs) -> pd.ExcelWriter:
+    def get_excel_workbook(self, output:Any, date_format:str="d/mmm/yyyy", datetime_format:str="d/mmm/yyyy  hh:mm:ss", **options) -> Workbook:
         """
-        Returns the Excel writer object.
+        Returns the xlsxwriter workbook in constant_memory mode: every row is flushed to a
+        temporary file when the next one starts, so the memory doesn't grow with the report.
 
         Args:
-            output_bytes (BytesIO): The output bytes buffer.
-            engine (str, optional): The Excel writing engine. Defaults to "xlsxwriter".
+            output (Any): Path or binary file where the workbook is written when it's closed.
             date_format (str, optional): The date format. Defaults to "d/mmm/yyyy".
             datetime_format (str, optional): The datetime format. Defaults to "d/mmm/yyyy  hh:mm:ss".
-            *args: Variable length argument list.
-            **kwargs: Arbitrary keyword arguments.
+            **options: Other options of the xlsxwriter Workbook.
 
         Returns:
-            pd.ExcelWriter: The Excel writer object.
+            Workbook: The Excel workbook.
+        """
+        workbook = Workbook(output, {
+            "constant_memory": True,
+            # Excel doesn't support time zones
+            "remove_timezone": True,
+            "default_date_format": datetime_format,
+            **options,
+        })
+        self._excel_date_format = workbook.add_format({"num_format": date_format})
+        return workbook
+
+    def add_excel_worksheet(self, workbook:Workbook, name:str, columns:list[str]) -> Worksheet:
+        """Adds a styled worksheet with the header, the names are limited to 31 characters by Excel
+        """
+        worksheet = workbook.add_worksheet(name[:EXCEL_MAX_SHEETNAME_LENGTH])
+        self.set_excel_style(workbook, worksheet, columns)
+        return worksheet
+
+    def write_excel_row(self, worksheet:Worksheet, row_num:int, values:list[Any]) -> None:
+        for col_num, value in enumerate(values):
+            if value is None:
+                continue
+            if isinstance(value, dt.datetime):
+                worksheet.write_datetime(row_num, col_num, value)
+            elif isinstance(value, dt.date):
+                worksheet.write_datetime(row_num, col_num, value, self._excel_date_format)
+            elif isinstance(value, (str, bool, int, float, Decimal)):
+                worksheet.write(row_num, col_num, value)
+            else:
+                worksheet.write_string(row_num, col_num, str(value))
+
+    def generate_excel_file(self, data:QuerySet) -> tuple[IO[bytes], str]:
+        """
+        Generates an Excel file from a QuerySet with xlsxwriter in constant_memory mode.
+        The rows are read with a server side cursor, serialized in chunks and written
+        one by one to a temporary file, that is streamed to the client and deleted when
+        the response is closed. If the rows don't fit in a sheet they continue in the next one.
+        https://xlsxwriter.readthedocs.io/working_with_memory.html
+
+        Args:
+            data (QuerySet): The QuerySet containing the data to be exported.
+
+        Returns:
+            tuple[IO[bytes], str]: A tuple containing the Excel file (at the start) and the filename.
         """
-        return pd.ExcelWriter(output_bytes, engine=engine,
-            date_format=date_format, datetime_format=datetime_format,
-            *args, **kwargs
-            )
-    def generate_excel_file(self, data:QuerySet) -> tuple[bytes, str]:
+        filename = self.get_filename()
+        columns = self.get_export_columns()
+        output = tempfile.TemporaryFile(suffix=".xlsx")
+        try:
+            workbook = self.get_excel_workbook(output)
+            sheet_number = 1
+            worksheet = self.add_excel_worksheet(workbook, filename, columns)
+            row_num = 0
+            for chunk in self.iter_export_chunks(data):
+                for row in chunk:
+                    row_num += 1
+                    if row_num >= EXCEL_MAX_ROWS:
+                        sheet_number += 1
+                        worksheet = self.add_excel_worksheet(workbook, "%s (%s)" % (filename[:25], sheet_number), columns)
+                        row_num = 1
+                    self.write_excel_row(worksheet, row_num, [row.get(column) for column in columns])
+            workbook.close()
+        except BaseException:
+            output.close()
+            raise
+
+        output.seek(0)
+        return output, filename
+
+    def generate_csv_file(self, data:QuerySet[BaseModel]) -> tuple[Iterator[str], str]:
+        """
+        Generates a CSV file from the given data, as an iterator of lines
+        that is streamed to the client while the rows are read.
+        
+        Args:
+            data (QuerySet[BaseModel]): The data to export.
+
+        Returns:
+            tuple[Iterator[str], str]: A tuple containing the lines of the CSV file and the filename.
         """
-        Generates an Excel file from a QuerySet using pandas and xlsxwriter.
-        It uses a serializer to convert the QuerySet to a list of dictionaries,
-        which are then transformed into a pandas DataFrame.
-        https://xlsxwriter.readthedocs.io/working_with_pandas.html
+        partitioned_file = self.get_partitioned_file(data, "csv")
+        if partitioned_file is not None:
+            return partitioned_file, self.get_filename()
+        lines = iter_csv(self.iter_export_chunks(data), self.get_export_columns(), delimiter=self.csv_delimiter)
+        return lines, self.get_filename()
+    
+    def generate_parquet_file(self, data:QuerySet[BaseModel]) -> tuple[IO[bytes], str]:
+        """
+        Generates a Parquet file, written in row groups of columnar_row_group_size rows
+        to a temporary file while the rows are read.
 
         Args:
-            data (QuerySet): The QuerySet containing the data to be exported.
+            data (QuerySet[BaseModel]): The data to export.
 
         Returns:
-            tuple[bytes, str]: A tuple containing the binary data of the Excel file and the filename.
+            tuple[IO[bytes], str]: The Parquet file (at the start) and the filename.
         """
-        serializer = self.get_export_serializer(instance=data, many=True)
-        serialized_data = serializer.data
+        partitioned_file = self.get_partitioned_file(data, "parquet")
+        if partitioned_file is not None:
+            return partitioned_file, self.get_filename()
+        return self.write_columnar_file(data, write_parquet), self.get_filename()
 
-        df = pd.DataFrame(serialized_data)
-        filename = self.get_filename()
+    def generate_arrow_file(self, data:QuerySet[BaseModel]) -> tuple[IO[bytes], str]:
+        """
+        Generates an Arrow IPC file (Feather v2), written in record batches of
+        columnar_row_group_size rows to a temporary file while the rows are read.
 
-        output_bytes = BytesIO()
+        Args:
+            data (QuerySet[BaseModel]): The data to export.
 
-        excel_writer = self.get_excel_writer(output_bytes)
+        Returns:
+            tuple[IO[bytes], str]: The Arrow file (at the start) and the filename.
+        """
+        return self.write_columnar_file(data, write_arrow), self.get_filename()
 
-        # Write the file in chunks to save memory
-        for _, chunk in enumerate(df.groupby(df.index // 10_000)):
-            chunk[1].to_excel(excel_writer=excel_writer, index=False, sheet_name=filename, )
+    def get_export_arrow_types(self, data:QuerySet) -> dict[str, Any]:
+        """
+        Returns:
+            dict[str, Any]: The pyarrow type of every column, from the fields of the export serializer
+            and the model, None for the columns that are inferred from the rows (method fields).
+        """
+        return get_serializer_arrow_types(self.get_export_serializer(instance=data, many=True))
 
-        # Style the Excel
-        workbook:Workbook = excel_writer.book
-        worksheet:Worksheet = excel_writer.sheets[filename]
-        self.set_excel_style(workbook, worksheet, df)
+    def write_columnar_file(self, data:QuerySet[BaseModel], writer:Callable[..., None]) -> IO[bytes]:
+        output = tempfile.TemporaryFile()
+        try:
+            writer(
+                self.iter_export_chunks(data), self.get_export_columns(), output,
+                self.columnar_row_group_size, compression=self.columnar_compression,
+                types=self.get_export_arrow_types(data),
+            )
+        except BaseException:
+            output.close()
+            raise
+        output.seek(0)
+        return output
+    
+    # ============== Parallel exports
+    def can_export_in_parallel(self, data:QuerySet, file_format:str) -> bool:
+        """
+        The partitions only run in the export jobs, a request would start a pool of processes
+        (and their connections) per download. The job must run in a process that can have
+        children: the prefork workers of Celery are daemons, the exports queue is consumed
+        by a worker with --pool=threads (see core/settings/celery.py).
+        The partitions read the snapshot exported by the job, only PostgreSQL can share it.
+        """
+        return (
+            self.export_partitions > 1
+            and self.current_export_job is not None
+            and file_format in self.export_partition_formats
+            and not multiprocessing.current_process().daemon
+            and is_postgres(data.db)
+            and self.get_export_partition_order(data) is not None
+        )
 
-        # Close the file
-        excel_writer.close()
+    def get_export_partition_order(self, data:QuerySet) -> str | None:
+        """
+        The partitions are joined in pk order, so only the reports ordered by pk keep
+        the ordering of the serial export.
 
-        excel_data = output_bytes.getvalue()
+        Returns:
+            str | None: "pk" or "-pk", None if the report has another ordering.
+        """
+        query = data.query
+        ordering = list(query.order_by) if query.order_by else (list(query.get_meta().ordering) if query.default_ordering else [])
+        pk_names = {"pk", data.model._meta.pk.name, data.model._meta.pk.attname}
+        if not ordering:
+            return "pk"
+        if len(ordering) > 1 or not isinstance(ordering[0], str):
+            return None
+        descending = ordering[0].startswith("-")
+        if ordering[0].lstrip("-") not in pk_names:
+            return None
+        return "-pk" if descending else "pk"
 
-        return excel_data, filename
+    def get_export_partition_bounds(self, data:QuerySet) -> list[tuple[Any, Any]] | None:
+        """
+        Splits the pks of the report in export_partitions ranges of the same width,
+        the first and the last ranges are open so every row of the snapshot is in one of them.
 
-    def generate_csv_file(self, data:QuerySet[BaseModel] | list[BaseModel]) -> tuple[bytes, str]:
+        Returns:
+            list[tuple[Any, Any]] | None: (first pk, last pk exclusive) of every partition,
+            None if the pk is not an integer or the report is small.
+        """
+        bounds = data.order_by().aggregate(min_pk=Min("pk"), max_pk=Max("pk"))
+        min_pk, max_pk = bounds["min_pk"], bounds["max_pk"]
+        if not isinstance(min_pk, int) or not isinstance(max_pk, int):
+            return None
+        span = max_pk - min_pk + 1
+        if span < self.export_parallel_min_rows:
+            return None
+        step = -(-span // self.export_partitions)
+        edges = [min_pk + step * number for number in range(1, self.export_partitions) if min_pk + step * number <= max_pk]
+        return list(zip([None, *edges], [*edges, None]))
+
+    def export_snapshot(self, using:str) -> str | None:
         """
-        Generates a CSV file from the given data.
-        
-        Args:
-            data (QuerySet[BaseModel] | list[BaseModel]): The data to export.
+        Returns:
+            str | None: The id of the snapshot of the current transaction, that the
+            partitions import to read the same data. None if the database is not PostgreSQL.
+        """
+        if not is_postgres(using):
+            return None
+        with connections[using].cursor() as cursor:
+            cursor.execute("SELECT pg_export_snapshot()")
+            return cursor.fetchone()[0]
+
+    def write_export_partition(self, data:QuerySet, file_format:str, output:IO[bytes]) -> None:
+        """
+        Writes the rows of a partition (called in the processes of the pool),
+        the CSV without header and the Parquet without compression, they are joined by the job.
+        """
+        columns = self.get_export_columns()
+        if file_format == "csv":
+            for line in iter_csv(self.iter_export_chunks(data), columns, delimiter=self.csv_delimiter, header=False):
+                output.write(line.encode())
+        elif file_format == "parquet":
+            write_parquet(
+                self.iter_export_chunks(data), columns, output,
+                self.columnar_row_group_size, compression=None, null_as_string=False,
+                types=self.get_export_arrow_types(data),
+            )
+        else:
+            raise ValueError("The format %s can't be exported in parallel" % file_format)
+
+    def get_partitioned_file(self, data:QuerySet, file_format:str) -> IO[bytes] | None:
+        """
+        Exports the report of an export job in parallel: the pk ranges are written by a pool of at most
+        EXPORT_PARTITION_WORKERS processes to temporary files, inside the transaction of the
+        exported snapshot, and then joined in the order of the report.
 
         Returns:
-            tuple[bytes, str]: A tuple containing the binary data of the CSV file and the filename.
+            IO[bytes] | None: The file (at the start), None if the report is exported in one process.
         """
-        serializer = self.get_export_serializer(instance=data, many=True)
-        df = pd.DataFrame(serializer.data)
-        filename = self.get_filename()
-        output_bytes = BytesIO()
-        df.to_csv(output_bytes, ';', index=False)
-        return output_bytes.getvalue(), filename
-    
-    # def generate_xml_file(self, data:QuerySet[BaseModel] | list[BaseModel]) -> tuple[bytes, str]:
-    #     """Generates a xml file
-        
-    #     Args:
-    #         data (QuerySet[BaseModel] | list[BaseModel]): The data to export
-
-    #     Returns:
-    #         tuple[bytes, str]: The xml file and the filename
-    #     """
-    #     serializer = self.get_export_serializer(instance=data, many=True)
-    #     df = pd.DataFrame(serializer.data)
-    #     filename = self.get_filename()
-    #     output_bytes = BytesIO()
-    #     df.to_xml(output_bytes, index=False)
-    #     return output_bytes.getvalue(), filename
+        if not self.can_export_in_parallel(data, file_format):
+            return None
+        using = data.db
+        columns = self.get_export_columns()
+        workdir = tempfile.mkdtemp(prefix="export-")
+        try:
+            with transaction.atomic(using=using):
+                bounds = self.get_export_partition_bounds(data)
+                if bounds is None:
+                    return None
+                descending = self.get_export_partition_order(data) == "-pk"
+                snapshot = self.export_snapshot(using)
+                query_params = {
+                    key: values for key, values in self.request.query_params.lists() if key != ASYNC_EXPORT_QUERY_PARAM
+                }
+                user = self.request.user
+                partitions = [
+                    ExportPartition(
+                        viewset=get_viewset_path(type(self)),
+                        query_params=query_params,
+                        user_id=user.pk if user.is_authenticated else None,
+                        file_format=file_format,
+                        using=using,
+                        path=os.path.join(workdir, "%05d.%s" % (number, file_format)),
+                        lower=lower,
+                        upper=upper,
+                        snapshot=snapshot,
+                        descending=descending,
+                    )
+                    for number, (lower, upper) in enumerate(bounds)
+                ]
+                workers = min(len(partitions), self.export_partition_workers or settings.EXPORT_PARTITION_WORKERS)
+                # spawn: the processes don't inherit the connections of the job
+                with ProcessPoolExecutor(max_workers=max(workers, 1), mp_context=multiprocessing.get_context("spawn"),
+                                         initializer=setup_export_worker) as pool:
+                    paths = list(pool.map(export_partition, partitions))
+                if descending:
+                    paths.reverse()
+
+            output = tempfile.TemporaryFile()
+            try:
+                if file_format == "csv":
+                    for line in iter_csv([], columns, delimiter=self.csv_delimiter):
+                        output.write(line.encode())
+                    for path in paths:
+                        with open(path, "rb") as partition_file:
+                            shutil.copyfileobj(partition_file, output)
+                else:
+                    merge_parquet_files(
+                        paths, columns, output, compression=self.columnar_compression,
+                        types=self.get_export_arrow_types(data),
+                    )
+            except BaseException:
+                output.close()
+                raise
+            output.seek(0)
+            return output
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
 
     def get_file_extension(self, file_format:str) -> str:
         """
@@ -743,13 +1795,26 @@ class ReportViewMixin(BaseMixin):
             return "xlsx"
         return file_format
 
+    def get_content_type(self, file_extension:str) -> str:
+        """
+        Returns:
+            str: The content type of the report file.
+        """
+        if file_extension == "parquet":
+            return "application/vnd.apache.parquet"
+        if file_extension == "arrow":
+            return "application/vnd.apache.arrow.file"
+        return "text/%s" % file_extension
+
     @method_decorator(cache_page(settings.CACHE_LIFETIME) if settings.ACTIVE_CACHE else lambda x: x)
     @action(methods=["GET"], detail=False, url_path="export",)
     def download_report(self, request:Request, *args, **kwargs):
         """
-        Exports the data report to Excel or CSV.
+        Exports the data report to Excel, CSV, Parquet or Arrow ("file_format", defaults to excel).
 
-        This method is decorated with cache_page to cache the Excel generation with Pandas.
+        The CSV is streamed while the rows are read, the other formats are written to
+        a temporary file and then streamed. This method is decorated with cache_page, the streamed
+        responses are not cached.
 
         Args:
             request (Request): The request object.
@@ -759,38 +1824,127 @@ class ReportViewMixin(BaseMixin):
         Returns:
             Response: The response containing the exported file or an error message.
         """
-        data, status_code = self.get_data(request=request)
+        tipo_formato:str = request.query_params.get("file_format", "excel").lower()
+        
+        if not hasattr(self, "generate_%s_file" % tipo_formato):
+            return Response(
+                {"message": "This format is not available, only csv, excel, parquet, arrow"},
+                status.HTTP_400_BAD_REQUEST
+                )
+        
+        if self.is_async_export(request):
+            return self.start_export_job(request, tipo_formato)
+
+        data, status_code = self.get_export_queryset(request)
 
         if status_code != status.HTTP_200_OK:
             return Response(data, status_code)
 
-        if "file_format" in request.query_params:
-            tipo_formato:str = request.query_params["file_format"].lower()
-            
-            if not hasattr(self, "generate_%s_file" % tipo_formato):
-                return Response(
-                    {"message": "This format is not available, only csv, excel"},
-                    status.HTTP_400_BAD_REQUEST
-                    )
-            
-            parser_func:Callable[[QuerySet[BaseModel] | list[BaseModel]], tuple[bytes, str]] = getattr(self, "generate_%s_file" % tipo_formato)
-            
-            file_extension = self.get_file_extension(tipo_formato)
-            
-            file_data, filename = parser_func(data)
-
-            return HttpResponse(
-                    file_data, 
-                    content_type="text/%s" % file_extension,
-                    headers= {
-                        "Content-Disposition": 'attachment; filename="%s.%s"'
-                        %
-                        (filename, file_extension) }
-                )
+        parser_func:Callable[[QuerySet[BaseModel]], tuple[bytes | Iterator | IO[bytes], str]] = getattr(self, "generate_%s_file" % tipo_formato)
+        
+        file_extension = self.get_file_extension(tipo_formato)
+        
+        file_data, filename = parser_func(data)
+
+        return self.get_file_response(file_data, filename, file_extension)
+
+    def get_file_response(self, file_data:bytes | Iterator | IO[bytes], filename:str, file_extension:str) -> HttpResponse | StreamingHttpResponse:
+        """
+        Returns the response of the report, streamed if the file is generated as an iterator
+        or as a file.
+
+        Args:
+            file_data (bytes | Iterator | IO[bytes]): The content of the file.
+            filename (str): The filename without extension.
+            file_extension (str): The extension of the file.
+
+        Returns:
+            HttpResponse | StreamingHttpResponse: The response with the file as attachment (FileResponse for files).
+        """
+        content_type = self.get_content_type(file_extension)
+        if hasattr(file_data, "read"):
+            # FileResponse sends the file in blocks and closes it at the end
+            return FileResponse(file_data, as_attachment=True, filename="%s.%s" % (filename, file_extension), content_type=content_type)
+        headers = {"Content-Disposition": 'attachment; filename="%s.%s"' % (filename, file_extension)}
+        if isinstance(file_data, (bytes, str)):
+            return HttpResponse(file_data, content_type=content_type, headers=headers)
+        return StreamingHttpResponse(file_data, content_type=content_type, headers=headers)
+
+    # ============== Background exports
+    def is_async_export(self, request:Request) -> bool:
+        return request.query_params.get(ASYNC_EXPORT_QUERY_PARAM, "").lower() in ("1", "true")
+
+    def get_export_job_data(self, job:ExportJob) -> dict[str, Any]:
+        data = {
+            "id": str(job.pk),
+            "state": job.state,
+            "file_format": job.file_format,
+            "created_date": job.created_date,
+            "finished_date": job.finished_date,
+            "expires_date": job.expires_date,
+            "error": job.error or None,
+            "status_url": self.reverse_action("export-job", kwargs={"job_id": job.pk}),
+            "download_url": None,
+        }
+        if job.state == ExportJob.DONE:
+            data["download_url"] = self.reverse_action("export-job-download", kwargs={"job_id": job.pk})
+        return data
+
+    def start_export_job(self, request:Request, file_format:str) -> Response:
+        """
+        Enqueues the report in the Celery workers. Only authenticated users can export
+        in the background, the jobs are limited per user.
 
-        excel_response, filename = self.generate_excel_file(data)
+        Returns:
+            Response: 202 with the job, 429 if the user has too many jobs pending or running.
+        """
+        if not request.user.is_authenticated:
+            self.permission_denied(request, message=_("Log in to export in the background"))
+        job = create_export_job(self, request, file_format)
+        if job is None:
+            return Response(
+                {"message": _("You have %s exports in progress, wait until they finish") % settings.EXPORT_JOBS_MAX_PER_USER},
+                status.HTTP_429_TOO_MANY_REQUESTS,
+            )
+        return Response(self.get_export_job_data(job), status.HTTP_202_ACCEPTED)
 
-        return HttpResponse(
-                excel_response, content_type="text/xlsx",
-                headers= {"Content-Disposition": 'attachment; filename="%s.xlsx"' % filename }
+    def get_export_job(self, request:Request, job_id:str) -> ExportJob | None:
+        """
+        Returns:
+            ExportJob | None: The job of this viewset and user, None if it doesn't exist.
+        """
+        try:
+            job_id = uuid.UUID(job_id)
+        except ValueError:
+            return None
+        user = request.user if request.user.is_authenticated else None
+        return ExportJob.objects.filter(pk=job_id, user=user, viewset=get_viewset_path(type(self))).first()
+
+    @action(methods=["GET"], detail=False, url_path=r"export/jobs/(?P<job_id>[0-9a-f-]+)", url_name="export-job")
+    def export_job(self, request:Request, job_id:str, *args, **kwargs):
+        """
+        Returns the state of an export job: pending, running, done (with the download_url) or failed.
+        """
+        job = self.get_export_job(request, job_id)
+        if job is None:
+            return self.get_not_found_response()
+        return Response(self.get_export_job_data(job), status.HTTP_200_OK)
+
+    @action(methods=["GET"], detail=False, url_path=r"export/jobs/(?P<job_id>[0-9a-f-]+)/download", url_name="export-job-download")
+    def export_job_download(self, request:Request, job_id:str, *args, **kwargs):
+        """
+        Downloads the file of a finished export job, 409 if it's not done yet.
+        """
+        job = self.get_export_job(request, job_id)
+        if job is None:
+            return self.get_not_found_response()
+        if job.state != ExportJob.DONE or not job.file:
+            return Response(
+                {"message": _("The export is %s") % job.state, "state": job.state},
+                status.HTTP_409_CONFLICT,
             )
+        return FileResponse(
+            job.file.open("rb"), as_attachment=True,
+            filename=os.path.basename(job.file.name),
+            content_type=self.get_content_type(self.get_file_extension(job.file_format)),
+        )
@@ -1,16 +1,20 @@
 from apps.base.pagination import GenericOffsetPagination
-from apps.base.viewsets.viewset_mixins import CreateObjectMixin, DestroyObjectMixin, GetQuerysetMixin, ListObjectMixin, RetrieveObjectMixin, UpdateObjectMixin
+from apps.base.viewsets.async_mixins import AsyncGetQuerysetMixin, AsyncListObjectMixin, AsyncRetrieveObjectMixin, AsyncViewSetMixin
+from apps.base.viewsets.viewset_mixins import BulkObjectMixin, CreateObjectMixin, DestroyObjectMixin, GetQuerysetMixin, ListObjectMixin, ReplicaRoutingMixin, RetrieveObjectMixin, StatementTimeoutMixin, UpdateObjectMixin
 from rest_framework import viewsets
 from rest_framework.serializers import ModelSerializer
 
 
 class BaseModelViewset(
+            StatementTimeoutMixin,
+            ReplicaRoutingMixin,
             GetQuerysetMixin,
             RetrieveObjectMixin,
             ListObjectMixin,
             CreateObjectMixin,
             UpdateObjectMixin,
             DestroyObjectMixin,
+            BulkObjectMixin,
             viewsets.ModelViewSet
         ):
     """Class for viewsets for read only data
@@ -22,6 +26,9 @@ class BaseModelViewset(
     - update_serializer: Serializer
     - sql_serializer
     - search_fields: list[str]
+    - bulk_max_items: int (max objects of the bulk/ endpoint)
+    - statement_timeout: int (milliseconds of the read actions, defaults to STATEMENT_TIMEOUT_MS)
+    - max_query_cost: float (max EXPLAIN cost of the read actions, defaults to MAX_QUERY_COST)
     - select_related_fields: list|tuple 
     - prefetch_related_fields: list|tuple 
     - annotate_fields: dict[str, object] 
@@ -34,6 +41,8 @@ class BaseModelViewset(
 
 
 class BaseReadOnlyViewset(
+            StatementTimeoutMixin,
+            ReplicaRoutingMixin,
             GetQuerysetMixin,
             RetrieveObjectMixin,
             ListObjectMixin,
@@ -48,6 +57,8 @@ class BaseReadOnlyViewset(
     - update_serializer: Serializer
     - sql_serializer
     - search_fields: list[str]
+    - statement_timeout: int (milliseconds of the read actions, defaults to STATEMENT_TIMEOUT_MS)
+    - max_query_cost: float (max EXPLAIN cost of the read actions, defaults to MAX_QUERY_COST)
     - select_related_fields: list|tuple 
     - prefetch_related_fields: list|tuple 
     - annotate_fields: dict[str, object] 
@@ -57,5 +68,23 @@ class BaseReadOnlyViewset(
     serializer_class:ModelSerializer = None
     pagination_class = GenericOffsetPagination
     search_fields: list[str] = None
+
+
+
+class BaseAsyncReadOnlyViewset(
+            StatementTimeoutMixin,
+            ReplicaRoutingMixin,
+            AsyncViewSetMixin,
+            AsyncGetQuerysetMixin,
+            AsyncRetrieveObjectMixin,
+            AsyncListObjectMixin,
+            viewsets.GenericViewSet,
+        ):
+    """Same as BaseReadOnlyViewset but List and Retrieve are async,
+    for the read heavy endpoints served with ASGI (uvicorn, daphne).
+    The other actions (the autocomplete of the AutocompleteMixin) run in a thread.
+    """
     
-    
\ No newline at end of file
+    serializer_class:ModelSerializer = None
+    pagination_class = GenericOffsetPagination
+    search_fields: list[str] = None
@@ -1,6 +1,11 @@
 from django.apps import AppConfig
+from django.utils.translation import gettext_lazy as _
 
 
 class UsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.users'
+    
+    def ready(self) -> None:
+        from apps.base.metrics import register_metric
+        register_metric("active_users", "users.User", label=_("Active users"), filters={"is_active": True}, icon="person")
@@ -1,6 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser, UserManager
 from django.utils.translation import gettext_lazy as _
+from apps.base.models import DirtyFieldsMixin
 # Create your models here.
 
 def user_media(instance:AbstractUser, filename: str) -> str:
@@ -12,7 +13,11 @@ def user_media(instance:AbstractUser, filename: str) -> str:
                     )
 
 
-class User(AbstractUser):
+class User(DirtyFieldsMixin, AbstractUser):
+    """
+    User of the project, save() only writes the fields that changed (DirtyFieldsMixin)
+    and the values loaded from the database keep the active_users metric incremental.
+    """
     
     birth_date = models.DateField(
         verbose_name=_("Birth Date"),
@@ -1,12 +1,14 @@
 from pathlib import Path
+from typing import Any
 from apps.base.utils import MessageManager as MM
 import os
 
 
 POSTGRES = 'postgresql'
+REPLICA_PREFIX = 'replica_'
 
 
-def get_db_config(db_engine:str = "sqlite", sqlite_path:Path = Path(__file__).resolve().parent.parent) -> dict[str, str]:
+def get_db_config(db_engine:str = "sqlite", sqlite_path:Path = Path(__file__).resolve().parent.parent) -> dict[str, Any]:
     db_properties = {
         'NAME':     os.environ.get('POSTGRES_DB'),
         'USER':     os.environ.get('POSTGRES_USER'),
@@ -17,6 +19,22 @@ def get_db_config(db_engine:str = "sqlite", sqlite_path:Path = Path(__file__).re
     
     if db_engine == POSTGRES:
         db_properties['ENGINE'] = 'django.db.backends.postgresql_psycopg2'
+        # Persistent connections, reused by the requests of the same thread
+        db_properties['CONN_MAX_AGE'] = int(os.environ.get('POSTGRES_CONN_MAX_AGE', 60))
+        # Checks the persistent connections before reusing them in a new request
+        db_properties['CONN_HEALTH_CHECKS'] = os.environ.get('POSTGRES_CONN_HEALTH_CHECKS', 'true').lower() == 'true'
+        
+        if os.environ.get('POSTGRES_POOL', 'false').lower() == 'true':
+            # Pool shared by all the threads of the process, Django returns
+            # the connection to the pool at the end of every request
+            db_properties['ENGINE'] = 'core.db_backends.postgresql_pool'
+            db_properties['CONN_MAX_AGE'] = 0
+            db_properties['POOL'] = {
+                'MIN_SIZE': int(os.environ.get('POSTGRES_POOL_MIN_SIZE', 2)),
+                'MAX_SIZE': int(os.environ.get('POSTGRES_POOL_MAX_SIZE', 20)),
+                'TIMEOUT': float(os.environ.get('POSTGRES_POOL_TIMEOUT', 10)),
+                'MAX_LIFETIME': float(os.environ.get('POSTGRES_POOL_MAX_LIFETIME', 3600)),
+            }
         return db_properties
     # Acá se podría añadir la config de mysql u otros...
     
@@ -29,4 +47,32 @@ def get_db_config(db_engine:str = "sqlite", sqlite_path:Path = Path(__file__).re
     return {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': sqlite_path / 'db.sqlite3',
-    }
\ No newline at end of file
+    }
+
+def get_replica_configs(db_engine:str, primary_config:dict[str, str]) -> dict[str, dict[str, str]]:
+    """Builds the read replicas from the env var POSTGRES_REPLICA_HOSTS,
+    a comma separated list of "host" or "host:port", for example "10.0.0.2,10.0.0.3:5433".
+    The replicas use the same name, user and password of the primary.
+
+    Args:
+        db_engine (str): Only postgresql supports replicas
+        primary_config (dict[str, str]): The config of the default database
+
+    Returns:
+        dict[str, dict[str, str]]: Aliases "replica_1", "replica_2"... with their config
+    """
+    hosts = [host.strip() for host in os.environ.get('POSTGRES_REPLICA_HOSTS', '').split(',') if host.strip()]
+    if db_engine != POSTGRES or not hosts:
+        return {}
+    
+    replicas = {}
+    for number, host in enumerate(hosts, start=1):
+        host, _, port = host.partition(':')
+        replicas[f'{REPLICA_PREFIX}{number}'] = {
+            **primary_config,
+            'HOST': host,
+            'PORT': port or primary_config.get('PORT'),
+            # The tests read from the default database
+            'TEST': {'MIRROR': 'default'},
+        }
+    return replicas
@@ -0,0 +1,166 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Callable
+
+
+class PoolTimeout(Exception):
+    """No connection was released before the acquisition timeout"""
+
+
+# Pools of the process by database alias
+pools:dict[str, 'ConnectionPool'] = {}
+pools_lock = threading.Lock()
+
+
+def get_pools_stats() -> dict[str, dict[str, Any]]:
+    """
+    Returns:
+        dict[str, dict[str, Any]]: Stats of the pools of this process by database alias
+    """
+    return {alias: pool.get_stats() for alias, pool in list(pools.items())}
+
+
+class ConnectionPool:
+    """
+    Thread safe pool of DB-API connections shared by all the threads of the process.
+    
+    - Opens min_size connections when it's created, so the first requests don't pay the connection setup.
+    - Opens new connections on demand up to max_size.
+    - If all the connections are in use, waits up to timeout seconds for one to be released.
+    - The closed connections are discarded, and the connections older than max_lifetime are recycled.
+    - The connections idle for more than check_idle_seconds are verified with check before being used.
+    """
+
+    def __init__(
+            self, connect:Callable[[], Any], min_size:int = 2, max_size:int = 20, timeout:float = 10,
+            max_lifetime:float = 3600, check:Callable[[Any], None] | None = None, check_idle_seconds:float = 30,
+        ) -> None:
+        self.connect = connect
+        self.check = check
+        self.check_idle_seconds = check_idle_seconds
+        self.min_size = min_size
+        self.max_size = max(max_size, min_size, 1)
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        # (connection, released at)
+        self.idle:deque[tuple[Any, float]] = deque()
+        self.opened_at:dict[int, float] = {}
+        self.size = 0
+        self.condition = threading.Condition()
+        self.counters = {
+            "requests": 0, "waits": 0, "timeouts": 0,
+            "connections_opened": 0, "connections_closed": 0, "wait_seconds": 0.0,
+        }
+        for _ in range(min_size):
+            self.size += 1
+            self.release(self.open_connection())
+
+    def open_connection(self) -> Any:
+        try:
+            connection = self.connect()
+        except Exception:
+            with self.condition:
+                self.size -= 1
+                self.condition.notify()
+            raise
+        with self.condition:
+            self.opened_at[id(connection)] = time.monotonic()
+            self.counters["connections_opened"] += 1
+        return connection
+
+    def discard(self, connection:Any) -> None:
+        """Closes a connection, must be called with the condition acquired"""
+        self.opened_at.pop(id(connection), None)
+        self.size -= 1
+        self.counters["connections_closed"] += 1
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def is_expired(self, connection:Any, now:float) -> bool:
+        return now - self.opened_at.get(id(connection), now) > self.max_lifetime
+
+    def acquire(self) -> Any:
+        """
+        Returns:
+            Any: An idle connection, or a new one if the pool isn't full
+
+        Raises:
+            PoolTimeout: If the pool is full and no connection is released before the timeout
+        """
+        while True:
+            connection, released_at = self.take_idle()
+            if connection is None:
+                return self.open_connection()
+            if self.check is None or time.monotonic() - released_at < self.check_idle_seconds:
+                return connection
+            # The connection was idle for a while, the server could have closed it
+            try:
+                self.check(connection)
+                return connection
+            except Exception:
+                with self.condition:
+                    self.discard(connection)
+                    self.condition.notify()
+
+    def take_idle(self) -> tuple[Any, float]:
+        """
+        Returns:
+            tuple[Any, float]: An idle connection with the time it was released,
+            or (None, 0) if a place for a new connection was reserved
+        """
+        started = time.monotonic()
+        deadline = started + self.timeout
+        with self.condition:
+            self.counters["requests"] += 1
+            waited = False
+            while True:
+                while self.idle:
+                    connection, released_at = self.idle.pop()
+                    if connection.closed or self.is_expired(connection, time.monotonic()):
+                        self.discard(connection)
+                        continue
+                    if waited:
+                        self.counters["wait_seconds"] += time.monotonic() - started
+                    return connection, released_at
+                if self.size < self.max_size:
+                    # Reserves the place, the connection is opened without holding the lock
+                    self.size += 1
+                    if waited:
+                        self.counters["wait_seconds"] += time.monotonic() - started
+                    return None, 0
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.counters["timeouts"] += 1
+                    raise PoolTimeout("No database connection available after %s seconds (max_size=%s)" % (self.timeout, self.max_size))
+                if not waited:
+                    self.counters["waits"] += 1
+                    waited = True
+                self.condition.wait(remaining)
+
+    def release(self, connection:Any, discard:bool = False) -> None:
+        """Returns a connection to the pool, it's closed if discard is True or it's broken or expired"""
+        with self.condition:
+            if discard or connection.closed or self.is_expired(connection, time.monotonic()):
+                self.discard(connection)
+            else:
+                self.idle.append((connection, time.monotonic()))
+            self.condition.notify()
+
+    def close_all(self) -> None:
+        with self.condition:
+            while self.idle:
+                self.discard(self.idle.pop()[0])
+
+    def get_stats(self) -> dict[str, Any]:
+        with self.condition:
+            return {
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "size": self.size,
+                "idle": len(self.idle),
+                "in_use": self.size - len(self.idle),
+                **self.counters,
+            }
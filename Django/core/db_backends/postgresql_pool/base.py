@@ -0,0 +1,65 @@
+from typing import Any
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.psycopg_any import IsolationLevel
+from core.db_backends.pool import ConnectionPool, pools, pools_lock
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    PostgreSQL backend (psycopg2) that takes the connections from a ConnectionPool
+    shared by the threads of the process, instead of opening one per thread.
+    
+    Django "closes" the connection at the end of every request (CONN_MAX_AGE = 0),
+    and close returns it to the pool. The pool is configured with the POOL key of the database:
+    {"MIN_SIZE": 2, "MAX_SIZE": 20, "TIMEOUT": 10, "MAX_LIFETIME": 3600}
+    With CONN_HEALTH_CHECKS the connections idle for a while are checked before being used.
+    """
+
+    def get_pool(self, conn_params:dict[str, Any]) -> ConnectionPool:
+        pool = pools.get(self.alias)
+        if pool is not None:
+            return pool
+        with pools_lock:
+            if self.alias not in pools:
+                options:dict[str, Any] = self.settings_dict.get("POOL", {})
+                pools[self.alias] = ConnectionPool(
+                    lambda: super(DatabaseWrapper, self).get_new_connection(conn_params),
+                    min_size=options.get("MIN_SIZE", 2),
+                    max_size=options.get("MAX_SIZE", 20),
+                    timeout=options.get("TIMEOUT", 10),
+                    max_lifetime=options.get("MAX_LIFETIME", 3600),
+                    check=self.check_connection if self.settings_dict["CONN_HEALTH_CHECKS"] else None,
+                )
+            return pools[self.alias]
+
+    @staticmethod
+    def check_connection(connection) -> None:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        connection.rollback()
+
+    def get_new_connection(self, conn_params:dict[str, Any]):
+        connection = self.get_pool(conn_params).acquire()
+        # The parent only sets the isolation level when the connection is opened
+        options = self.settings_dict["OPTIONS"]
+        if "isolation_level" in options:
+            self.isolation_level = IsolationLevel(options["isolation_level"])
+            connection.isolation_level = self.isolation_level
+        else:
+            self.isolation_level = IsolationLevel.READ_COMMITTED
+        return connection
+
+    def _close(self) -> None:
+        if self.connection is None:
+            return
+        connection = self.connection
+        # Inside atomic Django keeps self.connection (closed_in_transaction), so it can't
+        # go back to the pool for another thread: it's closed instead
+        discard = bool(connection.closed) or self.in_atomic_block
+        if not discard and connection.get_transaction_status() != base.Database.extensions.TRANSACTION_STATUS_IDLE:
+            # Leaves the connection clean for the next thread
+            try:
+                connection.rollback()
+            except base.Database.Error:
+                discard = True
+        pools[self.alias].release(connection, discard=discard)
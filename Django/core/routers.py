@@ -0,0 +1,133 @@
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Any
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, Error, connections
+from core.database import REPLICA_PREFIX
+
+# Set by the ReplicaRoutingMixin for the read actions, the rest of the queries go to the primary
+_use_replica:ContextVar[bool] = ContextVar("use_replica", default=False)
+
+
+def get_replica_aliases() -> list[str]:
+    return [alias for alias in settings.DATABASES if alias.startswith(REPLICA_PREFIX)]
+
+
+def set_use_replica(value:bool) -> Token:
+    """
+    Returns:
+        Token: Token to restore the previous value with reset_use_replica
+    """
+    return _use_replica.set(value)
+
+
+def reset_use_replica(token:Token) -> None:
+    _use_replica.reset(token)
+
+
+@contextmanager
+def use_replica(value:bool = True):
+    """Sends the reads inside the block to the replicas, for scripts and tasks
+    """
+    token = set_use_replica(value)
+    try:
+        yield
+    finally:
+        reset_use_replica(token)
+
+
+# ============== Read your writes
+def get_sticky_key(user_pk:Any) -> str:
+    return "sticky-primary:%s" % user_pk
+
+
+def mark_primary_sticky(user:Any) -> None:
+    """After a write the user reads from the primary for REPLICA_STICKY_SECONDS,
+    so the replication lag doesn't hide their own changes
+    """
+    if user is not None and user.is_authenticated:
+        cache.set(get_sticky_key(user.pk), True, settings.REPLICA_STICKY_SECONDS)
+
+
+def is_primary_sticky(user:Any) -> bool:
+    if user is None or not user.is_authenticated:
+        return False
+    return bool(cache.get(get_sticky_key(user.pk)))
+
+
+class ReplicaHealth:
+    """
+    Checks the replicas with the replication lag, the results are kept
+    REPLICA_HEALTH_CHECK_SECONDS in the process so the check is not made on every query.
+    A replica is healthy if it answers and its lag is at most REPLICA_MAX_LAG_SECONDS.
+    """
+    # The lag is 0 if the replica replayed all the WAL it received, otherwise it's the time since the last replayed transaction
+    LAG_QUERY = (
+        "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+        "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+    )
+    # alias -> (checked at, lag or None if unreachable)
+    _status:dict[str, tuple[float, float | None]] = {}
+
+    @classmethod
+    def get_lag(cls, alias:str) -> float | None:
+        """
+        Returns:
+            float | None: The replication lag in seconds, None if the replica can't be reached
+        """
+        connection = connections[alias]
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(cls.LAG_QUERY)
+                row = cursor.fetchone()
+        except Error:
+            # The next check opens a new connection
+            connection.close()
+            return None
+        return float(row[0] or 0) if row else 0.0
+
+    @classmethod
+    def get_status(cls, alias:str) -> float | None:
+        now = time.monotonic()
+        status = cls._status.get(alias)
+        if status is None or now - status[0] >= settings.REPLICA_HEALTH_CHECK_SECONDS:
+            status = (now, cls.get_lag(alias))
+            cls._status[alias] = status
+        return status[1]
+
+    @classmethod
+    def is_healthy(cls, alias:str) -> bool:
+        lag = cls.get_status(alias)
+        return lag is not None and lag <= settings.REPLICA_MAX_LAG_SECONDS
+
+
+class ReplicaRouter:
+    """
+    Database router for the read replicas:
+    - The reads go to a random healthy replica only inside use_replica (the ReplicaRoutingMixin actions),
+      if there are no healthy replicas they go to the primary.
+    - The writes and the migrations go to the primary.
+    """
+
+    def db_for_read(self, model, **hints) -> str | None:
+        if not _use_replica.get():
+            return None
+        replicas = [alias for alias in get_replica_aliases() if ReplicaHealth.is_healthy(alias)]
+        if not replicas:
+            return None
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints) -> str:
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints) -> bool:
+        # The replicas have the same data than the primary
+        return True
+
+    def allow_migrate(self, db:str, app_label:str, model_name:str | None = None, **hints) -> bool | None:
+        if db.startswith(REPLICA_PREFIX):
+            return False
+        return None
@@ -13,10 +13,12 @@ It imports all the modularized setting files, combining them into a single confi
 - base: Core Django settings
 - azure: Azure-specific settings for production
 - cache: Caching configuration
+- celery: Celery and background exports configuration
 - channels: Django Channels configuration
 - debug_toolbar: Debug Toolbar settings
 - drf: Django Rest Framework settings
 - jwt: JSON Web Token authentication settings
+- search: Full text search settings
 - swagger: Swagger/OpenAPI documentation settings
 
 This modular approach allows for better organization and easier management of different setting aspects.
@@ -25,9 +27,11 @@ This modular approach allows for better organization and easier management of di
 from .base import *
 from .azure import *
 from .cache import *
+from .celery import *
 from .channels import *
 from .debug_toolbar import *
 from .django_unfold import *
 from .drf import *
 from .jwt import *
+from .search import *
 from .swagger import *
\ No newline at end of file
@@ -27,7 +27,7 @@ Remember to review and adjust these settings according to the specific needs of
 """
 from environ import Env
 from pathlib import Path
-from core.database import get_db_config
+from core.database import get_db_config, get_replica_configs
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 
@@ -71,6 +71,7 @@ DJANGO_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 ]
 
 THIRD_PARTY_APPS = [
@@ -167,6 +168,21 @@ DATABASES = {
         **get_db_config(env.str("DB_ENGINE","sqlite"), BASE_DIR / "sqlite"),
     },
 }
+# Read replicas from POSTGRES_REPLICA_HOSTS, the ReplicaRoutingMixin sends the reads of the viewsets to them
+DATABASES.update(get_replica_configs(env.str("DB_ENGINE","sqlite"), DATABASES['default']))
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+# Seconds a user reads from the primary after a write
+REPLICA_STICKY_SECONDS = env.int("DJANGO_REPLICA_STICKY_SECONDS", 5)
+# Max replication lag of a replica to receive reads
+REPLICA_MAX_LAG_SECONDS = env.int("DJANGO_REPLICA_MAX_LAG_SECONDS", 10)
+# Seconds the health of a replica is cached in the process
+REPLICA_HEALTH_CHECK_SECONDS = env.int("DJANGO_REPLICA_HEALTH_CHECK_SECONDS", 10)
+
+# Default statement_timeout (milliseconds) of the StatementTimeoutMixin actions, 0 disables it
+STATEMENT_TIMEOUT_MS = env.int("DJANGO_STATEMENT_TIMEOUT_MS", 0)
+# Default max EXPLAIN cost of the StatementTimeoutMixin actions, 0 disables the check
+MAX_QUERY_COST = env.float("DJANGO_MAX_QUERY_COST", 0)
 
 
 # ============================
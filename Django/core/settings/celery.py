@@ -0,0 +1,61 @@
+"""
+                  ____     _                 
+                 / ___|___| | ___ _ __ _   _ 
+                | |   / _ \ |/ _ \ '__| | | |
+                | |__|  __/ |  __/ |  | |_| |
+                 \____\___|_|\___|_|   \__, |
+                                       |___/ 
+
+This file contains the configuration for Celery (core.celery) and the background exports.
+
+- CELERY_BROKER_URL: Defaults to the RabbitMQ of the message broker.
+- CELERY_TASK_ALWAYS_EAGER: Runs the tasks in the process that sends them, for development and tests.
+- CELERY_BEAT_SCHEDULE: Periodic tasks, run the beat with "celery -A core beat".
+
+And the limits of the export jobs of the ReportViewMixin ("?async=true"):
+
+- EXPORT_JOBS_MAX_PER_USER: Jobs pending or running at the same time per user, the next ones get 429.
+- EXPORT_JOBS_TTL_HOURS: Hours the jobs and their files are kept.
+- EXPORT_JOBS_STALE_MINUTES: Running jobs older than this are marked as failed (the worker died).
+- EXPORT_PARTITION_WORKERS: Max processes of a partitioned export (ReportViewMixin.export_partitions),
+  every one opens its own database connection.
+
+Start the workers with "celery -A core worker -l info". The export jobs go to the "exports" queue,
+consumed by a worker with threads, because the prefork processes can't start the pool of the
+partitioned exports: "celery -A core worker -Q exports --pool=threads --concurrency=2 -l info".
+At most concurrency * EXPORT_PARTITION_WORKERS processes export at the same time.
+"""
+
+from .base import env
+
+
+RABBITMQ_HOST = env.str("RABBITMQ_HOST", "localhost")
+RABBITMQ_PORT = env.int("RABBITMQ_PORT", 5672)
+RABBITMQ_USER = env.str("RABBITMQ_USER", "guest")
+RABBITMQ_PASSWORD = env.str("RABBITMQ_PASSWORD", "guest")
+
+CELERY_BROKER_URL = env.str(
+    "CELERY_BROKER_URL",
+    f"amqp://{RABBITMQ_USER}:{RABBITMQ_PASSWORD}@{RABBITMQ_HOST}:{RABBITMQ_PORT}//",
+)
+CELERY_TASK_ALWAYS_EAGER = env.bool("CELERY_TASK_ALWAYS_EAGER", False)
+# The state of the jobs is stored in the database (ExportJob), not in a result backend
+CELERY_TASK_IGNORE_RESULT = True
+CELERY_TASK_ACKS_LATE = True
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+CELERY_TIMEZONE = "UTC"
+CELERY_TASK_ROUTES = {
+    "apps.base.tasks.run_export_job_task": {"queue": "exports"},
+}
+
+CELERY_BEAT_SCHEDULE = {
+    "cleanup-export-jobs": {
+        "task": "apps.base.tasks.cleanup_export_jobs_task",
+        "schedule": 60 * 60,
+    },
+}
+
+EXPORT_JOBS_MAX_PER_USER = env.int("DJANGO_EXPORT_JOBS_MAX_PER_USER", 2)
+EXPORT_JOBS_TTL_HOURS = env.int("DJANGO_EXPORT_JOBS_TTL_HOURS", 24)
+EXPORT_JOBS_STALE_MINUTES = env.int("DJANGO_EXPORT_JOBS_STALE_MINUTES", 60)
+EXPORT_PARTITION_WORKERS = env.int("DJANGO_EXPORT_PARTITION_WORKERS", 4)
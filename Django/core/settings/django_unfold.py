@@ -38,7 +38,8 @@ UNFOLD = {
     "SHOW_HISTORY": True,
     "SHOW_VIEW_ON_SITE": True,
     # "ENVIRONMENT": "alfanar_hr.utils.get_environment",
-    # "DASHBOARD_CALLBACK": "alfanar_hr.utils.dashboard_callback",
+    # Precomputed metrics of apps.base.metrics, see the refresh_dashboard_metrics command
+    "DASHBOARD_CALLBACK": "apps.base.unfold.dashboard.dashboard_callback",
     # "LOGIN": {
     #     "image": lambda request: static("assets/login_background.jpg"),
     #     "redirect_after": lambda request: reverse_lazy("admin:index"),
@@ -250,18 +251,16 @@ UNFOLD = {
     ],
 }
 
-# You need to implement these functions in alfanar_hr/utils.py
+# You need to implement this function in alfanar_hr/utils.py
 """
 def get_environment(request):
     # Implement logic to determine the current environment
     return ["Production", "danger"]  # or ["Development", "warning"], etc.
+"""
+# The dashboard numbers are registered in the ready() of the apps instead of counted on every load:
+"""
+from apps.base.metrics import register_metric
 
-def dashboard_callback(request, context):
-    # Add custom data to the dashboard context
-    context.update({
-        "total_employees": Employee.objects.count(),
-        "pending_vacations": Vacation.objects.filter(status='P').count(),
-        # Add more relevant data for your dashboard
-    })
-    return context
+register_metric("total_employees", "employees.Employee", label=_("Employees"), filters={"status": True}, icon="people")
+register_metric("pending_vacations", "vacation.Vacation", label=_("Pending vacations"), filters={"status": "P"}, icon="beach_access")
 """
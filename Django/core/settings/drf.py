@@ -31,6 +31,8 @@ REST_FRAMEWORK = {
     ),
     'DEFAULT_FILTER_BACKENDS': (
         'rest_framework.filters.SearchFilter',
+        # Postgres full text search, remember to run "python manage.py build_search_indexes"
+        # 'apps.base.search.full_text.FullTextSearchFilter',
         'rest_framework.filters.OrderingFilter',
     )
 }
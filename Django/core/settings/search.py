@@ -0,0 +1,37 @@
+"""
+                 ____                      _     
+                / ___|  ___  __ _ _ __ ___| |__  
+                \___ \ / _ \/ _` | '__/ __| '_ \ 
+                 ___) |  __/ (_| | | | (__| | | |
+                |____/ \___|\__,_|_|  \___|_| |_|
+                                                 
+This file contains the configuration for the search backends of the API.
+
+It defines the settings of the FullTextSearchFilter (apps.base.search.full_text):
+
+- FULL_TEXT_SEARCH_CONFIG: Postgres text search configuration (simple, spanish, english...).
+- FULL_TEXT_SEARCH_MIN_TERM_LENGTH: Terms shorter than this use trigram similarity instead of the tsvector.
+
+And the backend of the prefix index used by the AutocompleteMixin (apps.base.search.autocomplete):
+
+- AUTOCOMPLETE_BACKEND: REDIS (sorted sets shared by all the workers) or LOCAL (in process index).
+  Defaults to REDIS when the Redis cache is active. LOCAL shouldn't be used with more than one
+  gunicorn worker (GUNICORN_WORKERS), the writes of a worker don't reach the indexes of the others
+  (the system check base.W001 warns about it).
+
+To use it, add the filter to the filter_backends of the viewset (or to DEFAULT_FILTER_BACKENDS)
+and build the indexes with "python manage.py build_search_indexes".
+"""
+
+from .base import env
+from .cache import ACTIVE_CACHE, CACHE_BACKEND
+
+
+FULL_TEXT_SEARCH_CONFIG = env.str("DJANGO_FULL_TEXT_SEARCH_CONFIG", "simple")
+FULL_TEXT_SEARCH_MIN_TERM_LENGTH = env.int("DJANGO_FULL_TEXT_SEARCH_MIN_TERM_LENGTH", 3)
+
+AUTOCOMPLETE_BACKEND = env.str(
+    "DJANGO_AUTOCOMPLETE_BACKEND",
+    "REDIS" if CACHE_BACKEND == "REDIS" and ACTIVE_CACHE else "LOCAL",
+).upper()
+GUNICORN_WORKERS = env.int("GUNICORN_WORKERS", 1)
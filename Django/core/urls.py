@@ -11,6 +11,7 @@ from rest_framework_simplejwt.views import TokenRefreshView, TokenVerifyView
 from django.contrib import admin
 from apps.base.oauth.authentication import AzureSwaggerAuthentication
 from apps.users.views import AzureAdminLogin
+from apps.base.views import DatabasePoolStatsView
 
 schema_view = get_schema_view(
     openapi.Info(
@@ -42,6 +43,8 @@ urlpatterns = [
     re_path(r'^api/v1/refresh/?$', TokenRefreshView.as_view(), name='token_refresh'),
     re_path(r'^api/v1/verify/?$', TokenVerifyView.as_view(), name='token_verify'),
     
+    re_path(r'^api/v1/database/pools/?$', DatabasePoolStatsView.as_view(), name='database_pools'),
+    
     # Rutas
     path(r"api/v1/users/", include('apps.users.api.router'), name="users"),
     path(r"api/v1/company/", include('apps.human_resources.company.api.router'), name="company"),
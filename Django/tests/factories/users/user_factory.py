@@ -28,4 +28,29 @@ class UsersFactory(BaseFactory):
             "password": "developer123",
             "is_staff": False,
             "is_superuser": False,
-        }
\ No newline at end of file
+        }
+
+class ModelUsersFactory(BaseFactory):
+    """Users with only the columns of the model, for the tests of the base viewsets"""
+    model = User
+    
+    def get_json(self) -> dict[str, str | bool]:
+        return {
+            "username": self.faker.unique.user_name(),
+            "email": self.faker.email(),
+            "first_name": self.faker.first_name(),
+            "last_name": self.faker.last_name(),
+            "birth_date": self.faker.date_of_birth().isoformat(),
+            "is_active": True,
+        }
+    
+    def get_create_json(self) -> dict[str, str | bool]:
+        data = self.get_json()
+        data["photo"] = "users/%s/photo.png" % data["username"]
+        return data
+    
+    def get_invalid_json(self) -> dict[str, str | bool]:
+        return {
+            "username": "",
+            "email": "not an email",
+        }
@@ -1,4 +1,5 @@
 from faker import Faker
+from django.test import override_settings
 from rest_framework.test import APITestCase
 from rest_framework import status
 from apps.base.utils import MessageManager as MM
@@ -57,4 +58,22 @@ class TestSetup(APITestCase):
         return response.data["token"]
     
     def setToken(self, token:str):
-        self.client.credentials(HTTP_AUTHORIZATION = f"Bearer {token}")
\ No newline at end of file
+        self.client.credentials(HTTP_AUTHORIZATION = f"Bearer {token}")
+
+
+@override_settings(ROOT_URLCONF="tests.tests_base.urls")
+class ViewsetTestSetup(APITestCase):
+    """TestSetup of the base viewsets (apps.base.viewsets), with the routes of
+    tests.tests_base.urls and a super user authenticated in the client
+    """
+    Messages = MM
+    
+    def setUp(self) -> None:
+        fake = Faker()
+        self.super_user:User = User.objects.create_superuser(
+            username="developer",
+            password="developer",
+            email=fake.email(),
+        )
+        self.client.force_authenticate(self.super_user)
+        return super().setUp()
@@ -0,0 +1,99 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.response import Response
+from apps.base.tests import FactoryMixin
+from tests.factories.users.user_factory import ModelUsersFactory
+from tests.test_setup import ViewsetTestSetup
+
+
+class BulkTestCase(FactoryMixin, ViewsetTestSetup):
+    """
+    Endpoints "bulk/" (BulkObjectMixin) and "bulk-destroy/" (DestroyObjectMixin)
+    """
+    factory = ModelUsersFactory()
+    endpoint = "/users"
+    
+    def bulk_patch(self, items:list[dict]) -> tuple[Response, int]:
+        with CaptureQueriesContext(connection) as context:
+            response:Response = self.client.patch(self.get_endpoint() + "/bulk/", data=items, format="json")
+        return response, len(context.captured_queries)
+    
+    def test_bulk_create(self):
+        factory = self.get_factory()
+        items = [factory.get_json() for _ in range(10)]
+        
+        response:Response = self.client.post(self.get_endpoint() + "/bulk/", data=items, format="json")
+        
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        self.assertEqual(response.data["count"], 10)
+        self.assertEqual([row["username"] for row in response.data["results"]], [item["username"] for item in items])
+        self.assertEqual(self.get_model().objects.filter(username__in=[item["username"] for item in items]).count(), 10)
+        
+        self.Messages.ok(f"TEST BULK CREATE {self.model_name} COMPLETED OK ✅")
+    
+    def test_bulk_create_invalid(self):
+        factory = self.get_factory()
+        items = [factory.get_json(), factory.get_invalid_json(), factory.get_json()]
+        count = self.get_model().objects.count()
+        
+        response:Response = self.client.post(self.get_endpoint() + "/bulk/", data=items, format="json")
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, response.data)
+        self.assertEqual([error["index"] for error in response.data["errors"]], [1])
+        # Nothing is written if any item is invalid
+        self.assertEqual(self.get_model().objects.count(), count)
+        
+        response = self.client.post(self.get_endpoint() + "/bulk/", data={"username": "x"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, response.data)
+        
+        self.Messages.ok(f"TEST BULK CREATE INVALID {self.model_name} COMPLETED OK ✅")
+    
+    def test_bulk_update(self):
+        objects = self.get_factory().create_bulk(5)
+        items = [{"id": obj.pk, "first_name": "Name %s" % index} for index, obj in enumerate(objects)]
+        
+        response, _queries = self.bulk_patch(items)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.assertEqual(response.data["count"], 5)
+        for index, obj in enumerate(objects):
+            obj.refresh_from_db()
+            self.assertEqual(obj.first_name, "Name %s" % index)
+        
+        response, _queries = self.bulk_patch([{"id": objects[0].pk, "first_name": "Other"}, {"id": 0, "first_name": "Missing"}])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, response.data)
+        self.assertEqual([error["index"] for error in response.data["errors"]], [1])
+        objects[0].refresh_from_db()
+        self.assertEqual(objects[0].first_name, "Name 0")
+        
+        self.Messages.ok(f"TEST BULK UPDATE {self.model_name} COMPLETED OK ✅")
+    
+    def test_bulk_update_query_budget(self):
+        objects = self.get_factory().create_bulk(40)
+        
+        _response, few_queries = self.bulk_patch([{"id": obj.pk, "last_name": "Few"} for obj in objects[:5]])
+        response, many_queries = self.bulk_patch([{"id": obj.pk, "last_name": "Many"} for obj in objects])
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        # The objects are read, updated and read again in bulk, the queries don't grow with the items
+        self.assertEqual(few_queries, many_queries)
+        
+        self.Messages.ok(f"TEST BULK UPDATE QUERY BUDGET {self.model_name} COMPLETED OK ✅")
+    
+    def test_bulk_destroy(self):
+        objects = self.get_factory().create_bulk(4)
+        ids = [obj.pk for obj in objects[:3]]
+        
+        response:Response = self.client.post(self.get_endpoint() + "/bulk-destroy/", data={"ids": [*ids, ids[0]]}, format="json")
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.assertEqual(response.data["deactivated"], 3)
+        self.assertEqual(self.get_model().objects.filter(pk__in=ids, is_active=True).count(), 0)
+        self.assertTrue(self.get_model().objects.get(pk=objects[3].pk).is_active)
+        
+        # Never deactivates the whole table without ids nor filters
+        response = self.client.post(self.get_endpoint() + "/bulk-destroy/", data={}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, response.data)
+        
+        self.Messages.ok(f"TEST BULK DESTROY {self.model_name} COMPLETED OK ✅")
@@ -0,0 +1,47 @@
+from django.contrib.auth.models import Group
+from apps.base.serializers import CompiledListSerializer, CompiledSerializer, compile_serializer, diff_compiled_serializer
+from apps.base.tests import CompiledSerializerTestCaseMixin
+from tests.factories.users.user_factory import ModelUsersFactory
+from tests.test_setup import ViewsetTestSetup
+from tests.tests_base.viewsets import UserTestExportSerializer, UserTestReadOnlySerializer
+
+
+class CompiledSerializerTestCase(CompiledSerializerTestCaseMixin, ViewsetTestSetup):
+    factory = ModelUsersFactory()
+    endpoint = "/users"
+    read_only_serializer = UserTestReadOnlySerializer
+    
+    def test_compiled_kinds(self):
+        compiled = compile_serializer(UserTestReadOnlySerializer)
+        self.assertIsNotNone(compiled)
+        kinds = {name: kind for kind, name, *_ in compiled.entries}
+        
+        self.assertEqual(kinds["username"], CompiledSerializer.ATTRIBUTE)
+        self.assertEqual(kinds["full_name"], CompiledSerializer.METHOD)
+        self.assertEqual(kinds["groups_count"], CompiledSerializer.BATCH)
+        self.assertEqual(kinds["groups"], CompiledSerializer.FIELD)
+        # The url of the file is built with the request of the context
+        self.assertEqual(kinds["photo"], CompiledSerializer.FIELD)
+        
+        self.Messages.ok("TEST COMPILED SERIALIZER KINDS COMPLETED OK ✅")
+    
+    def test_compiled_serializer_with_relations(self):
+        users = self.get_factory().create_bulk(5)
+        group = Group.objects.create(name="reports")
+        group.user_set.add(users[0], users[2])
+        
+        instances = self.get_model().objects.prefetch_related("groups").order_by("pk")
+        context = self.get_serializer_context()
+        serializer = UserTestReadOnlySerializer(instances, many=True, context=context)
+        self.assertIsInstance(serializer, CompiledListSerializer)
+        
+        rows = {row["id"]: row for row in serializer.data}
+        self.assertEqual(rows[users[0].pk]["groups"], [group.pk])
+        self.assertEqual(rows[users[0].pk]["groups_count"], 1)
+        self.assertEqual(rows[users[1].pk]["groups_count"], 0)
+        self.assertEqual(rows[users[0].pk]["photo"], context["request"].build_absolute_uri(users[0].photo.url))
+        
+        self.assertEqual(diff_compiled_serializer(UserTestReadOnlySerializer, instances, context), [])
+        self.assertEqual(diff_compiled_serializer(UserTestExportSerializer, instances, context), [])
+        
+        self.Messages.ok("TEST COMPILED SERIALIZER RELATIONS COMPLETED OK ✅")
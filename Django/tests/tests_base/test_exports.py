@@ -0,0 +1,116 @@
+import csv
+import io
+import zipfile
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+from django.http import StreamingHttpResponse
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.test import APIClient
+from apps.base.models import ExportJob
+from apps.base.tests import FactoryMixin
+from tests.factories.users.user_factory import ModelUsersFactory
+from tests.test_setup import ViewsetTestSetup
+
+EXPORT_COLUMNS = ["id", "username", "first_name", "is_active", "birth_date", "date_joined"]
+
+
+class ExportTestCase(FactoryMixin, ViewsetTestSetup):
+    """
+    Formats of the endpoint "export/" (ReportViewMixin), the report has
+    the rows of the list filters and the columns of the export serializer
+    """
+    factory = ModelUsersFactory()
+    endpoint = "/users"
+    
+    def setUp(self) -> None:
+        super().setUp()
+        self.objects = self.get_factory().create_bulk(12)
+        self.get_model().objects.filter(pk__in=[obj.pk for obj in self.objects[:4]]).update(is_active=False)
+    
+    def export(self, file_format:str, **query_params) -> tuple[StreamingHttpResponse, bytes]:
+        response = self.client.get(self.get_endpoint() + "/export/", {"file_format": file_format, **query_params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK, getattr(response, "data", None))
+        self.assertIsInstance(response, StreamingHttpResponse)
+        return response, response.getvalue()
+    
+    def test_csv(self):
+        response, content = self.export("csv", is_active="false")
+        
+        self.assertIn(".csv", response["Content-Disposition"])
+        rows = list(csv.reader(io.StringIO(content.decode()), delimiter=";"))
+        self.assertEqual(rows[0], EXPORT_COLUMNS)
+        self.assertEqual(sorted(int(row[0]) for row in rows[1:]), sorted(obj.pk for obj in self.objects[:4]))
+        
+        self.Messages.ok("TEST EXPORT CSV COMPLETED OK ✅")
+    
+    def test_excel(self):
+        response, content = self.export("excel")
+        
+        self.assertIn(".xlsx", response["Content-Disposition"])
+        with zipfile.ZipFile(io.BytesIO(content)) as workbook:
+            sheet = workbook.read("xl/worksheets/sheet1.xml").decode()
+        for obj in self.objects:
+            self.assertIn(obj.username, sheet)
+        
+        self.Messages.ok("TEST EXPORT EXCEL COMPLETED OK ✅")
+    
+    def assertArrowTable(self, table:pa.Table) -> None:
+        self.assertEqual(table.column_names, EXPORT_COLUMNS)
+        self.assertEqual(table.num_rows, self.get_model().objects.count())
+        self.assertTrue(pa.types.is_integer(table.schema.field("id").type))
+        self.assertTrue(pa.types.is_boolean(table.schema.field("is_active").type))
+        self.assertTrue(pa.types.is_string(table.schema.field("username").type))
+        usernames = set(table.column("username").to_pylist())
+        self.assertTrue({obj.username for obj in self.objects} <= usernames)
+    
+    def test_parquet(self):
+        response, content = self.export("parquet")
+        
+        self.assertEqual(response["Content-Type"], "application/vnd.apache.parquet")
+        self.assertArrowTable(pq.read_table(io.BytesIO(content)))
+        
+        # The types come from the fields, not from the first row group
+        response, content = self.export("parquet", ordering="-birth_date")
+        self.assertArrowTable(pq.read_table(io.BytesIO(content)))
+        
+        self.Messages.ok("TEST EXPORT PARQUET COMPLETED OK ✅")
+    
+    def test_arrow(self):
+        response, content = self.export("arrow")
+        
+        self.assertEqual(response["Content-Type"], "application/vnd.apache.arrow.file")
+        self.assertArrowTable(ipc.open_file(pa.BufferReader(content)).read_all())
+        
+        self.Messages.ok("TEST EXPORT ARROW COMPLETED OK ✅")
+    
+    def test_invalid_export(self):
+        response = self.client.get(self.get_endpoint() + "/export/", {"file_format": "xml"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, response.data)
+        
+        response = self.client.get(self.get_endpoint() + "/export/", {"file_format": "csv", "unknown_field": "1"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, response.data)
+        
+        self.Messages.ok("TEST EXPORT INVALID COMPLETED OK ✅")
+    
+    @override_settings(EXPORT_JOBS_MAX_PER_USER=1)
+    def test_async_export_limits(self):
+        # Only the authenticated users can export in the background
+        response = APIClient().get(self.get_endpoint() + "/export/", {"file_format": "csv", "async": "true"})
+        self.assertIn(response.status_code, (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
+        self.assertFalse(ExportJob.objects.exists())
+        
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.get(self.get_endpoint() + "/export/", {"file_format": "csv", "async": "true"})
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED, response.data)
+        self.assertEqual(len(callbacks), 1)
+        job = ExportJob.objects.get(pk=response.data["id"])
+        self.assertEqual(job.user, self.super_user)
+        self.assertEqual(job.state, ExportJob.PENDING)
+        
+        response = self.client.get(self.get_endpoint() + "/export/", {"file_format": "csv", "async": "true"})
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS, response.data)
+        self.assertEqual(ExportJob.objects.count(), 1)
+        
+        self.Messages.ok("TEST EXPORT ASYNC LIMITS COMPLETED OK ✅")
@@ -0,0 +1,18 @@
+from apps.base.tests import QueryBudgetTestCaseMixin
+from tests.factories.users.user_factory import ModelUsersFactory
+from tests.test_setup import ViewsetTestSetup
+
+
+class QueryBudgetTestCase(QueryBudgetTestCaseMixin, ViewsetTestSetup):
+    """
+    - list: count, page, groups prefetch, groups_count batch
+    - retrieve: object, groups prefetch, groups_count batch
+    - create: unique username, insert, groups set, object read again for the response
+    - update: object, unique username, update, object read again for the response
+    """
+    factory = ModelUsersFactory()
+    endpoint = "/users"
+    list_query_budget = 4
+    retrieve_query_budget = 3
+    create_query_budget = 6
+    update_query_budget = 7
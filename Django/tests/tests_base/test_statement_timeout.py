@@ -0,0 +1,79 @@
+import json
+from unittest import mock
+from django.db import connection, transaction
+from rest_framework import status
+from rest_framework.response import Response
+from apps.base.tests import FactoryMixin
+from tests.factories.users.user_factory import ModelUsersFactory
+from tests.test_setup import ViewsetTestSetup
+from tests.tests_base.viewsets import UserTestViewset
+
+
+def atomic_statement_timeout(milliseconds:int | None, using:str):
+    # Outside PostgreSQL statement_timeout doesn't open its transaction, that is what must be closed
+    return transaction.atomic(using=using)
+
+
+class StatementTimeoutTestCase(FactoryMixin, ViewsetTestSetup):
+    """
+    The transaction of the StatementTimeoutMixin is closed on every path of the request,
+    the connection can't stay inside it for the next requests of the thread.
+    """
+    factory = ModelUsersFactory()
+    endpoint = "/users"
+    
+    def setUp(self) -> None:
+        patches = [mock.patch.object(UserTestViewset, "statement_timeout", 1000)]
+        if connection.vendor != "postgresql":
+            patches.append(mock.patch("apps.base.viewsets.viewset_mixins.statement_timeout", atomic_statement_timeout))
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.get_factory().create_bulk(5)
+        return super().setUp()
+    
+    def assertTimeoutClosed(self, depth:int) -> None:
+        self.assertEqual(len(connection.atomic_blocks), depth, "The transaction of the statement timeout is still open")
+    
+    def test_closed_after_response(self):
+        depth = len(connection.atomic_blocks)
+        
+        response:Response = self.client.get(self.get_endpoint())
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.assertTimeoutClosed(depth)
+        
+        # The streamed list reads the rows inside its own timeout
+        response = self.client.get(self.get_endpoint(), {"stream": "true"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(json.loads(b"".join(response.streaming_content))), self.get_model().objects.count())
+        self.assertTimeoutClosed(depth)
+        
+        self.Messages.ok("TEST STATEMENT TIMEOUT RESPONSE COMPLETED OK ✅")
+    
+    def test_closed_after_error_response(self):
+        depth = len(connection.atomic_blocks)
+        
+        response:Response = self.client.get(self.get_endpoint(), {"unknown_field": "1"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, response.data)
+        self.assertTimeoutClosed(depth)
+        
+        response = self.client.get(self.get_endpoint() + "/0")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND, response.data)
+        self.assertTimeoutClosed(depth)
+        
+        self.Messages.ok("TEST STATEMENT TIMEOUT ERROR RESPONSE COMPLETED OK ✅")
+    
+    def test_closed_after_uncaught_exception(self):
+        depth = len(connection.atomic_blocks)
+        
+        # finalize_response is skipped when handle_exception raises
+        with mock.patch.object(UserTestViewset, "get_list_serializer", side_effect=RuntimeError("serializer error")):
+            with self.assertRaises(RuntimeError):
+                self.client.get(self.get_endpoint())
+        self.assertTimeoutClosed(depth)
+        
+        response:Response = self.client.get(self.get_endpoint())
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.assertTimeoutClosed(depth)
+        
+        self.Messages.ok("TEST STATEMENT TIMEOUT UNCAUGHT EXCEPTION COMPLETED OK ✅")
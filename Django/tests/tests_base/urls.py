@@ -0,0 +1,7 @@
+from apps.base.router import BaseRouter
+from tests.tests_base.viewsets import UserTestViewset
+
+router = BaseRouter()
+router.register(r'users', UserTestViewset, basename='users-test-viewset')
+
+urlpatterns = router.urls
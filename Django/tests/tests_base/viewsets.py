@@ -0,0 +1,57 @@
+from django.db.models import Count
+from rest_framework import serializers
+from apps.base.serializers import BatchSerializerMethodField, GenericReadOnlySerializer
+from apps.base.viewsets.viewset_mixins import ReportViewMixin
+from apps.base.viewsets.viewsets_generics import BaseModelViewset
+from apps.users.models import User
+
+
+class UserTestReadOnlySerializer(GenericReadOnlySerializer):
+    """Read only serializer with every kind of field of the CompiledSerializer"""
+    date_joined = serializers.DateTimeField(format="%d-%m-%Y %H:%M:%S")
+    full_name = serializers.SerializerMethodField()
+    groups_count = BatchSerializerMethodField()
+    
+    class Meta:
+        model = User
+        fields = (
+            "id", "username", "email", "first_name", "last_name", "is_active",
+            "birth_date", "date_joined", "last_login", "photo", "groups", "full_name", "groups_count",
+        )
+    
+    def get_full_name(self, obj:User) -> str:
+        return obj.get_full_name()
+    
+    def get_groups_count_batch(self, objects:list[User]) -> dict[int, int]:
+        rows = User.groups.through.objects\
+                .filter(user_id__in=[obj.pk for obj in objects])\
+                .values("user_id")\
+                .annotate(count=Count("pk"))
+        counts = {row["user_id"]: row["count"] for row in rows}
+        return {obj.pk: counts.get(obj.pk, 0) for obj in objects}
+
+
+class UserTestExportSerializer(GenericReadOnlySerializer):
+    class Meta:
+        model = User
+        fields = ("id", "username", "first_name", "is_active", "birth_date", "date_joined")
+
+
+class UserTestSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = User
+        fields = ("id", "username", "email", "first_name", "last_name", "is_active", "birth_date", "groups")
+
+
+class UserTestViewset(ReportViewMixin, BaseModelViewset):
+    serializer_class = UserTestSerializer
+    read_only_serializer = UserTestReadOnlySerializer
+    export_csv_serializer = UserTestExportSerializer
+    search_fields = ["username", "first_name", "last_name"]
+    prefetch_related_fields = ["groups"]
+    
+    def get_status_field(self) -> str:
+        return "is_active"
+    
+    def get_deleted_status(self) -> bool:
+        return False